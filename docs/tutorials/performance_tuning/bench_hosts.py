@@ -0,0 +1,20 @@
+import time
+import tracemalloc
+
+import enoslib as en
+
+# Typical extra of a virtual machine (e.g. VMonG5k)
+N = 50000
+extra = dict(gateway="access.grid5000.fr", gateway_user="user", pm="parasilo-1")
+
+tracemalloc.start()
+start = time.time()
+hosts = [
+    en.Host(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", extra=extra)
+    for i in range(N)
+]
+duration = time.time() - start
+memory, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+print(f"{N / duration:.0f} hosts/s, {memory / N:.0f} bytes/host")
@@ -0,0 +1,36 @@
+"""Time to build the NetemHTB constraints of a full mesh.
+
+The hosts are fake ones (nothing is deployed): each host has one device with
+one address, and each host gets one constraint per other host (including
+itself).
+
+Usage: python bench_htb_mesh.py [nb_hosts]
+"""
+import sys
+import time
+
+from enoslib.objects import DefaultNetwork, Host, IPAddress, NetDevice
+from enoslib.service.emul.htb import NetemHTB
+from enoslib.service.emul.utils import _build_commands
+
+nb_hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+network = DefaultNetwork(address="10.0.0.0/16")
+hosts = []
+for i in range(nb_hosts):
+    host = Host(f"10.0.{i // 250}.{i % 250 + 1}")
+    address = IPAddress(host.address, network)
+    host.net_devices = {NetDevice(name="eth0", addresses={address})}
+    hosts.append(host)
+
+start = time.perf_counter()
+netem = NetemHTB().add_constraints(hosts, hosts, "10ms", "1gbit", networks=[network])
+nb_constraints = sum(len(s.constraints) for s in netem.sources.values())
+print(
+    f"{nb_hosts}x{nb_hosts} mesh: {nb_constraints} constraints "
+    f"built in {time.perf_counter() - start:.2f}s"
+)
+
+start = time.perf_counter()
+_build_commands(netem.sources.values())
+print(f"commands generated in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,26 @@
+import time
+
+import enoslib as en
+from enoslib.enos_inventory import EnosInventory
+
+# Synthetic hosts (nothing is contacted)
+N = 5000
+hosts = [
+    en.Host(
+        f"10.0.{i // 250}.{i % 250}",
+        alias=f"host-{i}",
+        user="root",
+        extra=dict(gateway="access.grid5000.fr", gateway_user="user", rank=i),
+    )
+    for i in range(N)
+]
+roles = en.Roles(all=hosts, compute=hosts[: N // 2], storage=hosts[N // 2 :])
+
+start = time.time()
+EnosInventory(roles=roles)
+print(f"first build (cold cache): {time.time() - start:.3f}s")
+
+for _ in range(3):
+    start = time.time()
+    EnosInventory(roles=roles)
+    print(f"next build (warm cache): {time.time() - start:.3f}s")
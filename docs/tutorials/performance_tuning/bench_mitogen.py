@@ -0,0 +1,52 @@
+"""Module execution throughput with and without the Mitogen strategy.
+
+The fleet is made of local Docker containers (ansible_connection=docker), or
+of local hosts (ansible_connection=local) if the fleet is "local".
+
+Usage: python bench_mitogen.py [docker|local] [nb_hosts] [nb_tasks]
+"""
+import subprocess
+import sys
+import time
+
+import enoslib as en
+
+en.set_config(ansible_stdout="noop")
+
+fleet = sys.argv[1] if len(sys.argv) > 1 else "docker"
+nb_hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+nb_tasks = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+if fleet == "docker":
+    names = [f"enoslib-bench-{i}" for i in range(nb_hosts)]
+    for name in names:
+        subprocess.run(
+            ["docker", "run", "-d", "--rm", "--name", name]
+            + ["python:3-slim", "sleep", "infinity"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    hosts = [en.Host(name, extra=dict(ansible_connection="docker")) for name in names]
+else:
+    names = []
+    hosts = [en.LocalHost(alias=f"local-{i}") for i in range(nb_hosts)]
+roles = en.Roles(fleet=hosts)
+
+
+def measure(strategy):
+    # warm up (connections, module caches...)
+    with en.actions(roles=roles, strategy=strategy) as a:
+        a.command("true")
+    start = time.perf_counter()
+    with en.actions(roles=roles, strategy=strategy) as a:
+        for _ in range(nb_tasks):
+            a.command("true")
+    return nb_hosts * nb_tasks / (time.perf_counter() - start)
+
+
+try:
+    for strategy in ["linear", "mitogen_linear"]:
+        print(f"{strategy:<15}: {measure(strategy):.1f} tasks/s")
+finally:
+    for name in names:
+        subprocess.run(["docker", "kill", name], stdout=subprocess.DEVNULL)
@@ -0,0 +1,34 @@
+import time
+
+from enoslib.api import STATUS_OK, CommandResult, Results
+
+# 10000 hosts, 10 tasks
+N_HOSTS = 10000
+N_TASKS = 10
+
+results = Results(
+    CommandResult(
+        host=f"host-{h}",
+        task=f"task-{t}",
+        status=STATUS_OK,
+        payload=dict(rc=0, stdout=f"output of task-{t} on host-{h}", stderr=""),
+    )
+    for t in range(N_TASKS)
+    for h in range(N_HOSTS)
+)
+
+start = time.time()
+for h in range(100):
+    results.filter(host=f"host-{h}")
+print(f"100 filters by host: {time.time() - start:.2f}s")
+
+start = time.time()
+groups = results.groupby("task")
+print(f"groupby task: {time.time() - start:.2f}s ({len(groups)} groups)")
+
+try:
+    start = time.time()
+    df = results.to_pandas()
+    print(f"to_pandas: {time.time() - start:.2f}s ({len(df)} rows)")
+except ImportError:
+    print("to_pandas: pandas isn't installed")
@@ -0,0 +1,39 @@
+"""Per-call latency of en.run with and without a Session.
+
+Hosts are local hosts (ansible_connection=local) so that the measure
+focuses on the controller side overhead.
+
+Usage: python bench_session.py [nb_hosts] [nb_calls]
+"""
+import sys
+import time
+from statistics import mean
+
+import enoslib as en
+
+en.set_config(ansible_stdout="noop")
+
+nb_hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+nb_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+roles = en.Roles(
+    compute=[en.LocalHost(alias=f"local-{i}") for i in range(nb_hosts)]
+)
+
+
+def measure(fnc):
+    latencies = []
+    for i in range(nb_calls):
+        start = time.perf_counter()
+        fnc(f"echo {i}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+before = measure(lambda cmd: en.run(cmd, roles=roles, raw=True))
+with en.Session(roles) as session:
+    after = measure(lambda cmd: session.run(cmd, raw=True))
+
+print(f"{nb_hosts} hosts, {nb_calls} calls")
+print(f"en.run       : mean={mean(before):.3f}s min={min(before):.3f}s")
+print(f"Session.run  : mean={mean(after):.3f}s min={min(after):.3f}s")
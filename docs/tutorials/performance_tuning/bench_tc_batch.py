@@ -0,0 +1,91 @@
+"""Chained tc commands vs tc -batch.
+
+First, the commands generated for a full mesh of hosts are counted: number of
+remote executions and tc processes per host in both modes.
+
+Then (as root) the commands of one host with many targets are applied on the
+loopback of a network namespace: chunks of chained commands run by a shell
+(as the remote executions do) vs the batch piped to tc -batch.
+
+Requires the sch_netem module unless --no-netem is passed.
+
+Usage: python bench_tc_batch.py [nb_hosts] [nb_targets] [--no-netem]
+"""
+import subprocess
+import sys
+import time
+
+from enoslib.objects import Host
+from enoslib.service.emul.htb import (
+    TC_BATCH_COMMAND,
+    TC_BATCH_MAX_SIZE,
+    HTBConstraint,
+    HTBSource,
+)
+from enoslib.service.emul.utils import _build_commands, _combine, _tc_batch
+
+args = [a for a in sys.argv[1:] if a.isdigit()]
+nb_hosts = int(args[0]) if len(args) > 0 else 200
+nb_targets = int(args[1]) if len(args) > 1 else 2000
+netem = "--no-netem" not in sys.argv
+chunk_size = 100
+ns = "enoslib-tc-batch"
+
+
+def sources(nb_hosts, nb_targets):
+    targets = [f"127.0.{i // 250}.{i % 250 + 2}" for i in range(nb_targets)]
+    return [
+        HTBSource(Host(f"10.0.0.{i}")).add_constraints(
+            HTBConstraint("lo", "0ms", target)
+            for target in targets[:i] + targets[i + 1 :]
+        )
+        for i in range(nb_hosts)
+    ]
+
+
+# the command generator on a full mesh
+start = time.perf_counter()
+remove, add, htb = _build_commands(sources(nb_hosts, nb_hosts))
+chained = _combine(remove, add, htb, chunk_size=chunk_size)
+batch = _tc_batch(add, htb, max_size=TC_BATCH_MAX_SIZE)
+duration = time.perf_counter() - start
+host = next(iter(chained))
+nb_commands = len(remove[host]) + len(add[host]) + len(htb[host])
+print(f"mesh of {nb_hosts} hosts: commands generated in {duration:.2f}s")
+print(f"chained: {len(chained[host])} executions, {nb_commands} tc processes/host")
+nb_chunks = len(batch[host])
+nb_processes = len(remove[host]) + nb_chunks
+print(f"batch  : {nb_chunks + 1} executions, {nb_processes} tc processes/host")
+
+# applying the commands of one host in a network namespace
+remove, add, htb = _build_commands(sources(1, nb_targets + 1))
+if not netem:
+    htb = {a: [c for c in cmds if "netem" not in c] for a, cmds in htb.items()}
+host = next(iter(htb))
+
+
+def run(script):
+    subprocess.run(
+        ["ip", "netns", "exec", ns, "sh", "-e"],
+        input=script,
+        text=True,
+        check=True,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+subprocess.run(["ip", "netns", "add", ns], check=True)
+try:
+    start = time.perf_counter()
+    for chunk in _combine(remove, add, htb, chunk_size=chunk_size)[host]:
+        run(chunk)
+    print(f"chained: {time.perf_counter() - start:.2f}s for {nb_targets} targets")
+
+    chunks = _tc_batch(add, htb, max_size=TC_BATCH_MAX_SIZE)[host]
+    start = time.perf_counter()
+    run(" ; ".join(remove[host]) + "\n")
+    for chunk in chunks:
+        run(TC_BATCH_COMMAND.format(batch=chunk))
+    print(f"batch  : {time.perf_counter() - start:.2f}s for {nb_targets} targets")
+finally:
+    subprocess.run(["ip", "netns", "del", ns])
@@ -0,0 +1,80 @@
+"""Check the classification of the packets by the NetemHTB filters.
+
+The tc commands generated for some targets (127.0.x.y) are applied on the
+loopback device of a fresh network namespace. Some UDP datagrams are sent to
+each target and the counters of the HTB classes tell whether each datagram
+went through the slice of its target. The send rate shows the classification
+cost.
+
+Requires root (and the sch_netem module unless --no-netem is passed).
+
+Usage:
+    python validate_htb_filters.py [u32|u32_hash|flower] [nb_targets] [--no-netem]
+"""
+import re
+import subprocess
+import sys
+
+from enoslib.objects import Host
+from enoslib.service.emul.htb import HTBConstraint, HTBSource
+
+filters = sys.argv[1] if len(sys.argv) > 1 else "u32_hash"
+nb_targets = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else 1000
+netem = "--no-netem" not in sys.argv
+ns = "enoslib-htb"
+
+targets = [f"127.0.{i // 250}.{i % 250 + 2}" for i in range(nb_targets)]
+source = HTBSource(Host("localhost"))
+source.add_constraints(HTBConstraint("lo", "0ms", target) for target in targets)
+_, add, commands = source.all_commands(filters=filters)
+if not netem:
+    commands = [c for c in commands if "netem" not in c]
+# target -> class
+classes = dict(re.findall(r"dst(?:_ip)? (\S+) .*flowid (\S+)", "\n".join(commands)))
+
+subprocess.run(["ip", "netns", "add", ns], check=True)
+try:
+    subprocess.run(
+        ["ip", "netns", "exec", ns, "sh", "-e"],
+        input="\n".join(["ip link set lo up"] + add + commands),
+        text=True,
+        check=True,
+        stderr=subprocess.DEVNULL,
+    )
+    # send the datagrams from the namespace
+    sender = f"""
+import socket, sys, time
+s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+targets = {targets!r}
+for i, target in enumerate(targets):
+    for _ in range(i % 3 + 1):
+        s.sendto(b"x", (target, 9))
+start = time.perf_counter()
+for _ in range(20):
+    for target in targets:
+        s.sendto(b"x", (target, 9))
+print(20 * len(targets) / (time.perf_counter() - start))
+"""
+    rate = subprocess.run(
+        ["ip", "netns", "exec", ns, sys.executable, "-c", sender],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    stats = subprocess.run(
+        ["ip", "netns", "exec", ns, "tc", "-s", "class", "show", "dev", "lo"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    sent = re.findall(r"class htb (\S+) .*?Sent \d+ bytes (\d+) pkt", stats, re.S)
+    packets = {cls: int(pkt) for cls, pkt in sent}
+    errors = [
+        target
+        for i, target in enumerate(targets)
+        if packets.get(classes[target]) != i % 3 + 1 + 20
+    ]
+    print(f"{filters}: {nb_targets} targets, {len(errors)} misclassified")
+    print(f"{filters}: {float(rate):.0f} packets/s")
+finally:
+    subprocess.run(["ip", "netns", "del", ns])
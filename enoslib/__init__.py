@@ -8,6 +8,7 @@ from enoslib.api import (
     STATUS_OK,
     STATUS_SKIPPED,
     STATUS_UNREACHABLE,
+    Session,
     actions,
     ensure_python3,
     gather_facts,
@@ -17,10 +18,22 @@ from enoslib.api import (
     run,
     run_ansible,
     run_command,
+    run_command_iter,
     run_play,
+    run_play_iter,
     sync_info,
     wait_for,
 )
+from enoslib.aio import (
+    aactions,
+    acall,
+    agather_facts,
+    arun,
+    arun_ansible,
+    arun_command,
+    arun_play,
+    await_for,
+)
 from enoslib.config import config_context, set_config
 from enoslib.docker import DockerHost, get_dockers
 
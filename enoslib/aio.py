@@ -0,0 +1,133 @@
+"""Asynchronous versions of the remote actions.
+
+The functions of :py:mod:`enoslib.api` block until the remote actions are
+done. Their asynchronous counterparts defined here run them in a thread of
+their own so that independent phases of an experiment can overlap, e.g:
+
+.. code-block:: python
+
+    async def main():
+        await asyncio.gather(
+            en.arun("apt update", roles=roles["server"]),
+            en.acall(netem.deploy),
+        )
+
+    asyncio.run(main())
+
+Each execution has its own Ansible context, several plays can safely run
+concurrently in the same process.
+"""
+import asyncio
+import contextvars
+import threading
+from typing import Any, Callable, Dict, List, TypeVar
+
+from enoslib.api import (
+    Results,
+    actions,
+    gather_facts,
+    run,
+    run_ansible,
+    run_command,
+    run_play,
+    wait_for,
+)
+from enoslib.objects import RolesLike
+
+T = TypeVar("T")
+
+
+async def acall(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run any blocking call in a dedicated thread.
+
+    This is the way to deploy (destroy, backup ...) several services
+    concurrently, e.g ``await acall(monitoring.deploy)``.
+
+    The call doesn't use the default executor of the event loop: Ansible forks
+    its workers from the calling thread and a process forked from a thread
+    of a :py:class:`concurrent.futures.ThreadPoolExecutor` can't exit cleanly
+    (it tries to join the pool's threads).
+
+    Args:
+        func: the function to call
+        args: positional arguments of the function
+        kwargs: keyword arguments of the function
+
+    Returns:
+        The return value of the function
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    # the call uses the config of the caller (e.g config_context)
+    context = contextvars.copy_context()
+
+    def set_result(result):
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exception):
+        if not future.done():
+            future.set_exception(exception)
+
+    def target():
+        try:
+            result = context.run(func, *args, **kwargs)
+        except BaseException as e:
+            loop.call_soon_threadsafe(set_exception, e)
+        else:
+            loop.call_soon_threadsafe(set_result, result)
+
+    threading.Thread(target=target, name="enoslib-acall", daemon=True).start()
+    return await future
+
+
+async def arun(cmd: str, roles: RolesLike, **kwargs) -> Results:
+    """Asynchronous version of :py:func:`enoslib.api.run`."""
+    return await acall(run, cmd, roles, **kwargs)
+
+
+async def arun_command(command: str, **kwargs) -> Results:
+    """Asynchronous version of :py:func:`enoslib.api.run_command`."""
+    return await acall(run_command, command, **kwargs)
+
+
+async def arun_play(play_source: Dict, **kwargs) -> Results:
+    """Asynchronous version of :py:func:`enoslib.api.run_play`."""
+    return await acall(run_play, play_source, **kwargs)
+
+
+async def arun_ansible(playbooks: List[str], **kwargs) -> Results:
+    """Asynchronous version of :py:func:`enoslib.api.run_ansible`."""
+    return await acall(run_ansible, playbooks, **kwargs)
+
+
+async def agather_facts(**kwargs) -> Dict:
+    """Asynchronous version of :py:func:`enoslib.api.gather_facts`."""
+    return await acall(gather_facts, **kwargs)
+
+
+async def await_for(roles: RolesLike, **kwargs) -> Dict[str, float]:
+    """Asynchronous version of :py:func:`enoslib.api.wait_for`."""
+    return await acall(wait_for, roles, **kwargs)
+
+
+class aactions(actions):
+    """Asynchronous version of :py:class:`enoslib.api.actions`.
+
+    The actions are run when leaving the context without blocking the event
+    loop.
+
+    .. code-block:: python
+
+        async with en.aactions(roles=roles) as a:
+            a.apt(name="curl", state="present")
+        results = a.results
+
+    The ``stream`` mode isn't supported.
+    """
+
+    async def __aenter__(self) -> "aactions":
+        return self.__enter__()
+
+    async def __aexit__(self, *args: Any):
+        await acall(self.__exit__, *args)
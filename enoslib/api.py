@@ -14,24 +14,32 @@ These function can be fed with library-level objects (see :ref:`objects
     .. [#a1] https://docs.ansible.com/ansible/latest/index.html
 
 """
+import contextvars
 import copy
+import functools
 import json
 import logging
+import math
 import os
+import queue
+import random
 import signal
 import sys
+import threading
 import time
 import warnings
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict, namedtuple
-from dataclasses import dataclass, field
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from pathlib import Path
-from tempfile import NamedTemporaryFile, TemporaryDirectory
 from typing import (
     Any,
     Dict,
+    Hashable,
     Iterable,
+    Iterator,
     List,
     Mapping,
     MutableMapping,
@@ -46,12 +54,28 @@ from ansible import context
 
 # These two imports are 2.9
 from ansible.executor.playbook_executor import PlaybookExecutor
+from ansible.executor.process.worker import WorkerProcess
+from ansible.executor.stats import AggregateStats
+from ansible.executor.task_queue_manager import TaskQueueManager
 from ansible.module_utils.common.collections import ImmutableDict
+from ansible.module_utils.parsing.convert_bool import boolean
 
 # Note(msimonin): PRE 2.4 is
 # from ansible.inventory import Inventory
 from ansible.parsing.dataloader import DataLoader
+from ansible.playbook.play import Play
 from ansible.plugins.callback import CallbackBase
+from ansible.plugins.loader import (
+    PluginLoader,
+    become_loader,
+    connection_loader,
+    shell_loader,
+    strategy_loader,
+)
+from ansible.template import Templar
+from ansible.utils.display import Display
+from ansible.utils.helpers import pct_to_int
+from ansible.utils.ssh_functions import set_default_transport
 
 # Note(msimonin): PRE 2.4 is
 # from ansible.vars import VariableManager
@@ -61,14 +85,15 @@ from cryptography.hazmat.primitives import serialization as crypto_serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from rich.status import Console, Status
 
-from enoslib.config import get_config
-from enoslib.constants import ANSIBLE_DIR
-from enoslib.enos_inventory import EnosInventory
+from enoslib.config import EXECUTORS, get_config
+from enoslib.dump import DumpWriter, get_writer
+from enoslib.enos_inventory import EnosInventory, PatternResolver
 from enoslib.errors import (
     EnosFailedHostsError,
     EnosSSHNotReady,
     EnosUnreachableHostsError,
 )
+from enoslib.facts import SUBSET_ALL, FactCache, get_fact_cache
 from enoslib.html import (
     convert_to_html_table,
     html_from_dict,
@@ -78,7 +103,18 @@ from enoslib.html import (
 from enoslib.objects import Host, Networks, Roles, RolesLike
 from enoslib.utils import _hostslike_to_roles
 
+try:
+    from ansible.executor.task_queue_manager import AnsibleEndPlay
+except ImportError:  # Ansible < 2.12
+
+    class AnsibleEndPlay(Exception):  # type: ignore
+        def __init__(self, result):
+            super().__init__()
+            self.result = result
+
+
 logger = logging.getLogger(__name__)
+_display = Display()
 
 COMMAND_NAME = "enoslib_adhoc_command"
 STATUS_OK = "OK"
@@ -86,6 +122,27 @@ STATUS_FAILED = "FAILED"
 STATUS_UNREACHABLE = "UNREACHABLE"
 STATUS_SKIPPED = "SKIPPED"
 DEFAULT_ERROR_STATUSES = {STATUS_FAILED, STATUS_UNREACHABLE}
+# number of results buffered when streaming (the execution is paused when the
+# consumer doesn't keep up)
+STREAM_BUFFER_SIZE = 100
+
+# first interval (in seconds) between two probes of wait_for
+WAIT_FOR_MIN_INTERVAL = 1
+
+# Mitogen strategies and the Ansible strategies used when Mitogen isn't
+# available (see the ansible_strategy config)
+MITOGEN_STRATEGIES = {
+    "mitogen": "linear",
+    "mitogen_linear": "linear",
+    "mitogen_free": "free",
+    "mitogen_host_pinned": "host_pinned",
+}
+
+# number of hosts Ansible handles in parallel (see the ansible_forks config)
+DEFAULT_FORKS = 100
+# the workers mostly wait for the hosts: the fast profile allows this number
+# of workers per CPU
+FORKS_PER_CPU = 25
 # The following translate the keywords passed in the play_on tasks to
 # actual ansible keywords. We do that because async became a reserved keyword
 # in python3.7 so on can't write :
@@ -130,6 +187,181 @@ def _split_args(**kwargs) -> Tuple[Dict, Dict]:
     return top_args, module_args
 
 
+# Ansible loads its plugins lazily and exposes each module in sys.modules
+# before running it: a concurrent execution may get a partially loaded
+# plugin. While some executions run, the loading is serialized and the
+# worker processes aren't forked while a plugin is being loaded (the child
+# would inherit a partial module).
+_PLUGIN_LOCK = (os.getpid(), threading.RLock())
+
+
+def _plugin_lock() -> threading.RLock:
+    """The plugin loading lock of the current process."""
+    global _PLUGIN_LOCK
+    pid, lock = _PLUGIN_LOCK
+    if pid != os.getpid():
+        # forked while another thread held it
+        _PLUGIN_LOCK = pid, lock = os.getpid(), threading.RLock()
+    return lock
+
+
+def _locked(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _plugin_lock():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class _CLIArgs(Mapping):
+    """Ansible's CLI arguments of the current thread.
+
+    Ansible reads its options from the global ``context.CLIARGS``. Assigning
+    it for each execution races when several plays run concurrently (e.g
+    using the :py:mod:`enoslib.aio` API). While at least one execution runs
+    (see :py:meth:`use`), this proxy is installed as ``context.CLIARGS`` and
+    holds the arguments of each thread (the worker processes forked by
+    Ansible inherit those of the forking thread), and the plugin loading is
+    serialized. Everything is restored once the last execution ends.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._previous: Mapping = ImmutableDict()
+        self._originals: Dict[Any, Any] = {}
+
+    def get_args(self) -> Mapping:
+        args = getattr(self._local, "args", None)
+        if args is not None:
+            return args
+        with self._lock:
+            return self._previous if self._runs else context.CLIARGS
+
+    def set_args(self, args: Mapping):
+        """Set the arguments of the current thread.
+
+        They are also set globally if no execution is running.
+        """
+        self._local.args = args
+        with self._lock:
+            if not self._runs:
+                context.CLIARGS = args
+
+    @contextmanager
+    def use(self, args: Mapping):
+        """Use some arguments in the current thread for the duration of a run."""
+        previous = getattr(self._local, "args", None)
+        self._local.args = args
+        self._activate()
+        try:
+            yield
+        finally:
+            self._deactivate()
+            if previous is None:
+                del self._local.args
+            else:
+                self._local.args = previous
+
+    def _activate(self):
+        with self._lock:
+            self._runs += 1
+            if self._runs > 1:
+                return
+            self._previous = context.CLIARGS
+            context.CLIARGS = self
+            for cls, name in [
+                (PluginLoader, "_load_module_source"),
+                (WorkerProcess, "start"),
+            ]:
+                original = cls.__dict__[name]
+                self._originals[(cls, name)] = original
+                setattr(cls, name, _locked(original))
+
+    def _deactivate(self):
+        with self._lock:
+            self._runs -= 1
+            if self._runs > 0:
+                return
+            for (cls, name), original in self._originals.items():
+                setattr(cls, name, original)
+            self._originals.clear()
+            context.CLIARGS = self._previous
+
+    def __getitem__(self, key):
+        return self.get_args()[key]
+
+    def __iter__(self):
+        return iter(self.get_args())
+
+    def __len__(self):
+        return len(self.get_args())
+
+
+_CLIARGS = _CLIArgs()
+
+
+def _forks(hosts_count: int) -> int:
+    """Number of hosts Ansible handles in parallel (see ``ansible_forks``)."""
+    config = get_config()
+    if config["ansible_forks"] is not None:
+        return config["ansible_forks"]
+    if config["ansible_profile"] == "fast":
+        cpus = os.cpu_count() or 1
+        return max(1, min(hosts_count, cpus * FORKS_PER_CPU))
+    return DEFAULT_FORKS
+
+
+_mitogen_enabled: Optional[bool] = None
+_mitogen_lock = threading.Lock()
+
+
+def _enable_mitogen() -> bool:
+    """Make the Mitogen strategies available to Ansible (once).
+
+    Returns:
+        False if Mitogen isn't installed or doesn't support this Ansible.
+    """
+    global _mitogen_enabled
+    with _mitogen_lock:
+        if _mitogen_enabled is not None:
+            return _mitogen_enabled
+        try:
+            # this checks the Ansible version
+            import ansible_mitogen.loaders  # noqa: F401
+        except Exception as e:
+            logger.warning(
+                "Mitogen can't be used (%s), "
+                "falling back to the corresponding Ansible strategies",
+                e,
+            )
+            _mitogen_enabled = False
+            return False
+        strategy_loader.add_directory(
+            str(Path(ansible_mitogen.__file__).parent / "plugins" / "strategy")
+        )
+        _mitogen_enabled = True
+        return True
+
+
+def _strategy(strategy: Optional[str]) -> Optional[str]:
+    """Get the strategy to run a play with.
+
+    Args:
+        strategy: the strategy set in the play (None if not set)
+
+    Returns:
+        None if Ansible must use its default strategy.
+    """
+    if strategy is None:
+        strategy = get_config()["ansible_strategy"]
+    if strategy in MITOGEN_STRATEGIES and not _enable_mitogen():
+        return MITOGEN_STRATEGIES[strategy]
+    return strategy
+
+
 def _load_defaults(
     inventory_path: Optional[Union[List, str]] = None,
     roles: Optional[Mapping] = None,
@@ -170,36 +402,41 @@ def _load_defaults(
     # NOTE(msimonin): The ansible api is "low level" in the
     # sense that we are redefining here all the default values
     # that are usually enforce by ansible called from the cli
-    context.CLIARGS = ImmutableDict(
-        start_at_task=None,
-        listtags=False,
-        listtasks=False,
-        listhosts=False,
-        syntax=False,
-        connection="ssh",
-        module_path=None,
-        forks=100,
-        private_key_file=None,
-        ssh_common_args=None,
-        ssh_extra_args=None,
-        sftp_extra_args=None,
-        scp_extra_args=None,
-        become=False,
-        become_method="sudo",
-        become_user="root",
-        remote_user=None,
-        verbosity=2,
-        check=False,
-        tags=tags,
-        diff=None,
-        basedir=basedir,
+    _CLIARGS.set_args(
+        ImmutableDict(
+            start_at_task=None,
+            listtags=False,
+            listtasks=False,
+            listhosts=False,
+            syntax=False,
+            connection="ssh",
+            module_path=None,
+            forks=_forks(len(inventory.hosts)),
+            private_key_file=None,
+            ssh_common_args=None,
+            ssh_extra_args=None,
+            sftp_extra_args=None,
+            scp_extra_args=None,
+            become=False,
+            become_method="sudo",
+            become_user="root",
+            remote_user=None,
+            verbosity=2,
+            check=False,
+            tags=tags,
+            diff=None,
+            basedir=basedir,
+        )
     )
 
     return inventory, variable_manager, loader
 
 
 _AnsibleExecutionRecord = namedtuple(
-    "_AnsibleExecutionRecord", ["host", "status", "task", "payload"]
+    "_AnsibleExecutionRecord",
+    ["host", "status", "task", "payload", "start", "end"],
+    # when the task started and ended on the host (timestamps)
+    defaults=[None, None],
 )
 
 
@@ -235,21 +472,35 @@ class SpinnerCallback(CallbackBase):
 
     Design goals:
         - compatible with linear/free execution strategy
+        - constant work per event: the spinner shows the number of hosts per
+          status (only the failed hosts are named) and is redrawn at most
+          every ``REFRESH_INTERVAL`` seconds
     """
 
     CALLBACK_VERSION = 2.0
     CALLBACK_NAME = "spinner"
     CALLBACK_TYPE = "stdout"
 
+    # minimal delay between two redraws (in seconds)
+    REFRESH_INTERVAL = 0.1
+    # maximal number of failed hosts named in the spinner
+    MAX_FAILED_HOSTS = 10
+
     def __init__(self):
         super().__init__()
-        self.running_tasks: Dict = defaultdict(dict)
+        self.running_tasks: Dict[str, Dict[str, HostStatus]] = defaultdict(dict)
+        # number of hosts per status for each task
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        # hosts failed (or unreachable) for each task, in order
+        self.failed_hosts: Dict[str, Dict[str, HostStatus]] = defaultdict(dict)
         self.console = Console()
         self.status = None
         self.tasks_lst = []
         # keep track of all the hosts involved
         # by at least one task
         self.hosts_set = set()
+        self._last_task: Optional[str] = None
+        self._last_refresh = 0.0
 
     def v2_runner_on_start(self, host, task):
         """
@@ -261,45 +512,80 @@ class SpinnerCallback(CallbackBase):
             update the spinner
         """
         task_name = task.get_name()
-        if task_name not in self.tasks_lst:
+        if task_name not in self.running_tasks:
             self.tasks_lst.append(task_name)
-        self.running_tasks[task_name][host.name] = HostStatus.NEUTRAL
+        self.hosts_set.add(host.name)
+        self._set_status(task_name, host.name, HostStatus.NEUTRAL)
+
+    def _set_status(self, task_name: str, host: str, status: HostStatus):
+        hosts_status = self.running_tasks[task_name]
+        counts = self.counts[task_name]
+        previous = hosts_status.get(host)
+        if previous is not None:
+            counts[previous] -= 1
+        counts[status] += 1
+        hosts_status[host] = status
+        if status in (HostStatus.FAILED, HostStatus.UNREACHABLE):
+            self.failed_hosts[task_name][host] = status
         self.update(task_name)
 
+    def _render(self, task_name: str) -> str:
+        counts = self.counts[task_name]
+        labels = [
+            (HostStatus.NEUTRAL, "pending"),
+            (HostStatus.OK, "ok"),
+            (HostStatus.SKIPPED, "skipped"),
+            (HostStatus.FAILED, "failed"),
+            (HostStatus.UNREACHABLE, "unreachable"),
+        ]
+        counts_str = ", ".join(
+            status.value % f"{counts[status]} {label}"
+            for status, label in labels
+            if counts[status] > 0
+        )
+        status_str = (
+            f"[bold blue]Running[/bold blue] [magenta]{task_name}[/magenta] "
+            f"on {len(self.running_tasks[task_name])} hosts ({counts_str})"
+        )
+        failed = self.failed_hosts[task_name]
+        if failed:
+            named = list(failed.items())[: self.MAX_FAILED_HOSTS]
+            status_str += ": " + " ".join(status.value % h for h, status in named)
+            if len(failed) > len(named):
+                status_str += f" (+{len(failed) - len(named)} more)"
+        return status_str
+
     def update(self, task_name: str):
         # fire a new spinner if it doesn't exist
         if self.status is None:
             self.status = Status("", console=self.console)
             self.status.start()
-        hosts_status = self.running_tasks[task_name]
-        status_str = " ".join(
-            [status.value % host for (host, status) in hosts_status.items()]
-        )
-        self.hosts_set = self.hosts_set.union(list(hosts_status.keys()))
-        self.status.update(
-            f"[bold blue]Running[/bold blue] [magenta]{task_name}[/magenta] "
-            f"on {status_str}"
-        )
+        now = time.monotonic()
+        # redraw right away when another task shows up
+        if (
+            task_name == self._last_task
+            and now - self._last_refresh < self.REFRESH_INTERVAL
+        ):
+            return
+        self._last_task = task_name
+        self._last_refresh = now
+        self.status.update(self._render(task_name))
 
     def v2_runner_on_failed(self, result, ignore_errors: bool = False):
         if not ignore_errors:
             status = HostStatus.FAILED
         else:
             status = HostStatus.OK
-        self.running_tasks[result.task_name][result._host.name] = status
-        self.update(result.task_name)
+        self._set_status(result.task_name, result._host.name, status)
 
     def v2_runner_on_ok(self, result, ignore_errors: bool = False):
-        self.running_tasks[result.task_name][result._host.name] = HostStatus.OK
-        self.update(result.task_name)
+        self._set_status(result.task_name, result._host.name, HostStatus.OK)
 
     def v2_runner_on_unreachable(self, result):
-        self.running_tasks[result.task_name][result._host.name] = HostStatus.UNREACHABLE
-        self.update(result.task_name)
+        self._set_status(result.task_name, result._host.name, HostStatus.UNREACHABLE)
 
     def v2_runner_on_skipped(self, result):
-        self.running_tasks[result.task_name][result._host.name] = HostStatus.SKIPPED
-        self.update(result.task_name)
+        self._set_status(result.task_name, result._host.name, HostStatus.SKIPPED)
 
     def v2_playbook_on_stats(self, stats):
         if self.status:
@@ -307,8 +593,16 @@ class SpinnerCallback(CallbackBase):
         tasks_str = ",".join(self.tasks_lst)
         self.console.print(
             f"[bold blue]Finished {len(self.running_tasks)} tasks[/bold blue] "
-            f"[italic]({tasks_str})[/italic] on {self.hosts_set}"
+            f"[italic]({tasks_str})[/italic] on {len(self.hosts_set)} hosts"
         )
+        failed = {
+            host: status
+            for failed_hosts in self.failed_hosts.values()
+            for host, status in failed_hosts.items()
+        }
+        if failed:
+            failed_str = " ".join(status.value % h for h, status in failed.items())
+            self.console.print(f"[bold red]Failed[/bold red] on {failed_str}")
         self.console.rule()
 
     def __del__(self):
@@ -323,23 +617,115 @@ class _MyCallback(CallbackBase):
     CALLBACK_VERSION = 2.0
     CALLBACK_NAME = "mycallback"
 
-    def __init__(self, storage):
+    def __init__(self, storage, max_payload_size: Optional[int] = None):
         super().__init__()
+        # anything with an append method
         self.storage = storage
+        self.max_payload_size = max_payload_size
         self.display_ok_hosts = True
         self.display_skipped_hosts = True
         self.display_failed_stderr = True
         # since 2.9
         self.set_option("show_per_host_start", True)
 
+        # early abort (see watch_failures)
+        self._tqm: Optional[TaskQueueManager] = None
+        self.max_failures: Optional[int] = None
+        self.max_fail_ratio: Optional[float] = None
+        self._failed_hosts: Set[str] = set()
+        self._hosts_count = 0
+        self.aborted = False
+
+        # dump of the results (see v2_playbook_on_play_start)
+        self._dump: Optional[DumpWriter] = None
+        self._dump_max_payload_size: Optional[int] = None
+
+        # when each (host, task uuid) started
+        self._starts: Dict[Tuple[str, str], float] = {}
+
+    def watch_failures(
+        self,
+        tqm: Optional[TaskQueueManager],
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+    ):
+        """Stop the execution as soon as too many hosts failed in a play.
+
+        Args:
+            tqm: the task queue manager to stop (None disables the watch)
+            max_failures: stop when more than this number of hosts failed
+                (or are unreachable)
+            max_fail_ratio: stop when more than this ratio (0 < ratio < 1)
+                of the hosts targeted by the play failed (or are unreachable)
+        """
+        self._tqm = tqm
+        self.max_failures = max_failures
+        self.max_fail_ratio = max_fail_ratio
+        self._failed_hosts = set()
+        self.aborted = False
+
+    def _too_many_failures(self) -> bool:
+        failures = len(self._failed_hosts)
+        if self.max_failures is not None and failures > self.max_failures:
+            return True
+        if (
+            self.max_fail_ratio is not None
+            and self._hosts_count > 0
+            and failures / self._hosts_count > self.max_fail_ratio
+        ):
+            return True
+        return False
+
     def _store(self, result, status):
+        end = time.time()
+        payload = result._result
+        if self.max_payload_size is not None:
+            payload = _truncate_payload(payload, self.max_payload_size)
+        host = result._host.get_name()
         record = _AnsibleExecutionRecord(
-            host=result._host.get_name(),
+            host=host,
             status=status,
             task=result._task.get_name(),
-            payload=result._result,
+            payload=payload,
+            start=self._starts.pop((host, result._task._uuid), None),
+            end=end,
         )
+        if self._dump is not None:
+            # dumped before being consumed (e.g when streaming)
+            _dump_results(
+                [BaseCommandResult.from_play(record)],
+                self._dump,
+                max_payload_size=self._dump_max_payload_size,
+            )
         self.storage.append(record)
+        if self._tqm is None or status not in DEFAULT_ERROR_STATUSES:
+            return
+        self._failed_hosts.add(record.host)
+        if not self.aborted and self._too_many_failures():
+            logger.error(
+                "Aborting the execution: %s hosts failed out of %s",
+                len(self._failed_hosts),
+                self._hosts_count,
+            )
+            self.aborted = True
+            self._tqm.terminate()
+
+    def v2_runner_on_start(self, host, task):
+        self._starts[(host.get_name(), task._uuid)] = time.time()
+
+    def v2_playbook_on_stats(self, stats):
+        super().v2_playbook_on_stats(stats)
+        if self._dump is not None:
+            # the execution is over (ends the compressed frame)
+            self._dump.close()
+
+    def v2_playbook_on_play_start(self, play):
+        super().v2_playbook_on_play_start(play)
+        self._dump = get_writer()
+        self._dump_max_payload_size = get_config().get("dump_max_payload_size")
+        if self._tqm is not None:
+            self._failed_hosts = set()
+            self._hosts_count = len(self._tqm._inventory.get_hosts(play.hosts))
 
     def v2_runner_on_failed(self, result, ignore_errors=False):
         super().v2_runner_on_failed(result)
@@ -361,6 +747,108 @@ class _MyCallback(CallbackBase):
         self._store(result, STATUS_UNREACHABLE)
 
 
+def _truncate_payload(payload: Dict, max_size: int) -> Dict:
+    """Truncate the outputs of a payload to max_size characters.
+
+    A ``truncated`` key is added to the payload if something was truncated.
+    """
+    truncated = None
+    for key in ["stdout", "stderr", "msg"]:
+        value = payload.get(key)
+        if not isinstance(value, str) or len(value) <= max_size:
+            continue
+        if truncated is None:
+            truncated = dict(payload, truncated=True)
+        truncated[key] = value[:max_size]
+        if f"{key}_lines" in payload:
+            truncated[f"{key}_lines"] = truncated[key].splitlines()
+    return truncated if truncated is not None else payload
+
+
+class _RecordStream:
+    """Bounded channel between the callback and a consumer of the records.
+
+    The records in error are kept aside to raise the errors once everything
+    has been consumed.
+    """
+
+    _END = object()
+
+    def __init__(self, maxsize: int = STREAM_BUFFER_SIZE):
+        # room for the end marker when the stream is discarded
+        self._queue: queue.Queue = queue.Queue(max(2, maxsize))
+        self._discarded = threading.Event()
+        self.errors: List[_AnsibleExecutionRecord] = []
+
+    def append(self, record: _AnsibleExecutionRecord):
+        if record.status in DEFAULT_ERROR_STATUSES:
+            self.errors.append(record)
+        if not self._discarded.is_set():
+            self._queue.put(record)
+
+    def close(self):
+        """Signal the consumer that no more records will come."""
+        if not self._discarded.is_set():
+            self._queue.put(self._END)
+
+    def discard(self):
+        """Drop all the pending and future records."""
+        self._discarded.set()
+        # unblock the producer if it's waiting for some room
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def __iter__(self) -> Iterator[_AnsibleExecutionRecord]:
+        while True:
+            record = self._queue.get()
+            if record is self._END:
+                return
+            yield record
+
+
+def _stdout_callback() -> Optional[CallbackBase]:
+    """Build the stdout callback according to the current config.
+
+    Returns:
+        None if the ansible.cfg must govern the stdout callback.
+    """
+    ansible_stdout = get_config()["ansible_stdout"]
+    if ansible_stdout == "noop":
+        return NoopCallback()
+    if ansible_stdout == "spinner":
+        return SpinnerCallback()
+    # let the ansible.cfg governs this
+    return None
+
+
+def _check_results(results: Iterable, on_error_continue: bool):
+    """Raise an error if some hosts failed or were unreachable.
+
+    Args:
+        results: the records (or results) collected during the execution
+        on_error_continue: only log the errors if True
+    """
+    failed_hosts = []
+    unreachable_hosts = []
+    for r in results:
+        if r.status == STATUS_UNREACHABLE:
+            unreachable_hosts.append(r)
+        if r.status == STATUS_FAILED:
+            failed_hosts.append(r)
+
+    if len(failed_hosts) > 0:
+        logger.error("Failed hosts: %s", failed_hosts)
+        if not on_error_continue:
+            raise EnosFailedHostsError(failed_hosts)
+    if len(unreachable_hosts) > 0:
+        logger.error("Unreachable hosts: %s", unreachable_hosts)
+        if not on_error_continue:
+            raise EnosUnreachableHostsError(unreachable_hosts)
+
+
 @dataclass
 class BaseCommandResult:
     # mypy https://github.com/python/mypy/issues/5374
@@ -369,11 +857,21 @@ class BaseCommandResult:
     task: str
     status: str
     payload: Dict
+    # when the task started and ended on the host (timestamps)
+    start: Optional[float] = None
+    end: Optional[float] = None
 
     @abstractmethod
     def _payload_keys(self):
         ...
 
+    @property
+    def duration(self) -> Optional[float]:
+        """Time (in seconds) the task took on the host (None if unknown)."""
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
     def ok(self) -> bool:
         return self.status == STATUS_OK
 
@@ -434,7 +932,14 @@ class BaseCommandResult:
         d = {name: self.payload.get(name) for name in self._payload_keys()}
         if include_payload:
             d.update(payload=self.payload)
-        return dict(host=self.host, task=self.task, status=self.status, **d)
+        return dict(
+            host=self.host,
+            task=self.task,
+            status=self.status,
+            start=self.start,
+            end=self.end,
+            **d,
+        )
 
 
 class CommandResult(BaseCommandResult):
@@ -452,6 +957,12 @@ class CustomCommandResult(BaseCommandResult):
         return []
 
 
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of some sorted values."""
+    rank = math.ceil(q / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
 class Results(list):
     """Container for CommandResult**s**
 
@@ -485,13 +996,266 @@ class Results(list):
 
             # print the stdout of "Get date" tasks on all hosts
             print([res.stdout for res in result.filter(task="Get date")])
+
+    Filtering (or grouping) by host, task or status uses some indexes built
+    on first use and invalidated when the container is mutated.
+
+    Each result records when the task started and ended on the host, see
+    :py:meth:`~enoslib.api.Results.task_timings`,
+    :py:meth:`~enoslib.api.Results.slowest_hosts` and
+    :py:meth:`~enoslib.api.Results.to_chrome_trace`.
     """
 
+    # filtering on those keys uses an index
+    _INDEXED_KEYS = ("host", "task", "status")
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {}
+
+    def _invalidate(self):
+        self._indexes = {}
+
+    def _index(self, key: str) -> Dict[Any, List[int]]:
+        """Get (or build) the index of the results by key.
+
+        Returns:
+            A dict mapping each value of the key to the (sorted) positions of
+            the results with this value.
+        """
+        index = self._indexes.get(key)
+        if index is None:
+            index = defaultdict(list)
+            for i, result in enumerate(self):
+                index[getattr(result, key)].append(i)
+            self._indexes[key] = index = dict(index)
+        return index
+
     def filter(self, **kwargs) -> "Results":
-        return Results([c for c in self if c.match(**kwargs)])
+        indexed = {
+            k: v
+            for k, v in kwargs.items()
+            if k in self._INDEXED_KEYS and isinstance(v, Hashable)
+        }
+        if not indexed:
+            return Results([c for c in self if c.match(**kwargs)])
+        candidates: Optional[Set[int]] = None
+        for k, v in indexed.items():
+            positions = self._index(k).get(v, [])
+            if candidates is None:
+                candidates = set(positions)
+            else:
+                candidates.intersection_update(positions)
+        assert candidates is not None
+        others = {k: v for k, v in kwargs.items() if k not in indexed}
+        return Results(
+            [self[i] for i in sorted(candidates) if self[i].match(**others)]
+        )
 
     def ok(self, **kwargs) -> "Results":
-        return Results([c for c in self if c.ok()])
+        return self.filter(status=STATUS_OK)
+
+    def groupby(self, key: str = "task") -> Dict[Any, "Results"]:
+        """Group the results.
+
+        Args:
+            key: the attribute to group the results by (e.g. host, task,
+                status)
+
+        Returns:
+            A dict mapping each value of the key to the corresponding results
+            (in the order of the container).
+        """
+        if key in self._INDEXED_KEYS:
+            return {
+                v: Results([self[i] for i in positions])
+                for v, positions in self._index(key).items()
+            }
+        groups: Dict[Any, Results] = {}
+        for result in self:
+            groups.setdefault(getattr(result, key), Results()).append(result)
+        return groups
+
+    def task_timings(self) -> Dict[str, Dict[str, float]]:
+        """Statistics of the durations of each task.
+
+        The results whose duration is unknown are ignored.
+
+        Returns:
+            A dict mapping each task to the number of hosts (count), the
+            median (p50), the 95th percentile (p95) and the maximum (max)
+            durations in seconds.
+        """
+        timings = {}
+        for task, results in self.groupby("task").items():
+            durations = sorted(
+                r.duration for r in results if r.duration is not None
+            )
+            if not durations:
+                continue
+            timings[task] = dict(
+                count=len(durations),
+                p50=_percentile(durations, 50),
+                p95=_percentile(durations, 95),
+                max=durations[-1],
+            )
+        return timings
+
+    def slowest_hosts(self, top: int = 10) -> List[Tuple[str, float]]:
+        """The hosts that spent the most time running the tasks.
+
+        Args:
+            top: number of hosts to return
+
+        Returns:
+            The hosts and their total duration (in seconds), the slowest
+            first.
+        """
+        totals: Dict[str, float] = defaultdict(float)
+        for r in self:
+            if r.duration is not None:
+                totals[r.host] += r.duration
+        return sorted(totals.items(), key=lambda t: t[1], reverse=True)[:top]
+
+    def to_chrome_trace(self, path: Optional[Union[Path, str]] = None) -> Dict:
+        """Get the timeline of the results in the Chrome trace format.
+
+        The trace can be opened in https://ui.perfetto.dev or
+        ``chrome://tracing``: one row per host, one span per task. Combine
+        the results of several remote actions (e.g ``Results(r1 + r2)``) to
+        get the timeline of a whole experiment.
+
+        Args:
+            path: also write the trace (JSON) to this file
+
+        Returns:
+            The trace
+        """
+        timed = [r for r in self if r.start is not None and r.end is not None]
+        origin = min((r.start for r in timed), default=0)
+        tids: Dict[str, int] = {}
+        events: List[Dict] = []
+        for r in timed:
+            if r.host not in tids:
+                tids[r.host] = len(tids)
+                events.append(
+                    dict(
+                        name="thread_name",
+                        ph="M",
+                        pid=0,
+                        tid=tids[r.host],
+                        args=dict(name=r.host),
+                    )
+                )
+            events.append(
+                dict(
+                    name=r.task,
+                    cat=r.status,
+                    ph="X",
+                    ts=(r.start - origin) * 1e6,
+                    dur=(r.end - r.start) * 1e6,
+                    pid=0,
+                    tid=tids[r.host],
+                    args=dict(status=r.status, rc=r.payload.get("rc")),
+                )
+            )
+        trace = dict(traceEvents=events, displayTimeUnit="ms")
+        if path is not None:
+            Path(path).write_text(json.dumps(trace))
+        return trace
+
+    def _columns(self) -> Dict[str, List]:
+        columns: Dict[str, List] = {
+            k: []
+            for k in ["host", "task", "status", "start", "end"]
+            + ["rc", "stdout", "stderr"]
+        }
+        for r in self:
+            columns["host"].append(r.host)
+            columns["task"].append(r.task)
+            columns["status"].append(r.status)
+            columns["start"].append(r.start)
+            columns["end"].append(r.end)
+            # references to the payload values: nothing is copied here
+            payload = r.payload
+            columns["rc"].append(payload.get("rc"))
+            columns["stdout"].append(payload.get("stdout"))
+            columns["stderr"].append(payload.get("stderr"))
+        return columns
+
+    def to_pandas(self):
+        """Get a pandas representation of the results.
+
+        One row per result with the host, task, status, start, end, rc,
+        stdout and stderr columns (the payloads aren't part of it).
+
+        Returns:
+            A pandas dataframe
+        """
+        import pandas as pd  # pylint: disable=import-error
+
+        return pd.DataFrame(self._columns())
+
+    def to_arrow(self):
+        """Get an Apache Arrow representation of the results.
+
+        See :py:meth:`~enoslib.api.Results.to_pandas` for the columns.
+
+        Returns:
+            A pyarrow table
+        """
+        import pyarrow as pa  # pylint: disable=import-error
+
+        return pa.table(self._columns())
+
+    # mutations invalidate the indexes
+    def append(self, item):
+        super().append(item)
+        self._invalidate()
+
+    def extend(self, items):
+        super().extend(items)
+        self._invalidate()
+
+    def insert(self, i, item):
+        super().insert(i, item)
+        self._invalidate()
+
+    def pop(self, *args):
+        self._invalidate()
+        return super().pop(*args)
+
+    def remove(self, item):
+        super().remove(item)
+        self._invalidate()
+
+    def clear(self):
+        super().clear()
+        self._invalidate()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._invalidate()
+
+    def reverse(self):
+        super().reverse()
+        self._invalidate()
+
+    def __setitem__(self, i, item):
+        super().__setitem__(i, item)
+        self._invalidate()
+
+    def __delitem__(self, i):
+        super().__delitem__(i)
+        self._invalidate()
+
+    def __iadd__(self, items: Iterable[Any]) -> "Results":  # type: ignore[misc]
+        self._invalidate()
+        return super().__iadd__(items)
+
+    def __imul__(self, n) -> "Results":  # type: ignore[misc]
+        self._invalidate()
+        return super().__imul__(n)
 
     @repr_html_check
     def _repr_html_(self, content_only: bool = False) -> str:
@@ -583,6 +1347,9 @@ def run_play(
     roles: Optional[RolesLike] = None,
     extra_vars: Optional[MutableMapping] = None,
     on_error_continue: bool = False,
+    max_failures: Optional[int] = None,
+    max_fail_ratio: Optional[float] = None,
+    facts: Optional[Mapping[str, Dict]] = None,
 ) -> Results:
     """Run a play.
 
@@ -593,6 +1360,13 @@ def run_play(
         extra_vars (dict): extra_vars to use
         on_error_continue (bool): Don't throw any exception in case a host is
             unreachable or the playbooks run with errors
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable)
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the targeted hosts failed (or are
+            unreachable)
+        facts (dict): facts of the hosts (by alias) to use instead of
+            gathering them
 
     Raises:
         :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
@@ -603,26 +1377,563 @@ def run_play(
     Returns:
         List of all the results
     """
-    # create a temporary file for holding the playbook beware that the file
-    # might be re-opened during the context manager block and that lead to
-    # unknown behavior on non-unix system In case of trouble, we might want to
-    # have a homemade tempfile generation.
+    # The play is built in memory and pushed directly to Ansible: nothing is
+    # written on disk (this matters on NFS home directories).
     #
-    # This is super important to generate the file in the current directory avs
-    # users often copy/sync file to remote machines using relative path on the
-    # local machine. In Ansible, such path is relative to the playbook location.
-    with NamedTemporaryFile(dir=Path.cwd()) as _tmp_file:
-        play_path = Path(_tmp_file.name)
-        logger.debug("Generating playbook in %s ", play_path)
-        play_path.write_text(json.dumps([play_source]))
-        return run_ansible(
-            [str(play_path)],
-            inventory_path=inventory_path,
-            roles=roles,
+    # The current directory is kept as the Ansible basedir as users often
+    # copy/sync file to remote machines using relative path on the local
+    # machine. In Ansible, such path is relative to the playbook location.
+    with Session(
+        roles, inventory_path=inventory_path, extra_vars=extra_vars, facts=facts
+    ) as session:
+        return session.run_play(
+            play_source,
+            on_error_continue=on_error_continue,
+            max_failures=max_failures,
+            max_fail_ratio=max_fail_ratio,
+        )
+
+
+def run_play_iter(
+    play_source: Dict,
+    *,
+    inventory_path: Optional[Union[str, List]] = None,
+    roles: Optional[RolesLike] = None,
+    extra_vars: Optional[MutableMapping] = None,
+    on_error_continue: bool = False,
+    max_payload_size: Optional[int] = None,
+    max_failures: Optional[int] = None,
+    max_fail_ratio: Optional[float] = None,
+    facts: Optional[Mapping[str, Dict]] = None,
+) -> Iterator[BaseCommandResult]:
+    """Run a play and yield the results as each host completes.
+
+    Unlike :py:func:`~enoslib.api.run_play` the results aren't buffered
+    until the end of the play: they can be processed incrementally and the
+    memory used is bounded.
+
+    Args:
+        play_source (dict): ansible play
+        inventory_path (str): inventory to use
+        roles: host like datastructure used as a drop in replacement for an
+            inventory.
+        extra_vars (dict): extra_vars to use
+        on_error_continue (bool): Don't throw any exception in case a host is
+            unreachable or the playbooks run with errors
+        max_payload_size: truncate the outputs (stdout, stderr, msg) of the
+            results to this number of characters
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable)
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the targeted hosts failed (or are
+            unreachable)
+        facts (dict): facts of the hosts (by alias) to use instead of
+            gathering them
+
+    Raises:
+        :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
+            error on a host and ``on_error_continue==False``
+        :py:class:`enoslib.errors.EnosUnreachableHostsError`: if a host is
+            unreachable (through ssh) and ``on_error_continue==False``.
+        The errors are raised once all the results have been yielded.
+
+    Yields:
+        The results, one per host and task
+    """
+    with Session(
+        roles, inventory_path=inventory_path, extra_vars=extra_vars, facts=facts
+    ) as session:
+        yield from session.run_play_iter(
+            play_source,
+            on_error_continue=on_error_continue,
+            max_payload_size=max_payload_size,
+            max_failures=max_failures,
+            max_fail_ratio=max_fail_ratio,
+        )
+
+
+def _serialized_batches(inventory: EnosInventory, play: Play) -> List[List]:
+    """Split the hosts of a play in batches according to its ``serial``.
+
+    This is the same as :py:meth:`PlaybookExecutor._get_serialized_batches`.
+    """
+    hosts = inventory.get_hosts(play.hosts, order=play.order)
+    total = len(hosts)
+    serials = play.serial or [-1]
+    batches = []
+    i = 0
+    while hosts:
+        serial = pct_to_int(serials[i], total)
+        if serial <= 0:
+            batches.append(hosts)
+            break
+        batches.append(hosts[:serial])
+        hosts = hosts[serial:]
+        i = min(i + 1, len(serials) - 1)
+    return batches
+
+
+class Session:
+    """Keep the Ansible machinery warm across several remote actions.
+
+    Each call to :py:func:`~enoslib.api.run_command` or
+    :py:class:`~enoslib.api.actions` builds a new inventory, a new variable
+    manager and a new task queue manager. On large deployments this setup
+    cost dominates when many small commands are issued. A session builds
+    those objects once and only pushes the new plays through them.
+
+    Note that Ansible still forks its workers for each task: what is reused
+    is everything around them (inventory, variables, loaded plugins,
+    callbacks). Facts gathered in a session are also kept and can be used by
+    the subsequent plays of this session.
+
+    Args:
+        roles: the roles to use for the whole session
+        inventory_path: inventory to use (replacement for roles)
+        extra_vars: extra_vars to use for every play of the session
+        basedir: Ansible basedir (relative paths are resolved against it),
+            default to the current working directory.
+        facts: facts of the hosts (by alias) to use instead of gathering them
+
+    Examples:
+
+        .. code-block:: python
+
+            with en.Session(roles) as s:
+                for i in range(100):
+                    s.run(f"echo {i}", pattern_hosts="compute")
+                with s.actions(pattern_hosts="control") as a:
+                    a.apt(name="htop", state="present")
+                results = a.results
+    """
+
+    def __init__(
+        self,
+        roles: Optional[RolesLike] = None,
+        *,
+        inventory_path: Optional[Union[str, List]] = None,
+        extra_vars: Optional[MutableMapping] = None,
+        basedir: Optional[str] = None,
+        facts: Optional[Mapping[str, Dict]] = None,
+    ):
+        self.roles = _hostslike_to_roles(roles)
+        self.inventory_path = inventory_path
+        self.extra_vars = dict(extra_vars) if extra_vars is not None else {}
+        self.basedir = basedir if basedir is not None else str(Path.cwd())
+        self.facts = dict(facts) if facts is not None else {}
+
+        # populated when the session is opened
+        self._inventory: Optional[EnosInventory] = None
+        self._variable_manager: Optional[VariableManager] = None
+        self._loader: Optional[DataLoader] = None
+        self._tqm: Optional[TaskQueueManager] = None
+        self._callback: Optional[_MyCallback] = None
+        self._cli_args: Mapping = ImmutableDict()
+
+    def open(self) -> "Session":
+        """Build the Ansible objects (idempotent)."""
+        if self._tqm is not None:
+            return self
+        inventory, variable_manager, loader = _load_defaults(
+            inventory_path=self.inventory_path,
+            roles=self.roles,
+            extra_vars=copy.deepcopy(self.extra_vars),
+            basedir=self.basedir,
+        )
+        # the plays of this session may run in other threads
+        self._cli_args = _CLIARGS.get_args()
+        with _CLIARGS.use(self._cli_args):
+            tqm = TaskQueueManager(
+                inventory=inventory,
+                variable_manager=variable_manager,
+                loader=loader,
+                passwords={},
+                forks=self._cli_args.get("forks"),
+            )
+            # same preloading as the PlaybookExecutor
+            set_default_transport()
+            list(connection_loader.all(class_only=True))
+            list(shell_loader.all(class_only=True))
+            list(become_loader.all(class_only=True))
+
+        self._callback = _MyCallback([])
+        # hack ahead
+        tqm._callback_plugins.append(self._callback)
+        self._inventory = inventory
+        self._variable_manager = variable_manager
+        self._loader = loader
+        self._tqm = tqm
+        self.set_facts(self.facts)
+        return self
+
+    def set_facts(self, facts: Mapping[str, Dict]):
+        """Set the facts of some hosts (by alias) for the next plays."""
+        self.facts.update(facts)
+        if self._variable_manager is None:
+            return
+        for alias, host_facts in facts.items():
+            self._variable_manager.set_host_facts(alias, host_facts)
+
+    def close(self):
+        """Release the Ansible objects."""
+        if self._tqm is None:
+            return
+        try:
+            self._tqm.cleanup()
+        finally:
+            if self._loader is not None:
+                self._loader.cleanup_all_tmp_files()
+            self._tqm = None
+            self._callback = None
+            self._inventory = None
+            self._variable_manager = None
+            self._loader = None
+
+    def __enter__(self) -> "Session":
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _load_play(self, play_source: Dict) -> Play:
+        self.open()
+        strategy = _strategy(play_source.get("strategy"))
+        if strategy is not None:
+            play_source = dict(play_source, strategy=strategy)
+        logger.debug(play_source)
+        with _CLIARGS.use(self._cli_args):
+            return Play.load(
+                play_source,
+                variable_manager=self._variable_manager,
+                loader=self._loader,
+            )
+
+    def _run_plays(
+        self,
+        plays: List[Play],
+        extra_vars: Optional[MutableMapping] = None,
+        storage: Optional[Any] = None,
+        max_payload_size: Optional[int] = None,
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+    ) -> Any:
+        """Push some plays through the task queue manager.
+
+        This mimics what the PlaybookExecutor does for each play.
+
+        Returns:
+            The storage where the records have been appended
+            (a new list if no storage is given).
+        """
+        self.open()
+        assert self._tqm is not None
+        assert self._inventory is not None
+        assert self._variable_manager is not None
+        assert self._callback is not None
+        tqm = self._tqm
+        records = storage if storage is not None else []
+        self._callback.storage = records
+        self._callback.max_payload_size = max_payload_size
+        if max_failures is not None or max_fail_ratio is not None:
+            self._callback.watch_failures(tqm, max_failures, max_fail_ratio)
+        else:
+            self._callback.watch_failures(None)
+
+        # every run is independent from the previous ones
+        tqm._terminated = False
+        tqm.clear_failed_hosts()
+        tqm._unreachable_hosts = dict()
+        tqm._stats = AggregateStats()
+        stdout_callback = _stdout_callback()
+        if stdout_callback is not None:
+            tqm._stdout_callback = stdout_callback
+
+        session_extra_vars = self._variable_manager._extra_vars
+        if extra_vars:
+            _extra_vars = copy.deepcopy(session_extra_vars)
+            _extra_vars.update(extra_vars)
+            self._variable_manager._extra_vars = _extra_vars
+        try:
+            with _CLIARGS.use(self._cli_args):
+                for play in plays:
+                    # clear any filters which may have been applied to the inventory
+                    self._inventory.remove_restriction()
+                    self._prompt_vars(play)
+                    all_vars = self._variable_manager.get_vars(play=play)
+                    templar = Templar(loader=self._loader, variables=all_vars)
+                    play.post_validate(templar)
+                    if not self._run_batches(play):
+                        break
+                tqm.send_callback("v2_playbook_on_stats", tqm._stats)
+        finally:
+            self._variable_manager._extra_vars = session_extra_vars
+        return records
+
+    def _prompt_vars(self, play: Play):
+        """Prompt the ``vars_prompt`` of a play that aren't extra vars."""
+        assert self._variable_manager is not None
+        all_vars = self._variable_manager.get_vars(play=play)
+        templar = Templar(loader=self._loader, variables=all_vars)
+        play.vars_prompt = templar.template(play.vars_prompt)
+        for var in play.vars_prompt or []:
+            name = var["name"]
+            if name in self._variable_manager.extra_vars:
+                continue
+            args = (
+                name,
+                boolean(var.get("private", True)),
+                var.get("prompt", name),
+                var.get("encrypt"),
+                boolean(var.get("confirm", False)),
+                var.get("salt_size"),
+                var.get("salt"),
+                var.get("default"),
+                var.get("unsafe"),
+            )
+            assert self._tqm is not None
+            self._tqm.send_callback("v2_playbook_on_vars_prompt", *args)
+            play.vars[name] = _display.do_var_prompt(*args)
+
+    def _run_batches(self, play: Play) -> bool:
+        """Run a play on the successive batches of hosts of its ``serial``.
+
+        Returns:
+            False if the next plays must not run
+        """
+        assert self._tqm is not None
+        assert self._inventory is not None
+        tqm = self._tqm
+        batches = _serialized_batches(self._inventory, play)
+        if not batches:
+            tqm.send_callback("v2_playbook_on_play_start", play)
+            tqm.send_callback("v2_playbook_on_no_hosts_matched")
+        failed = len(tqm._failed_hosts) + len(tqm._unreachable_hosts)
+        for batch in batches:
+            self._inventory.restrict_to_hosts(batch)
+            try:
+                result = tqm.run(play=play)
+            except AnsibleEndPlay:
+                return False
+            if tqm._terminated or result & tqm.RUN_FAILED_BREAK_PLAY != 0:
+                return False
+            previously_failed = failed
+            failed = len(tqm._failed_hosts) + len(tqm._unreachable_hosts)
+            if failed - previously_failed == len(batch):
+                # the whole batch failed
+                return False
+        return True
+
+    def run_play(
+        self,
+        play_source: Dict,
+        *,
+        extra_vars: Optional[MutableMapping] = None,
+        on_error_continue: bool = False,
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+    ) -> Results:
+        """Run a play in this session.
+
+        Args:
+            play_source: ansible play
+            extra_vars: extra_vars to use for this play only
+                (merged with the session's ones)
+            on_error_continue: Don't throw any exception in case a host is
+                unreachable or the playbooks run with errors
+            max_failures: stop the execution as soon as more than this number
+                of hosts failed (or are unreachable)
+            max_fail_ratio: stop the execution as soon as more than this ratio
+                (between 0 and 1) of the targeted hosts failed (or are
+                unreachable)
+
+        Raises:
+            :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
+                error on a host and ``on_error_continue==False``
+            :py:class:`enoslib.errors.EnosUnreachableHostsError`: if a host is
+                unreachable (through ssh) and ``on_error_continue==False``
+
+        Returns:
+            List of all the results
+        """
+        play = self._load_play(play_source)
+        records = self._run_plays(
+            [play],
+            extra_vars=extra_vars,
+            max_failures=max_failures,
+            max_fail_ratio=max_fail_ratio,
+        )
+        _check_results(records, on_error_continue)
+        return Results.from_ansible(records)
+
+    def run_play_iter(
+        self,
+        play_source: Dict,
+        *,
+        extra_vars: Optional[MutableMapping] = None,
+        on_error_continue: bool = False,
+        max_payload_size: Optional[int] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+    ) -> Iterator[BaseCommandResult]:
+        """Run a play in this session and yield the results as they come.
+
+        The play runs in a background thread, the results are yielded as soon
+        as each host completes a task and aren't kept once yielded. Leaving the
+        iteration early stops the execution.
+
+        Args:
+            play_source: ansible play
+            extra_vars: extra_vars to use for this play only
+                (merged with the session's ones)
+            on_error_continue: Don't throw any exception in case a host is
+                unreachable or the playbooks run with errors
+            max_payload_size: truncate the outputs (stdout, stderr, msg) of
+                the results to this number of characters
+            buffer_size: maximum number of results waiting to be consumed
+                (the execution is paused when the buffer is full)
+            max_failures: stop the execution as soon as more than this number
+                of hosts failed (or are unreachable)
+            max_fail_ratio: stop the execution as soon as more than this ratio
+                (between 0 and 1) of the targeted hosts failed (or are
+                unreachable)
+
+        Raises:
+            :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
+                error on a host and ``on_error_continue==False``
+            :py:class:`enoslib.errors.EnosUnreachableHostsError`: if a host is
+                unreachable (through ssh) and ``on_error_continue==False``.
+            The errors are raised once all the results have been yielded.
+
+        Yields:
+            The results, one per host and task
+        """
+        play = self._load_play(play_source)
+        assert self._tqm is not None
+        stream = _RecordStream(buffer_size)
+        errors: List[BaseException] = []
+
+        def target():
+            try:
+                self._run_plays(
+                    [play],
+                    extra_vars=extra_vars,
+                    storage=stream,
+                    max_payload_size=max_payload_size,
+                    max_failures=max_failures,
+                    max_fail_ratio=max_fail_ratio,
+                )
+            except BaseException as e:  # re-raised in the consumer
+                errors.append(e)
+            finally:
+                stream.close()
+
+        tqm = self._tqm
+        # the thread uses the config of the caller (e.g config_context)
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(target,),
+            name="enoslib-stream",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            for record in stream:
+                yield BaseCommandResult.from_play(record)
+        finally:
+            if thread.is_alive():
+                # the consumer stopped early
+                tqm.terminate()
+                stream.discard()
+            thread.join()
+        if errors:
+            raise errors[0]
+        _check_results(stream.errors, on_error_continue)
+
+    def run_command(
+        self,
+        command: str,
+        *,
+        extra_vars: Optional[MutableMapping] = None,
+        on_error_continue: bool = False,
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Results:
+        """Run a shell command in this session.
+
+        Args:
+            command: the command to run
+            extra_vars: extra_vars to use for this command only
+            on_error_continue: Don't throw any exception in case a host is
+                unreachable or the playbooks run with errors
+            max_failures: see :py:meth:`~enoslib.api.Session.run_play`
+            max_fail_ratio: see :py:meth:`~enoslib.api.Session.run_play`
+            kwargs: keyword arguments of :py:func:`~enoslib.api.run_command`
+                (except those related to the inventory)
+
+        Returns:
+            List of all the results
+        """
+        play_source = _build_command_play(command, **kwargs)
+        return self.run_play(
+            play_source,
             extra_vars=extra_vars,
             on_error_continue=on_error_continue,
+            max_failures=max_failures,
+            max_fail_ratio=max_fail_ratio,
         )
 
+    def run_command_iter(
+        self,
+        command: str,
+        *,
+        extra_vars: Optional[MutableMapping] = None,
+        on_error_continue: bool = False,
+        max_payload_size: Optional[int] = None,
+        max_failures: Optional[int] = None,
+        max_fail_ratio: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Iterator[BaseCommandResult]:
+        """Run a shell command in this session, yielding the results as they come.
+
+        See :py:meth:`~enoslib.api.Session.run_play_iter`.
+
+        Args:
+            command: the command to run
+            extra_vars: extra_vars to use for this command only
+            on_error_continue: Don't throw any exception in case a host is
+                unreachable or the playbooks run with errors
+            max_payload_size: truncate the outputs of the results to this
+                number of characters
+            max_failures: see :py:meth:`~enoslib.api.Session.run_play`
+            max_fail_ratio: see :py:meth:`~enoslib.api.Session.run_play`
+            kwargs: keyword arguments of :py:func:`~enoslib.api.run_command`
+                (except those related to the inventory)
+        """
+        play_source = _build_command_play(command, **kwargs)
+        return self.run_play_iter(
+            play_source,
+            extra_vars=extra_vars,
+            on_error_continue=on_error_continue,
+            max_payload_size=max_payload_size,
+            max_failures=max_failures,
+            max_fail_ratio=max_fail_ratio,
+        )
+
+    def run(self, cmd: str, **kwargs) -> Results:
+        """Alias of :py:meth:`~enoslib.api.Session.run_command`."""
+        return self.run_command(cmd, **kwargs)
+
+    def actions(self, **kwargs) -> "actions":
+        """Build an :py:class:`~enoslib.api.actions` bound to this session.
+
+        Args:
+            kwargs: keyword arguments of :py:class:`~enoslib.api.actions`
+                (except those related to the inventory)
+        """
+        return actions(session=self, **kwargs)
+
 
 class _Phantom:
     """Internal stuff to build a chain of prefixes:
@@ -687,7 +1998,20 @@ class actions:
         background (bool): A shortcut that injects ``async=1year, poll=0``
             to run the commands in detached mode. Can be overridden at the
             task level.
-        strategy (str): ansible execution strategy
+        strategy (str): ansible execution strategy (default to the
+            ``ansible_strategy`` config, e.g "mitogen_linear")
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable)
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the targeted hosts failed (or are
+            unreachable)
+        session: run the actions in this :py:class:`~enoslib.api.Session`
+            (``inventory_path`` and ``roles`` are then taken from the session).
+        stream: don't run the actions when leaving the context but when
+            iterating over ``results_iter``. The results are then yielded as
+            soon as each host completes a task (see
+            :py:func:`~enoslib.api.run_play_iter`) and ``results`` stays
+            empty.
         kwargs: keyword arguments passed to :py:func:`enoslib.api.run_ansible`.
 
 
@@ -731,7 +2055,9 @@ class actions:
         priors: Optional[List["actions"]] = None,
         run_as: Optional[str] = None,
         background: bool = False,
-        strategy: str = "linear",
+        strategy: Optional[str] = None,
+        session: Optional[Session] = None,
+        stream: bool = False,
         **kwargs,
     ):
 
@@ -740,6 +2066,8 @@ class actions:
         self.roles = roles
         self.priors = priors if priors is not None else []
         self.strategy = strategy
+        self.session = session
+        self.stream = stream
 
         # run_ansible kwargs
         self.kwargs = kwargs
@@ -756,8 +2084,14 @@ class actions:
         # of module call in this context/p
         self._tasks: List[Mapping[Any, Any]] = []
 
+        # the facts are taken from the fact cache (if enabled) when leaving
+        # the context instead of being gathered by the play
+        self._facts_from_cache = False
         if gather_facts:
-            self._tasks.append(dict(name="Gather facts", setup=""))
+            if get_fact_cache() is not None and inventory_path is None:
+                self._facts_from_cache = True
+            else:
+                self._tasks.append(dict(name="Gather facts", setup=""))
 
         if self.priors:
             for prior in self.priors:
@@ -765,6 +2099,8 @@ class actions:
 
         # Placeholder (will be mutated) for the results
         self.results = Results()
+        # Set when leaving the context in stream mode
+        self.results_iter: Optional[Iterator[BaseCommandResult]] = None
 
     def add_task(self, task: Dict):
         self._tasks.append(task)
@@ -776,22 +2112,59 @@ class actions:
         return self
 
     def __exit__(self, *args):
+        kwargs = dict(self.kwargs)
+        if self._facts_from_cache:
+            roles = self.roles
+            if roles is None and self.session is not None:
+                roles = self.session.roles
+            cached = _facts_from_cache(
+                roles,
+                self.pattern_hosts,
+                extra_vars=kwargs.get("extra_vars"),
+                on_error_continue=kwargs.get("on_error_continue", False),
+            )
+            if cached is not None:
+                facts, _ = cached
+                if self.session is not None:
+                    self.session.set_facts(facts)
+                else:
+                    kwargs.update(facts=facts)
+            else:
+                self._tasks.insert(0, dict(name="Gather facts", setup=""))
+
         play_source = dict(
             hosts=self.pattern_hosts,
             tasks=self._tasks,
             gather_facts=False,
-            strategy=self.strategy,
         )
+        if self.strategy is not None:
+            play_source.update(strategy=self.strategy)
 
         logger.debug(play_source)
 
+        if self.stream:
+            # run it lazily
+            if self.session is not None:
+                self.results_iter = self.session.run_play_iter(play_source, **kwargs)
+            else:
+                self.results_iter = run_play_iter(
+                    play_source,
+                    inventory_path=self.inventory_path,
+                    roles=self.roles,
+                    **kwargs,
+                )
+            return
+
         # run it
-        results = run_play(
-            play_source,
-            inventory_path=self.inventory_path,
-            roles=self.roles,
-            **self.kwargs,
-        )
+        if self.session is not None:
+            results = self.session.run_play(play_source, **kwargs)
+        else:
+            results = run_play(
+                play_source,
+                inventory_path=self.inventory_path,
+                roles=self.roles,
+                **kwargs,
+            )
 
         # gather results (mutate the results attributes)
         for r in results:
@@ -843,6 +2216,89 @@ def ensure_python3(make_default: bool = False, **kwargs):
         p.raw("hostname")
 
 
+def _build_command_play(
+    command: str,
+    *,
+    pattern_hosts: str = "all",
+    gather_facts: bool = False,
+    run_as: Optional[str] = None,
+    background: bool = False,
+    task_name: Optional[str] = None,
+    raw: bool = False,
+    **kwargs: Any,
+) -> Dict:
+    """Build the play that runs a single command.
+
+    See :py:func:`~enoslib.api.run_command` for the arguments.
+    """
+    if run_as is not None:
+        # run_as is a shortcut
+        kwargs.update(become=True, become_user=run_as)
+
+    if background:
+        # don't inject if background is False
+        kwargs.update(background=True)
+
+    task: Dict = dict(name=command)
+    if task_name is not None:
+        task.update(name=task_name)
+    if raw:
+        task.update(raw=command)
+    else:
+        task.update(shell=command)
+
+    top_args, module_args = _split_args(**kwargs)
+    task.update(top_args)
+    task.update(args=module_args)
+
+    return {
+        "hosts": pattern_hosts,
+        "gather_facts": gather_facts,
+        "tasks": [task],
+    }
+
+
+def _ssh_hosts(
+    command: str,
+    *,
+    pattern_hosts: str,
+    inventory_path: Optional[str],
+    roles: Optional[RolesLike],
+    gather_facts: bool,
+    extra_vars: Optional[MutableMapping],
+    background: bool,
+    early_abort: bool,
+    **kwargs: Any,
+) -> Optional[List[Host]]:
+    """Get the hosts to run the command on using the ssh executor.
+
+    Returns:
+        None if the command requires Ansible.
+    """
+    from enoslib.ssh import _is_supported
+
+    reasons = dict(
+        inventory=inventory_path is not None,
+        no_roles=roles is None,
+        gather_facts=gather_facts,
+        extra_vars=bool(extra_vars),
+        background=background,
+        early_abort=early_abort,
+        templating="{{" in command or "{%" in command,
+        ansible_args=bool(kwargs),
+    )
+    if any(reasons.values()):
+        logger.debug("Falling back to Ansible, reasons=%s", reasons)
+        return None
+    _roles = _hostslike_to_roles(roles)
+    assert _roles is not None
+    hosts = get_hosts(_roles, pattern_hosts=pattern_hosts)
+    if not all(_is_supported(h) for h in hosts):
+        logger.debug("Falling back to Ansible, some hosts need Ansible")
+        return None
+    return hosts
+
+
 def run_command(
     command: str,
     *,
@@ -856,6 +2312,9 @@ def run_command(
     background: bool = False,
     task_name: Optional[str] = None,
     raw: bool = False,
+    executor: Optional[str] = None,
+    max_failures: Optional[int] = None,
+    max_fail_ratio: Optional[float] = None,
     **kwargs: Any,
 ) -> Results:
     """Run a shell command on some remote hosts.
@@ -880,6 +2339,17 @@ def run_command(
         task_name: name of the command to display, can be used for further
             filtering once the results is retrieved.
         raw: Whether to use a raw connection (no python requires at the destination)
+        executor: "ansible" or "ssh" (default to the ``executor`` config).
+            The ssh executor (see :py:mod:`enoslib.ssh`) bypasses Ansible
+            for plain (or raw) commands run on ``roles``; Ansible is still
+            used if the call needs it (templating, facts, module arguments...)
+            or if a host does (become, timeout, ... see
+            :py:func:`enoslib.ssh._is_supported`).
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable)
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the targeted hosts failed (or are
+            unreachable)
         kwargs: keywords argument to pass to the shell module or as top level
             args.
 
@@ -941,43 +2411,135 @@ def run_command(
 
     Note that the actual result isn't available in the result file but will be
     available through a file specified in the result object."""
+    if executor is None:
+        executor = get_config()["executor"]
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor}, should be one of {EXECUTORS}")
+    if executor == "ssh":
+        hosts = _ssh_hosts(
+            command,
+            pattern_hosts=pattern_hosts,
+            inventory_path=inventory_path,
+            roles=roles,
+            gather_facts=gather_facts,
+            extra_vars=extra_vars,
+            background=background,
+            early_abort=max_failures is not None or max_fail_ratio is not None,
+            **kwargs,
+        )
+        if hosts is not None:
+            from enoslib.ssh import run_command_ssh
+
+            return run_command_ssh(
+                command,
+                hosts,
+                run_as=run_as,
+                task_name=task_name,
+                on_error_continue=on_error_continue,
+            )
 
-    if run_as is not None:
-        # run_as is a shortcut
-        kwargs.update(become=True, become_user=run_as)
+    facts = None
+    if gather_facts and inventory_path is None:
+        cached = _facts_from_cache(
+            roles,
+            pattern_hosts,
+            extra_vars=extra_vars,
+            on_error_continue=on_error_continue,
+        )
+        if cached is not None:
+            facts, _ = cached
+            gather_facts = False
+
+    play_source = _build_command_play(
+        command,
+        pattern_hosts=pattern_hosts,
+        gather_facts=gather_facts,
+        run_as=run_as,
+        background=background,
+        task_name=task_name,
+        raw=raw,
+        **kwargs,
+    )
 
-    if background:
-        # don't inject if background is False
-        kwargs.update(background=True)
+    results = run_play(
+        play_source,
+        inventory_path=inventory_path,
+        roles=roles,
+        extra_vars=extra_vars,
+        on_error_continue=on_error_continue,
+        max_failures=max_failures,
+        max_fail_ratio=max_fail_ratio,
+        facts=facts,
+    )
 
-    task: Dict = dict(name=command)
-    if task_name is not None:
-        task.update(name=task_name)
-    if raw:
-        task.update(raw=command)
-    else:
-        task.update(shell=command)
+    return results
 
-    top_args, module_args = _split_args(**kwargs)
-    task.update(top_args)
-    task.update(args=module_args)
 
-    play_source = {
-        "hosts": pattern_hosts,
-        "gather_facts": gather_facts,
-        "tasks": [task],
-    }
+def run_command_iter(
+    command: str,
+    *,
+    pattern_hosts: str = "all",
+    inventory_path: Optional[str] = None,
+    roles: Optional[RolesLike] = None,
+    extra_vars: Optional[MutableMapping] = None,
+    on_error_continue: bool = False,
+    max_payload_size: Optional[int] = None,
+    max_failures: Optional[int] = None,
+    max_fail_ratio: Optional[float] = None,
+    **kwargs: Any,
+) -> Iterator[BaseCommandResult]:
+    """Run a shell command on some remote hosts, yielding the results as they come.
 
-    results = run_play(
+    This is the streaming counterpart of :py:func:`~enoslib.api.run_command`:
+    results are yielded as soon as each host completes and aren't kept once
+    yielded.
+
+    Args:
+        command (str): the command to run
+        pattern_hosts (str): pattern to describe ansible hosts to target.
+        inventory_path (str): inventory to use
+        roles (dict): the roles to use (replacement for inventory_path).
+        extra_vars (dict): extra_vars to use
+        on_error_continue (bool): Don't throw any exception in case a host is
+            unreachable or the playbooks run with errors
+        max_payload_size: truncate the outputs (stdout, stderr, msg) of the
+            results to this number of characters
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable)
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the targeted hosts failed (or are
+            unreachable)
+        kwargs: keyword arguments of :py:func:`~enoslib.api.run_command`
+
+    Raises:
+        :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
+            error on a host and ``on_error_continue==False``
+        :py:class:`enoslib.errors.EnosUnreachableHostsError`: if a host is
+            unreachable (through ssh) and ``on_error_continue==False``.
+        The errors are raised once all the results have been yielded.
+
+    Yields:
+        The results, one per host
+
+    Example:
+
+    .. code-block:: python
+
+        for result in en.run_command_iter("hostname", roles=roles):
+            print(result.host, result.stdout)
+    """
+    play_source = _build_command_play(command, pattern_hosts=pattern_hosts, **kwargs)
+    yield from run_play_iter(
         play_source,
         inventory_path=inventory_path,
         roles=roles,
         extra_vars=extra_vars,
         on_error_continue=on_error_continue,
+        max_payload_size=max_payload_size,
+        max_failures=max_failures,
+        max_fail_ratio=max_fail_ratio,
     )
 
-    return results
-
 
 def run(cmd: str, roles: RolesLike, **kwargs) -> Results:
     """Run command on some hosts
@@ -996,6 +2558,61 @@ def run(cmd: str, roles: RolesLike, **kwargs) -> Results:
     return run_command(cmd, roles=roles, **kwargs)
 
 
+def _setup_play(pattern_hosts: str, gather_subset: Union[str, List[str]]) -> Dict:
+    return {
+        "hosts": pattern_hosts,
+        # the setup task below is enough
+        "gather_facts": False,
+        "tasks": [{"name": COMMAND_NAME, "setup": {"gather_subset": gather_subset}}],
+    }
+
+
+def _facts_from_cache(
+    roles: Optional[RolesLike],
+    pattern_hosts: str = "all",
+    gather_subset: Union[str, List[str]] = SUBSET_ALL,
+    extra_vars: Optional[MutableMapping] = None,
+    on_error_continue: bool = False,
+) -> Optional[Tuple[Dict[str, Dict], Results]]:
+    """Get the facts of the hosts using the fact cache.
+
+    Only the facts missing from the cache are gathered (and then cached).
+
+    Returns:
+        None if the cache can't be used (disabled or no roles given).
+        Otherwise the facts of the hosts (by alias) and the results of the
+        gathering of the missing facts.
+    """
+    cache = get_fact_cache()
+    _roles = _hostslike_to_roles(roles)
+    if cache is None or _roles is None:
+        return None
+    resolver = PatternResolver(_roles)
+    facts: Dict[str, Dict] = {}
+    missing: List[Host] = []
+    for alias in resolver.aliases(pattern_hosts):
+        host = resolver.by_alias[alias]
+        host_facts = cache.get(host, gather_subset)
+        if host_facts is None:
+            missing.append(host)
+        else:
+            facts[alias] = host_facts
+    logger.debug("%s hosts facts found in the cache", len(facts))
+    results = Results()
+    if missing:
+        results = run_play(
+            _setup_play("all", gather_subset),
+            roles=missing,
+            extra_vars=extra_vars,
+            on_error_continue=on_error_continue,
+        )
+        for r in results.filter(task=COMMAND_NAME, status=STATUS_OK):
+            gathered = r.payload["ansible_facts"]
+            cache.set(resolver.by_alias[r.host], gather_subset, gathered)
+            facts[r.host] = gathered
+    return facts, results
+
+
 def gather_facts(
     *,
     pattern_hosts="all",
@@ -1034,7 +2651,9 @@ def gather_facts(
 
     Returns:
         Dict combining the ansible facts of ok and failed hosts and every
-        result of tasks executed.
+        result of tasks executed. If the fact cache is enabled (see
+        :py:mod:`enoslib.facts`), the facts of the hosts found in the cache are
+        part of the ok hosts but they don't have a result.
 
     Example:
 
@@ -1073,12 +2692,21 @@ def gather_facts(
         s = {r.host: r.payload.get("ansible_facts") for r in _r}
         return s
 
-    play_source = {
-        "hosts": pattern_hosts,
-        "tasks": [{"name": COMMAND_NAME, "setup": {"gather_subset": gather_subset}}],
-    }
+    if inventory_path is None:
+        cached = _facts_from_cache(
+            roles,
+            pattern_hosts,
+            gather_subset=gather_subset,
+            extra_vars=extra_vars,
+            on_error_continue=on_error_continue,
+        )
+        if cached is not None:
+            ok, results = cached
+            failed = filter_results(results, STATUS_FAILED)
+            return {"ok": ok, "failed": failed, "results": results}
+
     results = run_play(
-        play_source,
+        _setup_play(pattern_hosts, gather_subset),
         inventory_path=inventory_path,
         roles=roles,
         extra_vars=extra_vars,
@@ -1090,24 +2718,42 @@ def gather_facts(
     return {"ok": ok, "failed": failed, "results": results}
 
 
-def _dump_obj(obj):
-    """Dump obj in a file.
+def _dump_results(
+    results: Iterable[BaseCommandResult],
+    writer: Optional[DumpWriter] = None,
+    max_payload_size: Optional[int] = None,
+):
+    """Append the results to the dump (if any).
 
     Args:
-        obj: anything that is json serializable
+        results: the results to dump
+        writer: where to dump the results (default to the current config)
+        max_payload_size: truncate the outputs (stdout, stderr, msg) in the
+            dump to this number of characters
     """
-    dump_result = get_config().get("dump_results")
-    if dump_result is not None:
-        try:
-            with dump_result.open("a") as f:
-                json.dump(obj, f)
-
-        except (TypeError, RecursionError, ValueError, OSError) as err:
-            logger.error(
-                "Error while saving results dump_result=%s, exception=%s",
-                dump_result,
-                err,
-            )
+    close = writer is None
+    if writer is None:
+        writer = get_writer()
+        max_payload_size = get_config().get("dump_max_payload_size")
+    if writer is None:
+        return
+    try:
+        for result in results:
+            if max_payload_size is not None:
+                payload = _truncate_payload(result.payload, max_payload_size)
+                result = replace(result, payload=payload)
+            try:
+                writer.write(result.to_dict(include_payload=True))
+            except (TypeError, RecursionError, ValueError, OSError) as err:
+                logger.error(
+                    "Error while saving results dump_result=%s, exception=%s",
+                    writer.path,
+                    err,
+                )
+    finally:
+        if close:
+            # the results of a whole execution have been written
+            writer.close()
 
 
 def run_ansible(
@@ -1118,6 +2764,8 @@ def run_ansible(
     on_error_continue: bool = False,
     basedir: Optional[str] = ".",
     extra_vars: Optional[MutableMapping] = None,
+    max_failures: Optional[int] = None,
+    max_fail_ratio: Optional[float] = None,
 ) -> Results:
     """Run Ansible.
 
@@ -1133,6 +2781,11 @@ def run_ansible(
         ansible_retries: a generic retry mechanism. Set this to a positive
                          value if the connection plugin doesn't have this retry
                          mechanism (ssh does have one)
+        max_failures (int): stop the execution as soon as more than this
+            number of hosts failed (or are unreachable) in a play
+        max_fail_ratio (float): stop the execution as soon as more than this
+            ratio (between 0 and 1) of the hosts targeted by a play failed (or
+            are unreachable)
 
     Raises:
         :py:class:`enoslib.errors.EnosFailedHostsError`: if a task returns an
@@ -1150,93 +2803,165 @@ def run_ansible(
         tags=tags,
         basedir=basedir,
     )
+    if get_config()["ansible_strategy"] in MITOGEN_STRATEGIES:
+        # the playbooks choose their strategy, let them use Mitogen's ones
+        _enable_mitogen()
     results: List[_AnsibleExecutionRecord] = []
     passwords: Dict = {}
-    for path in playbooks:
-        logger.debug("Running playbook %s with vars:\n%s", path, extra_vars)
-        _results: List[_AnsibleExecutionRecord] = []
-        callback = _MyCallback(_results)
-        pbex = PlaybookExecutor(
-            playbooks=[path],
-            inventory=inventory,
-            variable_manager=variable_manager,
-            loader=loader,
-            passwords=passwords,
-        )
-        # hack ahead
-        pbex._tqm._callback_plugins.append(callback)
+    with _CLIARGS.use(_CLIARGS.get_args()):
+        for path in playbooks:
+            logger.debug("Running playbook %s with vars:\n%s", path, extra_vars)
+            _results: List[_AnsibleExecutionRecord] = []
+            callback = _MyCallback(_results)
+            pbex = PlaybookExecutor(
+                playbooks=[path],
+                inventory=inventory,
+                variable_manager=variable_manager,
+                loader=loader,
+                passwords=passwords,
+            )
+            # hack ahead
+            pbex._tqm._callback_plugins.append(callback)
+            if max_failures is not None or max_fail_ratio is not None:
+                callback.watch_failures(pbex._tqm, max_failures, max_fail_ratio)
 
-        if get_config()["ansible_stdout"] == "noop":
-            pbex._tqm._stdout_callback = NoopCallback()
-        elif get_config()["ansible_stdout"] == "spinner":
-            pbex._tqm._stdout_callback = SpinnerCallback()
-        else:
-            # let the ansible.cfg governs this
-            pass
-        _ = pbex.run()
-
-        results += _results
-
-        # Handling errors
-        failed_hosts = []
-        unreachable_hosts = []
-        for r in _results:
-            if r.status == STATUS_UNREACHABLE:
-                unreachable_hosts.append(r)
-            if r.status == STATUS_FAILED:
-                failed_hosts.append(r)
-
-        if len(failed_hosts) > 0:
-            logger.error("Failed hosts: %s", failed_hosts)
-            if not on_error_continue:
-                raise EnosFailedHostsError(failed_hosts)
-        if len(unreachable_hosts) > 0:
-            logger.error("Unreachable hosts: %s", unreachable_hosts)
-            if not on_error_continue:
-                raise EnosUnreachableHostsError(unreachable_hosts)
-
-    final_results: Results = Results.from_ansible(results)
-    # dump if needed
-    _dump_obj(final_results.to_dict(include_payload=True))
-    return final_results
-
-
-def _sync_from_facts(roles: Roles, networks: Networks, facts: Dict) -> Roles:
-    """Add the network information to the host in roles.
-
-    Do it in place.
+            stdout_callback = _stdout_callback()
+            if stdout_callback is not None:
+                pbex._tqm._stdout_callback = stdout_callback
+            _ = pbex.run()
+
+            results += _results
+
+            # Handling errors
+            _check_results(_results, on_error_continue)
+            if callback.aborted:
+                # don't run the remaining playbooks
+                break
+
+    return Results.from_ansible(results)
+
+
+class _FactsSync:
+    """Sync the hosts as soon as their facts are received.
+
+    This is used as the storage of the callback: the facts aren't kept once
+    the corresponding hosts have been synced. The records in error are kept
+    aside to raise the errors at the end of the execution.
     """
-    for hosts in roles.values():
+
+    def __init__(
+        self,
+        roles: Roles,
+        networks: Networks,
+        gather_subset: Union[str, List[str]] = SUBSET_ALL,
+        cache: Optional[FactCache] = None,
+    ):
+        self.networks = networks
+        self.gather_subset = gather_subset
+        self.cache = cache
+        self.hosts: Dict[str, List[Host]] = {}
+        for hosts in roles.values():
+            for host in hosts:
+                # only sync if host is really a Host (not a Sensor for example)
+                if not isinstance(host, Host):
+                    continue
+                alias = host.alias if host.alias is not None else host.address
+                self.hosts.setdefault(alias, []).append(host)
+        self.errors: List[_AnsibleExecutionRecord] = []
+
+    def append(self, record: _AnsibleExecutionRecord):
+        if record.status in DEFAULT_ERROR_STATUSES:
+            self.errors.append(record)
+            return
+        facts = record.payload.get("ansible_facts")
+        if not facts or "ansible_interfaces" not in facts:
+            # not the facts gathering task
+            return
+        hosts = self.hosts.get(record.host, [])
         for host in hosts:
-            # only sync if host is really a Host (not a Sensor for example)
-            if not isinstance(host, Host):
+            host.sync_from_ansible(self.networks, facts)
+        if self.cache is not None and hosts:
+            self.cache.set(hosts[0], self.gather_subset, facts)
+
+    def sync_from_cache(self) -> List[Host]:
+        """Sync the hosts whose facts are in the cache.
+
+        Returns:
+            The hosts whose facts must be gathered (one per alias).
+        """
+        missing = []
+        for hosts in self.hosts.values():
+            facts = None
+            if self.cache is not None:
+                facts = self.cache.get(hosts[0], self.gather_subset)
+            if facts is None:
+                missing.append(hosts[0])
                 continue
-            host_facts = facts[host.alias]
-            host.sync_from_ansible(networks, host_facts)
-    return roles
+            for host in hosts:
+                host.sync_from_ansible(self.networks, facts)
+        return missing
+
+
+def _copy_roles(roles: Roles) -> Roles:
+    """Copy the roles (and the hosts).
+
+    The hosts are copied on write (see :py:meth:`enoslib.objects.Host.__copy__`)
+    instead of deep copied. A host present in several roles is copied once.
+    """
+    copies: Dict[int, Any] = {}
+    _roles = Roles()
+    for role, hosts in roles.items():
+        _hosts = []
+        for host in hosts:
+            if id(host) not in copies:
+                if isinstance(host, Host):
+                    copies[id(host)] = copy.copy(host)
+                else:
+                    copies[id(host)] = copy.deepcopy(host)
+            _hosts.append(copies[id(host)])
+        _roles[role] = _hosts
+    return _roles
 
 
 @overload
 def sync_info(
-    roles: Roles, networks: Networks, inplace: bool = False, **kwargs
+    roles: Roles,
+    networks: Networks,
+    inplace: bool = False,
+    gather_subset: Union[str, List[str]] = "all",
+    **kwargs,
 ) -> Roles:
     ...
 
 
 @overload
-def sync_info(roles: Host, networks: Networks, inplace: bool = False, **kwargs) -> Host:
+def sync_info(
+    roles: Host,
+    networks: Networks,
+    inplace: bool = False,
+    gather_subset: Union[str, List[str]] = "all",
+    **kwargs,
+) -> Host:
     ...
 
 
 @overload
 def sync_info(
-    roles: Iterable[Host], networks: Networks, inplace: bool = False, **kwargs
+    roles: Iterable[Host],
+    networks: Networks,
+    inplace: bool = False,
+    gather_subset: Union[str, List[str]] = "all",
+    **kwargs,
 ) -> Iterable[Host]:
     ...
 
 
 def sync_info(
-    roles: RolesLike, networks: Networks, inplace: bool = False, **kwargs
+    roles: RolesLike,
+    networks: Networks,
+    inplace: bool = False,
+    gather_subset: Union[str, List[str]] = "all",
+    **kwargs,
 ) -> RolesLike:
     """Sync each host network information with their actual configuration
 
@@ -1247,6 +2972,12 @@ def sync_info(
     This method is generic: should work for any provider and supports IPv4
     and IPv6 addresses.
 
+    The hosts are synced as soon as their facts are received (the facts of
+    all the hosts aren't gathered in a single place beforehand). On large
+    deployments, use ``gather_subset="network"`` to only gather the facts
+    needed to sync the network devices (the processor information won't be
+    available).
+
     Args:
         roles (dict): role->hosts mapping as returned by
             :py:meth:`enoslib.infra.provider.Provider.init`
@@ -1254,7 +2985,13 @@ def sync_info(
             :py:meth:`enoslib.infra.provider.Provider.init`
         inplace: bool, default False
             If False, return a copy of roles. Otherwise, do operation inplace.
-        kwargs: keyword arguments passed to :py:func:`enoslib.api.run_ansible`
+            The hosts are copied on write: the copies don't share their
+            mutable attributes (extra, network devices) with the originals.
+        gather_subset: subset of the facts to gather (see the
+            `setup module
+            <https://docs.ansible.com/ansible/latest/modules/setup_module.html>`_)
+        kwargs: keyword arguments passed to :py:func:`enoslib.api.wait_for`
+            (``extra_vars`` is also used when gathering the facts)
 
     Returns:
         RolesLike of the same type as passed. With updated information.
@@ -1263,44 +3000,56 @@ def sync_info(
     if not roles:
         logger.warning("The Roles are empty at this point !")
         return roles
-    wait_for(roles, **kwargs)
-
-    with TemporaryDirectory() as tmp_dir:
-        facts_file = Path(tmp_dir) / "facts"
-        logger.debug("Syncing host description in %s", facts_file)
-        utils_playbook = os.path.join(ANSIBLE_DIR, "utils.yml")
-        options = {
-            "enos_action": "check_network",
-            "facts_file": str(facts_file),
-        }
-        run_ansible(
-            [utils_playbook],
-            roles=roles,
-            extra_vars=options,
-            on_error_continue=False,
-            **kwargs,
-        )
 
-        # Read the file
-        # Match provider networks to interface names for each host
+    _roles: Optional[Roles] = _hostslike_to_roles(roles)
+    if _roles is None:
+        raise ValueError("Roles is None")
+    if not inplace:
         # preserve the host from being mutated wildly
-        with facts_file.open("r") as f:
-            facts = json.load(f)
-            _roles: Optional[Roles] = _hostslike_to_roles(roles)
-            if _roles is None:
-                raise ValueError("Roles is None")
-            if not inplace:
-                _roles_copied: Roles = copy.deepcopy(_roles)
-            else:
-                _roles_copied = _roles
-            _roles_copied = _sync_from_facts(_roles_copied, networks, facts)
-            # return the right type
-            if isinstance(roles, Roles):
-                return _roles_copied
-            if isinstance(roles, Host):
-                return _roles_copied["all"][0]
-            if hasattr(roles, "__iter__"):
-                return _roles_copied["all"]
+        _roles_copied: Roles = _copy_roles(_roles)
+    else:
+        _roles_copied = _roles
+
+    play_source = dict(
+        name="Syncing the hosts' information",
+        hosts="all",
+        gather_facts=False,
+        tasks=[
+            dict(
+                name="Gathering the facts",
+                setup=dict(gather_subset=gather_subset),
+            ),
+            dict(
+                name="Create the fake interfaces",
+                shell="ip link show {{ item }} || ip l a {{ item }} type dummy",
+                with_items="{{ fake_interfaces }}",
+                when="fake_interfaces is defined",
+            ),
+        ],
+    )
+    extra_vars = kwargs.get("extra_vars") or {}
+    # the fake interfaces are created after the facts gathering: don't reuse
+    # (nor cache) those facts
+    cache = get_fact_cache() if "fake_interfaces" not in extra_vars else None
+    # Match provider networks to interface names for each host
+    facts_sync = _FactsSync(
+        _roles_copied, networks, gather_subset=gather_subset, cache=cache
+    )
+    missing = facts_sync.sync_from_cache()
+    if missing:
+        wait_for(missing, **kwargs)
+        with Session(missing, extra_vars=extra_vars) as session:
+            play = session._load_play(play_source)
+            session._run_plays([play], storage=facts_sync)
+        _check_results(facts_sync.errors, on_error_continue=False)
+
+    # return the right type
+    if isinstance(roles, Roles):
+        return _roles_copied
+    if isinstance(roles, Host):
+        return _roles_copied["all"][0]
+    if hasattr(roles, "__iter__"):
+        return _roles_copied["all"]
     raise ValueError("The impossible happened ! The roles aren't Roles")
 
 
@@ -1347,16 +3096,38 @@ def get_hosts(roles: Roles, pattern_hosts: str = "all") -> List[Host]:
     Return:
         The list of hosts matching the pattern
     """
-    all_hosts: Set[Host] = set()
-    for hosts in roles.values():
-        all_hosts = all_hosts.union(set(hosts))
-    inventory = EnosInventory(roles=roles)
-    ansible_hosts = inventory.get_hosts(pattern=pattern_hosts)
-    ansible_addresses = [h.address for h in ansible_hosts]
-    return [h for h in all_hosts if h.address in ansible_addresses]
-
-
-def wait_for(roles: RolesLike, retries: int = 100, interval: int = 30, **kwargs):
+    # no need for a full Ansible inventory here
+    return PatternResolver(roles).get_hosts(pattern_hosts)
+
+
+def _backoff(attempt: int, interval: float) -> float:
+    """Exponential backoff capped by interval, with some jitter."""
+    delay = min(interval, WAIT_FOR_MIN_INTERVAL * 2**attempt)
+    # jitter: spread the probes of the hosts that are slow to come up
+    return random.uniform(delay / 2, delay)
+
+
+def _histogram(durations: Iterable[float]) -> List[Tuple[str, int]]:
+    """Count the durations in power of 2 seconds buckets."""
+    counts: Dict[int, int] = defaultdict(int)
+    for duration in durations:
+        upper = 1
+        while duration >= upper:
+            upper *= 2
+        counts[upper] += 1
+    return [
+        (f"<{upper}s" if upper == 1 else f"{upper // 2}-{upper}s", counts[upper])
+        for upper in sorted(counts)
+    ]
+
+
+def wait_for(
+    roles: RolesLike,
+    retries: int = 100,
+    interval: int = 30,
+    tcp_probe: bool = False,
+    **kwargs,
+) -> Dict[str, float]:
     """Wait for all the machines to be ready to run some commands.
 
     Let Ansible initiates a communication and retries if needed.
@@ -1365,26 +3136,66 @@ def wait_for(roles: RolesLike, retries: int = 100, interval: int = 30, **kwargs)
     (see `connection plugins
     <https://docs.ansible.com/ansible/latest/plugins/connection.html>`_)
 
+    Only the hosts that aren't ready yet are probed again. The delay between
+    two probes grows exponentially (with some jitter) up to ``interval``.
+
     Args:
         roles: Roles to wait for
         retries (int): Number of time we'll be retrying a connection
-        interval (int): Interval to wait in seconds between two retries
-        kwargs: keyword arguments passed to :py:func:`enoslib.api.run_ansible`
+        interval (int): Maximum interval to wait in seconds between two retries
+        tcp_probe: check first that the SSH port accepts connections (a plain
+            TCP connection is cheaper than a SSH handshake). Only the hosts
+            reached directly are checked (see :py:func:`enoslib.ssh.probe_tcp`).
+        kwargs: keyword arguments passed to :py:class:`enoslib.api.actions`
+
+    Returns:
+        The time (in seconds) each host (by alias) took to be ready.
     """
+    _roles = _hostslike_to_roles(roles)
+    if _roles is None:
+        raise ValueError("Roles is None")
+    resolver = PatternResolver(_roles)
+    pattern_hosts = kwargs.pop("pattern_hosts", "all")
+    pending = {a: resolver.by_alias[a] for a in resolver.aliases(pattern_hosts)}
+    time_to_ready: Dict[str, float] = {}
+    start = time.time()
     for i in range(0, retries):
-        try:
-            with actions(
-                roles=roles, gather_facts=False, on_error_continue=False, **kwargs
-            ) as p:
-                # We use the raw module because we can't assume at this point that
-                # python is installed
-                p.raw("hostname", task_name="Waiting for connection")
+        probed = list(pending.values())
+        if tcp_probe:
+            from enoslib.ssh import probe_tcp
+
+            probed = probe_tcp(probed)
+        unreachable = set(pending) - {h.alias for h in probed}
+        if probed:
+            try:
+                with actions(
+                    roles=probed, gather_facts=False, on_error_continue=False, **kwargs
+                ) as p:
+                    # We use the raw module because we can't assume at this
+                    # point that python is installed
+                    p.raw("hostname", task_name="Waiting for connection")
+            except EnosUnreachableHostsError as e:
+                unreachable.update(
+                    h.alias if isinstance(h, Host) else h.host for h in e.hosts
+                )
+        elapsed = time.time() - start
+        for alias in set(pending) - unreachable:
+            time_to_ready[alias] = elapsed
+            del pending[alias]
+        if not pending:
             break
-        except EnosUnreachableHostsError:
-            logger.info("Retrying... %s/%s", i + 1, retries)
-            time.sleep(interval)
+        logger.info(
+            "%s hosts not ready, retrying... %s/%s", len(pending), i + 1, retries
+        )
+        if i < retries - 1:
+            time.sleep(_backoff(i, interval))
     else:
         raise EnosSSHNotReady("Maximum retries reached")
+    logger.info(
+        "Time to ready: %s",
+        ", ".join(f"{b}: {n}" for b, n in _histogram(time_to_ready.values())),
+    )
+    return time_to_ready
 
 
 def bg_start(key: str, cmd: str) -> str:
@@ -1,6 +1,6 @@
 from collections import UserDict
 from collections.abc import MutableSet
-from typing import Iterable, Mapping, Optional
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional
 
 
 class ResourcesSet(MutableSet):
@@ -12,12 +12,47 @@ class ResourcesSet(MutableSet):
     comes for instance with some caveats however: ``resource_set[0]`` will give
     you the first resource in the *alphabetical order* not the first inserted
     machine as you'd expect with a regular list.
+
+    The sorted view used for indexing (and the secondary indexes, see
+    :py:meth:`_index`) are computed once and invalidated on mutation. The set
+    must thus be mutated through its methods (not through ``data``).
     """
 
     def __init__(self, iterable: Optional[Iterable] = None):
         self.data = set()
         if iterable is not None:
             self.data = set(iterable)
+        self._sorted: Optional[List] = None
+        self._indexes: Dict[str, Dict] = {}
+
+    def _invalidate(self):
+        self._sorted = None
+        self._indexes = {}
+
+    def _sorted_view(self) -> List:
+        if self._sorted is None:
+            # sorting to ensure determinism
+            self._sorted = sorted(self.data)
+        return self._sorted
+
+    def _index(self, name: str, key: Callable[[Any], Hashable]) -> Dict:
+        """Get (or build) a secondary index of the elements.
+
+        Args:
+            name: name of the index
+            key: function computing the key of an element
+
+        Returns:
+            A dict mapping each key to the list of the elements (sorted) with
+            this key.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            index = {}
+            for elem in self._sorted_view():
+                index.setdefault(key(elem), []).append(elem)
+            self._indexes[name] = index
+        return index
 
     def __repr__(self) -> str:
         return self.data.__repr__()
@@ -32,11 +67,14 @@ class ResourcesSet(MutableSet):
         return len(self.data)
 
     def add(self, value):
-        self.data.add(value)
+        if value not in self.data:
+            self.data.add(value)
+            self._invalidate()
 
     def discard(self, value):
         if value in self.data:
             self.data.remove(value)
+            self._invalidate()
 
     # custom methods
     #
@@ -45,6 +83,7 @@ class ResourcesSet(MutableSet):
         if isinstance(other, ResourcesSet):
             other = other.data
         self.data -= set(other)
+        self._invalidate()
         return self
 
     def __sub__(self, other):
@@ -57,6 +96,7 @@ class ResourcesSet(MutableSet):
         if isinstance(other, ResourcesSet):
             other = other.data
         self.data |= set(other)
+        self._invalidate()
         return self
 
     def __add__(self, other):
@@ -79,12 +119,11 @@ class ResourcesSet(MutableSet):
         return self + other
 
     def __getitem__(self, i):
-        # sorting to ensure determinism
-        sorted_data = sorted(list(self.data))
+        sorted_data = self._sorted_view()
         if isinstance(i, slice):
-            return ResourcesSet(elem for elem in sorted_data[i])
+            return ResourcesSet(sorted_data[i])
         else:
-            return [elem for elem in sorted_data if elem == sorted_data[i]][0]
+            return sorted_data[i]
 
 
 class RolesDict(UserDict):
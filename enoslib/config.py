@@ -1,9 +1,14 @@
 """
 Manage a configuration for EnOSlib.
+
+The config set by :py:func:`set_config` is shared by the whole process. The
+config set by :py:func:`config_context` is local to the current thread (or
+asyncio task): concurrent executions can use different configs.
 """
-import copy
 import logging
+import threading
 from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from typing import Any, Dict, Optional, Union
 
@@ -14,25 +19,52 @@ _config = dict(
     g5k_auto_jump=None,
     display="html",
     dump_results=None,
+    dump_max_payload_size=None,
     ansible_stdout="spinner",
+    executor="ansible",
+    facts_ttl=0,
+    facts_dir=None,
+    ansible_forks=None,
+    ansible_profile="default",
+    ansible_strategy=None,
+)
+
+# see ansible_profile in set_config
+ANSIBLE_PROFILES = ["default", "fast"]
+# see executor in set_config
+EXECUTORS = ["ansible", "ssh"]
+_config_lock = threading.Lock()
+
+# config of the current config_context (if any)
+_context_config: ContextVar[Optional[Dict]] = ContextVar(
+    "enoslib_config", default=None
 )
 
 
+def _current_config() -> Dict:
+    context_config = _context_config.get()
+    return context_config if context_config is not None else _config
+
+
 def get_config() -> Dict:
     """Get (a copy of) the current config."""
-    return copy.deepcopy(_config)
+    with _config_lock:
+        # the values are immutable, a shallow copy is enough
+        return dict(_current_config())
 
 
 def _set(key: str, value: Optional[Any]):
     if value is not None:
-        _config[key] = value
+        with _config_lock:
+            _current_config()[key] = value
 
 
 def _set_dump_results(dump_results: Optional[Union[Path, str]]):
     """Prechecks and set the dump_results key
 
     If the dump_results file exists, don't override it.
-    Instead, add a suffix (.1 or .2 ...).
+    Instead, add a counter (.1 or .2 ...) before its suffix (e.g. ``.jsonl``
+    or ``.jsonl.zst``, the compression depends on the suffix).
 
     Args:
         dump_results:  Path or str-path where the file results
@@ -44,13 +76,17 @@ def _set_dump_results(dump_results: Optional[Union[Path, str]]):
         return
     assert dump_results is not None
 
-    candidate = str(dump_results)
+    path = Path(dump_results)
+    suffixes = path.suffixes[-2:] if path.suffix == ".zst" else path.suffixes[-1:]
+    suffix = "".join(suffixes)
+    stem = path.name[: len(path.name) - len(suffix)]
+    candidate = path
     i = 1
-    while Path(candidate).exists():
-        candidate = f"{dump_results}.{i}"
+    while candidate.exists():
+        candidate = path.with_name(f"{stem}.{i}{suffix}")
         i += 1
     # we found a candidate, use it
-    _set("dump_results", Path(candidate))
+    _set("dump_results", candidate)
 
 
 def set_config(
@@ -59,6 +95,13 @@ def set_config(
     display: Optional[str] = None,
     dump_results: Optional[Union[Path, str]] = None,
     ansible_stdout: Optional[str] = None,
+    executor: Optional[str] = None,
+    facts_ttl: Optional[float] = None,
+    facts_dir: Optional[Union[Path, str]] = None,
+    dump_max_payload_size: Optional[int] = None,
+    ansible_forks: Optional[int] = None,
+    ansible_profile: Optional[str] = None,
+    ansible_strategy: Optional[str] = None,
 ):
     """Set a specific config value.
 
@@ -71,13 +114,50 @@ def set_config(
             True: force jump over the access machine
             False: disable the jump over the access machine (e.g when using the VPN)
         display: In a Jupyter environment, display objects using an HTML representation
-        dump_results: dump the command result in a file
+        dump_results: dump the command result in a file (JSON Lines, see
+            :py:mod:`enoslib.dump`)
         ansible_stdout: stdout Ansible callback to use
+        executor: backend used by :py:func:`~enoslib.api.run_command`
+            ("ansible" or "ssh", see :py:mod:`enoslib.ssh`)
+        facts_ttl: number of seconds during which the gathered facts are
+            reused (0 disables the fact cache, see :py:mod:`enoslib.facts`)
+        facts_dir: directory where the cached facts are stored (in memory
+            only if not set)
+        dump_max_payload_size: truncate the outputs (stdout, stderr, msg) of
+            the dumped results to this number of characters
+        ansible_forks: maximum number of hosts Ansible handles in parallel
+            (100 by default, scaled to the number of hosts and CPUs with the
+            ``fast`` profile)
+        ansible_profile: set of Ansible settings to use.
+            "default": let the ansible.cfg govern the ssh settings.
+            "fast": forks scaled to the number of hosts and CPUs, SSH
+            connections kept open across the remote actions
+            (``ControlPersist``) and pipelining enabled (this requires sudo
+            not to be configured with ``requiretty`` on the hosts).
+        ansible_strategy: strategy of the plays built by EnOSlib (e.g
+            :py:func:`~enoslib.api.run_command`,
+            :py:class:`~enoslib.api.actions`), e.g "free" or
+            "mitogen_linear". The Mitogen strategies fall back to the
+            corresponding Ansible ones if Mitogen isn't installed.
     """
+    if ansible_profile is not None and ansible_profile not in ANSIBLE_PROFILES:
+        raise ValueError(
+            f"Unknown ansible_profile {ansible_profile}, "
+            f"should be one of {ANSIBLE_PROFILES}"
+        )
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor}, should be one of {EXECUTORS}")
     _set("g5k_cache", g5k_cache)
     _set("g5k_auto_jump", g5k_auto_jump)
     _set("display", display)
     _set("ansible_stdout", ansible_stdout)
+    _set("executor", executor)
+    _set("facts_ttl", facts_ttl)
+    _set("facts_dir", facts_dir)
+    _set("dump_max_payload_size", dump_max_payload_size)
+    _set("ansible_forks", ansible_forks)
+    _set("ansible_profile", ansible_profile)
+    _set("ansible_strategy", ansible_strategy)
     _set_dump_results(dump_results)
 
     logger.debug("config = %s", get_config())
@@ -87,7 +167,9 @@ def set_config(
 def config_context(**new_config):
     """A context manager to manage a config specific to a portion of code.
 
-    The original config is restored when exiting the context manager.
+    The original config is restored when exiting the context manager. The
+    new config only applies to the current thread (or asyncio task) and to
+    the executions it starts.
 
     Args:
         new_config: any keyword argument supported by
@@ -106,9 +188,9 @@ def config_context(**new_config):
 
             # the config goes back to its previous state here
     """
-    old_config = get_config()
-    set_config(**new_config)
+    token = _context_config.set(get_config())
     try:
+        set_config(**new_config)
         yield
     finally:
-        set_config(**old_config)
+        _context_config.reset(token)
@@ -42,7 +42,8 @@ Example:
 import json
 from typing import List, Mapping, Optional
 
-from enoslib.api import get_hosts, run_command
+from enoslib.api import run_command
+from enoslib.enos_inventory import PatternResolver
 from enoslib.objects import Host, Roles
 
 
@@ -132,9 +133,10 @@ def get_dockers(
         gather_facts=False,
     )
     # parsing the results
+    resolver = PatternResolver(roles)
     for r in result:
         dockers = json.loads(r.stdout)
-        host = get_hosts(roles, r.host)[0]
+        host = resolver.get_hosts(r.host)[0]
         for docker in dockers:
             docker_host = DockerHost.from_state(docker, host)
             docker_hosts.append(docker_host)
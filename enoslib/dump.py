@@ -0,0 +1,142 @@
+"""Dump of the results of the remote actions.
+
+When ``set_config(dump_results=path)`` is used, every result (one per host
+and task) is appended to ``path`` as soon as it's received. The file is a
+stream of JSON documents, one per line (`JSON Lines <https://jsonlines.org/>`_),
+so it can be read back incrementally with :py:func:`read_results` (or any
+JSON Lines reader).
+
+The file is compressed using `Zstandard <https://facebook.github.io/zstd/>`_
+if its name ends with ``.zst`` (this requires the ``zstandard`` package, e.g.
+``pip install enoslib[zstd]``). Each execution appends a new frame to it.
+
+Large outputs can be truncated in the dump using
+``set_config(dump_max_payload_size=...)``.
+"""
+import atexit
+import io
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Union
+
+from enoslib.config import get_config
+
+logger = logging.getLogger(__name__)
+
+ZSTD_SUFFIX = ".zst"
+
+
+class DumpWriter:
+    """Append some records to a JSON Lines file.
+
+    The file is opened on the first write and kept open. Each record is
+    flushed once written: the file can be read while it's being written.
+
+    Args:
+        path: the file to append the records to
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        self.path = Path(path)
+        self._file: Optional[IO[bytes]] = None
+        self._flush: Optional[Callable[[], Any]] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> IO[bytes]:
+        if self._file is not None:
+            return self._file
+        f = self.path.open("ab")
+        if self.path.suffix == ZSTD_SUFFIX:
+            import zstandard  # pylint: disable=import-error
+
+            writer = zstandard.ZstdCompressor().stream_writer(f)
+            # make the data written so far decodable
+            self._flush = lambda: writer.flush(zstandard.FLUSH_BLOCK)
+            self._file = writer
+        else:
+            self._flush = f.flush
+            self._file = f
+        return self._file
+
+    def write(self, record: Dict[str, Any]):
+        """Append a record.
+
+        Args:
+            record: anything that is json serializable
+        """
+        line = json.dumps(record).encode() + b"\n"
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            assert self._flush is not None
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# one writer per file (concurrent executions may use different configs)
+_writers: Dict[Path, DumpWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer() -> Optional[DumpWriter]:
+    """Get the writer for the current config.
+
+    Returns:
+        None if the results mustn't be dumped.
+    """
+    dump_results = get_config().get("dump_results")
+    if dump_results is None:
+        return None
+    path = Path(dump_results)
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = DumpWriter(path)
+        return _writers[path]
+
+
+def close_writers():
+    """Close the writers.
+
+    This ends the current frame of the compressed dumps. A writer is reopened
+    on its next write. The writers are closed at the end of each execution
+    and when the interpreter exits.
+    """
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_writers)
+
+
+def read_results(path: Union[Path, str]) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a dump.
+
+    Args:
+        path: the dump file (compressed if its name ends with ``.zst``)
+
+    Yields:
+        The records (as dict), in the order they've been written
+    """
+    path = Path(path)
+    with path.open("rb") as f:
+        if path.suffix == ZSTD_SUFFIX:
+            import zstandard  # pylint: disable=import-error
+
+            reader = zstandard.ZstdDecompressor().stream_reader(
+                f, read_across_frames=True
+            )
+            lines: IO[str] = io.TextIOWrapper(reader, encoding="utf-8")
+        else:
+            lines = io.TextIOWrapper(f, encoding="utf-8")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
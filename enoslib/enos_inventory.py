@@ -1,14 +1,310 @@
-from typing import List, Mapping, Optional, Union
+import fnmatch
+import re
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import ansible
+from ansible.errors import AnsibleError
+from ansible.inventory.manager import PATTERN_WITH_SUBSCRIPT
 from ansible.inventory.manager import InventoryManager as Inventory
+from ansible.inventory.manager import order_patterns, split_host_pattern
 from ansible.parsing.dataloader import DataLoader
 from packaging import version
 
+from enoslib.config import get_config
 from enoslib.objects import Host
 
 ANSIBLE_VERSION = version.parse(ansible.__version__)
 
+# extra keys used to build the ssh options (not passed to Ansible)
+SSH_EXTRA_KEYS = ["gateway", "gateway_user", "forward_agent"]
+
+# number of distinct roles whose inventory plan is kept in memory
+PLAN_CACHE_SIZE = 8
+
+# names that resolve to the implicit localhost in Ansible
+LOCALHOST = ["127.0.0.1", "localhost", "::1"]
+LOCALHOST_ADDRESS = "127.0.0.1"
+
+# variables of all the hosts for each Ansible profile (see ansible_profile in
+# set_config). The fast profile keeps the ssh connections open across the
+# remote actions and pipes the modules instead of copying them first.
+PROFILE_VARS: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "fast": dict(
+        ansible_ssh_args="-o ControlMaster=auto -o ControlPersist=10m",
+        ansible_pipelining=True,
+    ),
+}
+
+
+def _build_ssh_common_args(machine: Host) -> str:
+    """Build the ssh options needed to reach a Host.
+
+    This takes care of the ``forward_agent``, ``gateway`` and
+    ``gateway_user`` keys of the extra attribute.
+    """
+    common_args = [
+        "-o StrictHostKeyChecking=no",
+        "-o UserKnownHostsFile=/dev/null",
+    ]
+    forward_agent = machine.extra.get("forward_agent", False)
+    if forward_agent:
+        common_args.append("-o ForwardAgent=yes")
+
+    gateway = machine.extra.get("gateway", None)
+    if gateway is not None:
+        proxy_cmd = [
+            "ssh -W %h:%p",
+            "-o StrictHostKeyChecking=no",
+            "-o UserKnownHostsFile=/dev/null",
+        ]
+        # Disabling also hostkey checking for the gateway
+        gateway_user = machine.extra.get("gateway_user", machine.user)
+        if gateway_user is not None:
+            proxy_cmd.append(f"-l {gateway_user}")
+
+        proxy_cmd.append(gateway)
+        final_proxy_cmd = " ".join(proxy_cmd)
+        common_args.append(f'-o ProxyCommand="{final_proxy_cmd}"')
+
+    return " ".join(common_args)
+
+
+def _host_vars(machine: Host) -> Dict:
+    """Build the inventory variables of a Host."""
+    host_vars: Dict[str, Any] = dict(ansible_host=machine.address)
+    if machine.user is not None:
+        host_vars.update(ansible_ssh_user=machine.user)
+    if machine.port is not None:
+        host_vars.update(ansible_port=machine.port)
+    if machine.keyfile is not None:
+        host_vars.update(ansible_ssh_private_key_file=machine.keyfile)
+    host_vars.update(ansible_ssh_common_args=_build_ssh_common_args(machine))
+    for k, v in machine.extra.items():
+        if k not in SSH_EXTRA_KEYS:
+            host_vars[k] = v
+    return host_vars
+
+
+class _InventoryPlan(NamedTuple):
+    """What needs to be added to an inventory to reflect some roles.
+
+    groups: the aliases of the hosts of each group
+    hosts: the address and the variables of each host (by alias)
+    """
+
+    groups: List[Tuple[str, List[str]]]
+    hosts: Dict[str, Tuple[str, Dict]]
+
+
+def _fingerprint(roles: Mapping) -> Tuple:
+    """Identify the content of some roles (as seen by an inventory)."""
+    return tuple(
+        (
+            role,
+            tuple(
+                (m.alias, m.address, m.user, m.port, m.keyfile, repr(m.extra))
+                for m in machines
+                if isinstance(m, Host)
+            ),
+        )
+        for role, machines in roles.items()
+    )
+
+
+def _build_plan(roles: Mapping) -> _InventoryPlan:
+    groups: List[Tuple[str, List[str]]] = []
+    hosts: Dict[str, Tuple[str, Dict]] = {}
+    # the same Host object is often found in several roles
+    seen: Dict[int, str] = {}
+    for role, machines in roles.items():
+        aliases = []
+        for machine in machines:
+            # only Host can be accessed by ssh
+            if not isinstance(machine, Host):
+                continue
+            alias = machine.alias if machine.alias is not None else machine.address
+            aliases.append(alias)
+            if seen.get(id(machine)) == alias:
+                continue
+            seen[id(machine)] = alias
+            hosts[alias] = (machine.address, _host_vars(machine))
+        groups.append((role, aliases))
+    return _InventoryPlan(groups=groups, hosts=hosts)
+
+
+_plan_cache: "OrderedDict[Tuple, _InventoryPlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def _get_plan(roles: Mapping) -> _InventoryPlan:
+    """Get the inventory plan of some roles.
+
+    Plans are cached based on the content of the roles, so that consecutive
+    remote actions on the same roles don't recompute the hosts variables.
+    """
+    key = _fingerprint(roles)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    plan = _build_plan(roles)
+    with _plan_cache_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+class PatternResolver:
+    """Resolve Ansible host patterns directly on some roles.
+
+    This follows the semantic of the Ansible inventory (see
+    https://docs.ansible.com/ansible/latest/intro_patterns.html): groups and
+    hosts aliases, ``,`` or ``:`` separated patterns, ``&`` and ``!``
+    modifiers, wildcards, ``~`` regexes and ``[x]``/``[x:y]`` subscripts.
+    But no Ansible inventory is built: hosts are indexed by alias and address
+    once and each pattern is then resolved against those indexes.
+
+    Args:
+        roles: the roles (groups) to resolve the patterns against
+    """
+
+    def __init__(self, roles: Mapping):
+        # group name -> aliases (dict used as an ordered set)
+        groups: Dict[str, Dict[str, None]] = {"all": {}, "ungrouped": {}}
+        self.by_alias: Dict[str, Host] = {}
+        self.by_address: Dict[str, List[Host]] = {}
+        for role, machines in roles.items():
+            aliases = groups.setdefault(role, {})
+            for machine in machines:
+                if not isinstance(machine, Host):
+                    continue
+                alias = machine.alias if machine.alias is not None else machine.address
+                aliases[alias] = None
+                if alias not in self.by_alias:
+                    self.by_alias[alias] = machine
+                same_address = self.by_address.setdefault(machine.address, [])
+                if machine not in same_address:
+                    same_address.append(machine)
+        # all: the hosts put explicitly in all then the hosts of the other
+        # groups (same order as Ansible)
+        for role, aliases in groups.items():
+            if role != "all":
+                groups["all"].update(aliases)
+        # ungrouped: the hosts that belong to no other group than all
+        grouped = {
+            alias
+            for role, aliases in groups.items()
+            if role not in ("all", "ungrouped")
+            for alias in aliases
+        }
+        groups["ungrouped"] = {a: None for a in groups["all"] if a not in grouped}
+        self.groups: Dict[str, List[str]] = {g: list(a) for g, a in groups.items()}
+        self._cache: Dict[str, List[str]] = {}
+
+    def _match_list(self, items: Iterable[str], pattern: str) -> List[str]:
+        try:
+            if pattern[0] == "~":
+                regex = re.compile(pattern[1:])
+            else:
+                regex = re.compile(fnmatch.translate(pattern))
+        except re.error:
+            raise AnsibleError(f"Invalid host list pattern: {pattern}")
+        return [item for item in items if regex.match(item)]
+
+    def _enumerate_matches(self, pattern: str) -> List[str]:
+        results: List[str] = []
+        matching_groups = self._match_list(self.groups, pattern)
+        for group in matching_groups:
+            results.extend(self.groups[group])
+        if (
+            not matching_groups
+            or pattern[0] == "~"
+            or any(special in pattern for special in (".", "?", "*", "["))
+        ):
+            if pattern in self.by_alias:
+                # fast path (e.g a single host)
+                results.append(pattern)
+            else:
+                results.extend(self._match_list(self.by_alias, pattern))
+        return results
+
+    def _match_one_pattern(self, pattern: str) -> List[str]:
+        if pattern[0] in ("&", "!"):
+            pattern = pattern[1:]
+        if pattern in self._cache:
+            return self._cache[pattern]
+        expr, subscript = pattern, None
+        m = PATTERN_WITH_SUBSCRIPT.match(pattern) if pattern[0] != "~" else None
+        if m:
+            (expr, idx, start, _, end) = m.groups()
+            subscript = (int(idx), None) if idx else (int(start), int(end or -1))
+        aliases = list(dict.fromkeys(self._enumerate_matches(expr)))
+        if aliases and subscript is not None:
+            (first, last) = subscript
+            try:
+                if last is None:
+                    aliases = [aliases[first]]
+                else:
+                    last = len(aliases) - 1 if last == -1 else last
+                    aliases = aliases[first : last + 1]
+            except IndexError:
+                raise AnsibleError(
+                    f"No hosts matched the subscripted pattern '{pattern}'"
+                )
+        self._cache[pattern] = aliases
+        return aliases
+
+    def aliases(self, pattern_hosts: str = "all") -> List[str]:
+        """Get the aliases of the hosts matching the pattern."""
+        aliases: List[str] = []
+        for p in order_patterns(split_host_pattern(pattern_hosts)):
+            if p in self.by_alias:
+                # a plain host: as Ansible does, it takes precedence over a
+                # group with the same name (but not in "!p" or "&p")
+                aliases.append(p)
+                continue
+            that = self._match_one_pattern(p)
+            if p[0] == "!":
+                excluded = set(that)
+                aliases = [a for a in aliases if a not in excluded]
+            elif p[0] == "&":
+                kept = set(that)
+                aliases = [a for a in aliases if a in kept]
+            else:
+                aliases.extend(that)
+        return list(dict.fromkeys(aliases))
+
+    def get_hosts(self, pattern_hosts: str = "all") -> List[Host]:
+        """Get all the hosts matching the pattern.
+
+        As with an Ansible inventory, hosts are identified by their
+        address: all the hosts sharing an address with a matching host are
+        returned.
+        """
+        addresses = [self.by_alias[a].address for a in self.aliases(pattern_hosts)]
+        if not addresses and pattern_hosts in LOCALHOST:
+            # Ansible falls back to an implicit localhost
+            addresses = [LOCALHOST_ADDRESS]
+        hosts: List[Host] = []
+        for address in dict.fromkeys(addresses):
+            hosts.extend(self.by_address.get(address, []))
+        return hosts
+
 
 class EnosInventory(Inventory):
     def __init__(
@@ -44,61 +340,28 @@ class EnosInventory(Inventory):
             roles = {}
 
         self._populate_with_roles(roles)
+        # group variables: the hosts variables still have the precedence
+        profile_vars = PROFILE_VARS[get_config()["ansible_profile"]]
+        for k, v in profile_vars.items():
+            self.groups["all"].set_variable(k, v)
 
     def _populate_with_roles(self, roles: Mapping):
-
-        for role, machines in roles.items():
+        plan = _get_plan(roles)
+        for role, aliases in plan.groups:
             self.add_group(role)
-            for machine in machines:
-                # only Host can be accessed by ssh
-                if not isinstance(machine, Host):
-                    continue
-                self.add_host(machine.alias, group=role)
-                # let's add some variable to that host
-                # this used to work until Ansible 2.12
-                host = self.get_host(machine.alias)
-                # this is required by Ansible 2.13 to correctly connect to the
-                # host
-                host.address = machine.address
-                host.set_variable("ansible_host", machine.address)
-                if machine.user is not None:
-                    host.set_variable("ansible_ssh_user", machine.user)
-                if machine.port is not None:
-                    host.set_variable("ansible_port", machine.port)
-                if machine.keyfile is not None:
-                    host.set_variable("ansible_ssh_private_key_file", machine.keyfile)
-                common_args = [
-                    "-o StrictHostKeyChecking=no",
-                    "-o UserKnownHostsFile=/dev/null",
-                ]
-                forward_agent = machine.extra.get("forward_agent", False)
-                if forward_agent:
-                    common_args.append("-o ForwardAgent=yes")
-
-                gateway = machine.extra.get("gateway", None)
-                if gateway is not None:
-                    proxy_cmd = [
-                        "ssh -W %h:%p",
-                        "-o StrictHostKeyChecking=no",
-                        "-o UserKnownHostsFile=/dev/null",
-                    ]
-                    # Disabling also hostkey checking for the gateway
-                    gateway_user = machine.extra.get("gateway_user", machine.user)
-                    if gateway_user is not None:
-                        proxy_cmd.append(f"-l {gateway_user}")
-
-                    proxy_cmd.append(gateway)
-                    final_proxy_cmd = " ".join(proxy_cmd)
-                    common_args.append(f'-o ProxyCommand="{final_proxy_cmd}"')
-
-                final_common_args = " ".join(common_args)
-                host.set_variable("ansible_ssh_common_args", f"{final_common_args}")
-
-                for k, v in machine.extra.items():
-                    if k not in ["gateway", "gateway_user", "forward_agent"]:
-                        host.set_variable(k, v)
-
-                self.reconcile_inventory()
+            for alias in aliases:
+                self.add_host(alias, group=role)
+        for alias, (address, host_vars) in plan.hosts.items():
+            # let's add some variable to that host
+            # this used to work until Ansible 2.12
+            host = self.get_host(alias)
+            # this is required by Ansible 2.13 to correctly connect to the
+            # host
+            host.address = address
+            for k, v in host_vars.items():
+                host.set_variable(k, v)
+        # once for all the hosts
+        self.reconcile_inventory()
 
     def to_ini_string(self) -> str:
         def to_inventory_string(v) -> str:
@@ -0,0 +1,180 @@
+"""Cache of the Ansible facts.
+
+Gathering the facts costs a connection and the run of the setup module on
+every host. :py:func:`~enoslib.api.gather_facts`,
+:py:func:`~enoslib.api.sync_info` and the actions that need the facts
+(``actions(gather_facts=True)``, ``run_command(..., gather_facts=True)``,
+hence some services like :py:class:`~enoslib.service.dstat.dstat.Dstat` or
+:py:class:`~enoslib.service.emul.netem.Netem`) can reuse the facts gathered
+recently instead of gathering them again.
+
+The cache is disabled by default. It is enabled by setting the time to live
+(in seconds) of the facts: ``set_config(facts_ttl=600)``. The facts are kept
+in memory and optionally stored in a directory (one JSON file per host) to
+survive across the executions, e.g. in the experiment environment:
+``set_config(facts_ttl=600, facts_dir=env["resultdir"] / "facts")``.
+
+The facts of a host are stored for a given subset (see the ``gather_subset``
+option of the setup module). Facts gathered with the ``all`` subset are
+reused for any other subset. Use :py:func:`invalidate_facts` when the hosts
+are known to have changed (e.g. after a reconfiguration of the network).
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from enoslib.config import get_config
+from enoslib.objects import Host
+
+logger = logging.getLogger(__name__)
+
+SUBSET_ALL = "all"
+
+
+def _subset_key(gather_subset: Union[str, List[str]]) -> str:
+    """Normalize a gather_subset option (e.g "network,!min")."""
+    if isinstance(gather_subset, str):
+        gather_subset = gather_subset.split(",")
+    subsets = sorted({s.strip() for s in gather_subset if s.strip()})
+    return ",".join(subsets) if subsets else SUBSET_ALL
+
+
+class FactCache:
+    """Facts of the hosts with a time to live.
+
+    Args:
+        ttl: number of seconds during which the facts of a host are valid
+        directory: where to store the facts (in memory only if None)
+    """
+
+    def __init__(self, ttl: float, directory: Optional[Union[Path, str]] = None):
+        self.ttl = ttl
+        self.directory = Path(directory) if directory is not None else None
+        # alias -> dict(address=..., entries={subset: {timestamp, facts}})
+        self._hosts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, alias: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{alias}.json"
+
+    def _load(self, host: Host) -> Optional[Dict]:
+        alias = host.alias if host.alias is not None else host.address
+        if alias in self._hosts:
+            cached = self._hosts[alias]
+        elif self.directory is not None and self._path(alias).exists():
+            try:
+                cached = json.loads(self._path(alias).read_text())
+            except (OSError, ValueError) as e:
+                logger.debug("Ignoring the cached facts of %s: %s", alias, e)
+                return None
+            self._hosts[alias] = cached
+        else:
+            return None
+        if cached.get("address") != host.address:
+            # same alias but another host
+            return None
+        return cached
+
+    def get(self, host: Host, gather_subset: Union[str, List[str]]) -> Optional[Dict]:
+        """Get the (valid) facts of a host.
+
+        Args:
+            host: the host
+            gather_subset: subset of the facts needed
+
+        Returns:
+            The facts or None if there's no valid facts for this subset.
+        """
+        key = _subset_key(gather_subset)
+        now = time.time()
+        with self._lock:
+            cached = self._load(host)
+        if cached is None:
+            return None
+        for candidate in [key, SUBSET_ALL]:
+            entry = cached["entries"].get(candidate)
+            if entry is not None and now - entry["timestamp"] < self.ttl:
+                return entry["facts"]
+        return None
+
+    def set(self, host: Host, gather_subset: Union[str, List[str]], facts: Dict):
+        """Set the facts of a host (gathered now).
+
+        Args:
+            host: the host
+            gather_subset: subset of the facts gathered
+            facts: the facts (as returned by the setup module)
+        """
+        alias = host.alias if host.alias is not None else host.address
+        entry = dict(timestamp=time.time(), facts=facts)
+        with self._lock:
+            cached = self._load(host)
+            if cached is None:
+                cached = dict(address=host.address, entries={})
+                self._hosts[alias] = cached
+            cached["entries"][_subset_key(gather_subset)] = entry
+            if self.directory is not None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._path(alias).write_text(json.dumps(cached))
+
+    def invalidate(self, hosts: Optional[Iterable[Host]] = None):
+        """Forget the facts of some hosts.
+
+        Args:
+            hosts: the hosts to forget about (all if None)
+        """
+        with self._lock:
+            if hosts is None:
+                aliases = list(self._hosts.keys())
+                if self.directory is not None and self.directory.exists():
+                    aliases.extend(p.stem for p in self.directory.glob("*.json"))
+            else:
+                aliases = [h.alias if h.alias is not None else h.address for h in hosts]
+            for alias in set(aliases):
+                self._hosts.pop(alias, None)
+                if self.directory is not None:
+                    try:
+                        self._path(alias).unlink()
+                    except FileNotFoundError:
+                        pass
+
+
+# one cache per directory (concurrent executions may use different configs)
+_caches: Dict[Optional[Path], FactCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_fact_cache() -> Optional[FactCache]:
+    """Get the fact cache shared by all the calls.
+
+    Returns:
+        None if the cache is disabled (see ``facts_ttl`` in
+        :py:func:`~enoslib.config.set_config`)
+    """
+    config = get_config()
+    ttl = config["facts_ttl"]
+    if not ttl:
+        return None
+    directory = config["facts_dir"]
+    directory = Path(directory) if directory is not None else None
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = FactCache(ttl, directory=directory)
+        cache = _caches[directory]
+        cache.ttl = ttl
+        return cache
+
+
+def invalidate_facts(hosts: Optional[Iterable[Host]] = None):
+    """Forget the cached facts of some hosts.
+
+    Args:
+        hosts: the hosts to forget about (all if None)
+    """
+    cache = get_fact_cache()
+    if cache is not None:
+        cache.invalidate(hosts)
@@ -5,7 +5,6 @@ from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple
 from grid5000.base import RESTObject
 from grid5000.objects import Node, Vlan
 from netaddr.ip import IPNetwork
-from netaddr.ip.sets import IPSet
 
 from enoslib.config import get_config
 from enoslib.infra.enos_g5k.constants import G5KMACPREFIX, KAVLAN_LOCAL_IDS
@@ -791,8 +790,7 @@ class G5kEnosVlan4Network(DefaultNetwork):
     def has_free_ips(self) -> bool:
         return True
 
-    @property
-    def free_ips(self) -> Generator[AddressInterfaceType, None, None]:
+    def free_ip_ranges(self) -> List[Tuple[int, int]]:
         # On the network, the first IP are reserved to g5k machines.
         # For a routed vlan I don't know exactly how many ip are
         # reserved. However, the specification is clear about global
@@ -808,19 +806,24 @@ class G5kEnosVlan4Network(DefaultNetwork):
         # dedicated to g5k machines, and (ii) drops the last one
         # because some of ips are used for specific stuff such as
         # gateway, kavlan server...
-        subnets = IPNetwork(str(self.network))
         if self.vlan_id in KAVLAN_LOCAL_IDS:
-            # vlan local
-            subnets = list(subnets.subnet(24))
-            subnets = subnets[4:7]
+            # vlan local: the 4th to 6th /24
+            size, first, last = 256, 4, 7
         else:
-            subnets = list(subnets.subnet(23))
-            subnets = subnets[13:31]
+            size, first, last = 512, 13, 31
+        # the range of available ips (contiguous subnets)
+        network_address = int(self.network.network_address)
+        end = int(self.network.broadcast_address) + 1
+        start = min(network_address + first * size, end)
+        stop = min(network_address + last * size, end)
+        return [(start, stop)] if start < stop else []
 
-        # Finally, compute the range of available ips
-        # and yield in the standard ipaddress world
-        for addr in IPSet(subnets).iprange():
-            yield ipaddress.ip_address(addr)
+    @property
+    def free_ips(self) -> Generator[AddressInterfaceType, None, None]:
+        # yield in the standard ipaddress world
+        for start, stop in self.free_ip_ranges():
+            for addr in range(start, stop):
+                yield self.ip_from_int(addr)
 
 
 class G5kEnosVlan6Network(G5kEnosVlan4Network):
@@ -833,13 +836,15 @@ class G5kEnosVlan6Network(G5kEnosVlan4Network):
     site_index) will give us some free ips.
     """
 
-    @property
-    def free_ips(self) -> Generator[AddressInterfaceType, None, None]:
-        subnets = IPNetwork(str(self.network))
-        start = subnets.network + 256
-        subnet = IPNetwork(f"{start}/70")
-        for addr in subnet.iter_hosts():
-            yield ipaddress.ip_address(addr.value)
+    def free_ip_ranges(self) -> List[Tuple[int, int]]:
+        # the hosts of the /70 containing the 256th address (the first one is
+        # the subnet-router anycast address)
+        subnet = ipaddress.ip_network(
+            f"{self.network.network_address + 256}/70", strict=False
+        )
+        return [
+            (int(subnet.network_address) + 1, int(subnet.broadcast_address) + 1)
+        ]
 
     @property
     def gateway(self) -> None:
@@ -875,16 +880,40 @@ class G5kEnosSubnetNetwork(DefaultNetwork):
     def has_free_ips(self) -> bool:
         return True
 
+    def free_ip_ranges(self) -> List[Tuple[int, int]]:
+        # all the addresses but the first and the last ones
+        return [
+            (
+                int(self.network.network_address) + 1,
+                int(self.network.broadcast_address),
+            )
+        ]
+
     @property
     def free_ips(self) -> Generator[AddressInterfaceType, None, None]:
-        for ip, _ in build_ipmac(str(self.network)):
-            yield ipaddress.ip_address(ip)
+        for start, stop in self.free_ip_ranges():
+            for ip in range(start, stop):
+                yield self.ip_from_int(ip)
 
     @property
     def has_free_macs(self) -> bool:
         return True
 
+    def free_mac_ranges(self) -> List[Tuple[int, int]]:
+        # the mac of an ip ends with the last 3 bytes of the ip
+        # (see build_ipmac)
+        prefix = int(G5KMACPREFIX.replace(":", ""), 16) << 24
+        return [
+            (prefix + (start & 0xFFFFFF), prefix + (start & 0xFFFFFF) + stop - start)
+            for start, stop in self.free_ip_ranges()
+        ]
+
+    def mac_from_int(self, value: int) -> str:
+        x, y, z = value.to_bytes(6, "big")[3:]
+        return G5KMACPREFIX + f":{x:02X}:{y:02X}:{z:02X}"
+
     @property
     def free_macs(self) -> Generator[str, None, None]:
-        for _, mac in build_ipmac(str(self.network)):
-            yield mac
+        for start, stop in self.free_mac_ranges():
+            for mac in range(start, stop):
+                yield self.mac_from_int(mac)
@@ -99,17 +99,18 @@ def mac_range(
     to_skip = skip
     _g5k_subnets = sorted(g5k_subnets, key=operator.attrgetter("network"))
     for g5k_subnet in _g5k_subnets:
-        it_mac = g5k_subnet.free_macs
+        # the pool is made of ranges: its size and the skipped macs are
+        # computed without walking it
+        macs = g5k_subnet.make_mac_pool()
+        size = len(macs)
         # we always skip the first one as this could not be a regular address
         # e.g 10.158.0.0
-        next(iter(it_mac))
-        emitted = False
-        for mac in itertools.islice(it_mac, to_skip, None, step):
+        if 1 + to_skip < size:
+            macs.skip(1 + to_skip)
             # yield EUI(mac, dialect=mac_unix_expanded)
-            yield mac
-            emitted = True
-        if not emitted:
-            to_skip -= len(list(g5k_subnet.free_macs))
+            yield from itertools.islice(macs, 0, None, step)
+        else:
+            to_skip = max(0, to_skip - size)
     return
 
 
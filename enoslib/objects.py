@@ -17,6 +17,7 @@ abstract resource description into concrete library level objects.
 """
 import copy
 from abc import ABC, abstractmethod
+from bisect import bisect_right
 from dataclasses import InitVar, dataclass, field
 from ipaddress import (
     IPv4Address,
@@ -31,9 +32,12 @@ from ipaddress import (
 from itertools import islice
 from pathlib import Path
 from typing import (
+    Any,
+    Callable,
     Dict,
     Generator,
     Iterable,
+    Iterator,
     List,
     Mapping,
     MutableMapping,
@@ -75,15 +79,170 @@ def _build_devices(
     facts: Mapping, networks: "Networks"
 ) -> Set[Union["NetDevice", "BridgeDevice"]]:
     """Extract the network devices information from the facts."""
+    index = _network_index(networks)
     devices = set()
     for interface in facts["ansible_interfaces"]:
         ansible_interface = "ansible_" + interface
         # filter here (active/ name...)
         if ansible_interface in facts:
-            devices.add(NetDevice.sync_from_ansible(facts[ansible_interface], networks))
+            devices.add(NetDevice.sync_from_ansible(facts[ansible_interface], index))
     return devices
 
 
+def _ranges(values: Iterable[int]) -> List[Tuple[int, int]]:
+    """Compact some sorted integers into ranges ([start, stop))."""
+    ranges: List[Tuple[int, int]] = []
+    for value in values:
+        if ranges and ranges[-1][1] == value:
+            ranges[-1] = (ranges[-1][0], value + 1)
+        else:
+            ranges.append((value, value + 1))
+    return ranges
+
+
+def _ip_to_int(ip: Union[int, AddressType]) -> int:
+    if isinstance(ip, int):
+        return ip
+    return int(ip_address(ip))
+
+
+def _mac_to_int(mac: Union[int, str, EUI]) -> int:
+    if isinstance(mac, int):
+        return mac
+    return int(EUI(mac))
+
+
+class AddressPool:
+    """Stateful allocator of addresses (or any integer based values).
+
+    The free values are kept as sorted disjoint ranges of integers: reserving
+    (or releasing) n values costs O(n), whatever the size of the pool and the
+    number of values already reserved.
+
+    .. code-block:: python
+
+        pool = network.ip_pool
+        ips = pool.reserve(10)
+        pool.release(ips[:2])
+        saved = pool.to_dict()
+
+    Args:
+        ranges: the initial ranges of free values (``[start, stop)``)
+        convert: builds a value (e.g. an address) from an integer
+        parse: gets the integer of a value (e.g. when releasing it)
+    """
+
+    def __init__(
+        self,
+        ranges: Iterable[Tuple[int, int]] = (),
+        convert: Callable[[int], Any] = int,
+        parse: Callable[[Any], int] = int,
+    ):
+        self.convert = convert
+        self.parse = parse
+        # sorted, disjoint and non adjacent ranges
+        self._starts: List[int] = []
+        self._stops: List[int] = []
+        self._size = 0
+        for start, stop in ranges:
+            self._add(start, stop)
+
+    def _add(self, start: int, stop: int):
+        if start >= stop:
+            return
+        i = bisect_right(self._starts, start)
+        if i > 0 and self._stops[i - 1] >= start:
+            # merge with the previous range
+            i -= 1
+            start = self._starts[i]
+        j = i
+        removed = 0
+        while j < len(self._starts) and self._starts[j] <= stop:
+            stop = max(stop, self._stops[j])
+            removed += self._stops[j] - self._starts[j]
+            j += 1
+        self._starts[i:j] = [start]
+        self._stops[i:j] = [stop]
+        self._size += stop - start - removed
+
+    def _take(self, n: int) -> List[Tuple[int, int]]:
+        taken = []
+        consumed = 0
+        while n > 0 and consumed < len(self._starts):
+            start, stop = self._starts[consumed], self._stops[consumed]
+            count = min(n, stop - start)
+            taken.append((start, start + count))
+            n -= count
+            self._size -= count
+            if start + count == stop:
+                consumed += 1
+            else:
+                self._starts[consumed] = start + count
+        del self._starts[:consumed]
+        del self._stops[:consumed]
+        return taken
+
+    def reserve(self, n: int) -> List[Any]:
+        """Reserve some values (the lowest free ones).
+
+        Args:
+            n: the number of values to reserve
+
+        Returns:
+            The values reserved
+
+        Raises:
+            ValueError: if there's not enough free values (nothing is
+                reserved then)
+        """
+        if n > len(self):
+            raise ValueError(f"{n} values requested but only {len(self)} are free")
+        return [
+            self.convert(value)
+            for start, stop in self._take(n)
+            for value in range(start, stop)
+        ]
+
+    def skip(self, n: int):
+        """Reserve the n lowest free values without building them."""
+        self._take(n)
+
+    def release(self, values: Iterable[Any]):
+        """Give back some values to the pool."""
+        for value in sorted(self.parse(v) for v in values):
+            self._add(value, value + 1)
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        """The free values as ranges of integers (``[start, stop)``)."""
+        return list(zip(self._starts, self._stops))
+
+    def to_dict(self) -> Dict:
+        return dict(ranges=[list(r) for r in self.ranges])
+
+    @classmethod
+    def from_dict(
+        cls,
+        d: Mapping,
+        convert: Callable[[int], Any] = int,
+        parse: Callable[[Any], int] = int,
+    ) -> "AddressPool":
+        return cls(
+            [(start, stop) for start, stop in d["ranges"]],
+            convert=convert,
+            parse=parse,
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over the free values (without reserving them)."""
+        for start, stop in self.ranges:
+            for value in range(start, stop):
+                yield self.convert(value)
+
+    def __len__(self) -> int:
+        return self._size
+
+
 class Network(ABC):
     """Base class for the library level network abstraction.
 
@@ -148,6 +307,58 @@ class Network(ABC):
     def free_macs(self) -> Iterable[str]:
         yield from ()
 
+    def free_ip_ranges(self) -> List[Tuple[int, int]]:
+        """Get the free ips as ranges of integers (``[start, stop)``).
+
+        The default implementation walks :py:attr:`free_ips` once.
+        """
+        return _ranges(int(ip) for ip in self.free_ips)
+
+    def free_mac_ranges(self) -> List[Tuple[int, int]]:
+        """Get the free macs as ranges of integers (``[start, stop)``).
+
+        The default implementation walks :py:attr:`free_macs` once.
+        """
+        return _ranges(int(EUI(mac)) for mac in self.free_macs)
+
+    def ip_from_int(self, value: int) -> AddressInterfaceType:
+        """Build an ip of this network from its integer value."""
+        return ip_address(value)
+
+    def mac_from_int(self, value: int) -> Any:
+        """Build a mac of this network from its integer value."""
+        return EUI(value)
+
+    def make_ip_pool(self) -> AddressPool:
+        """Build a new allocator of the free ips."""
+        return AddressPool(
+            self.free_ip_ranges(), convert=self.ip_from_int, parse=_ip_to_int
+        )
+
+    def make_mac_pool(self) -> AddressPool:
+        """Build a new allocator of the free macs."""
+        return AddressPool(
+            self.free_mac_ranges(), convert=self.mac_from_int, parse=_mac_to_int
+        )
+
+    @property
+    def ip_pool(self) -> AddressPool:
+        """The allocator of the free ips of this network (built on first use).
+
+        Unlike :py:attr:`free_ips`, the ips reserved from this pool (e.g.
+        ``network.ip_pool.reserve(10)``) won't be given again.
+        """
+        if getattr(self, "_ip_pool", None) is None:
+            self._ip_pool = self.make_ip_pool()
+        return self._ip_pool
+
+    @property
+    def mac_pool(self) -> AddressPool:
+        """The allocator of the free macs of this network (built on first use)."""
+        if getattr(self, "_mac_pool", None) is None:
+            self._mac_pool = self.make_mac_pool()
+        return self._mac_pool
+
 
 class DefaultNetwork(Network):
     """
@@ -230,6 +441,13 @@ class DefaultNetwork(Network):
                 yield ip_address(i)
         yield from ()
 
+    def free_ip_ranges(self) -> List[Tuple[int, int]]:
+        if self.has_free_ips:
+            assert self.pool_start is not None
+            assert self.pool_end is not None
+            return [(int(self.pool_start), int(self.pool_end))]
+        return []
+
     @property
     def has_free_macs(self) -> bool:
         return (
@@ -247,6 +465,13 @@ class DefaultNetwork(Network):
                 yield EUI(item)
         yield from ()
 
+    def free_mac_ranges(self) -> List[Tuple[int, int]]:
+        if self.has_free_macs:
+            assert self.pool_mac_start is not None
+            assert self.pool_mac_end is not None
+            return [(int(self.pool_mac_start), int(self.pool_mac_end))]
+        return []
+
     @repr_html_check
     def _repr_html_(self, content_only: bool = False) -> str:
         """
@@ -273,23 +498,146 @@ class DefaultNetwork(Network):
         return html_from_dict(name_class, d, content_only=content_only)
 
 
+class NetworkIndex:
+    """Longest prefix match of addresses against some networks.
+
+    The networks are stored in one hash table per prefix length (and IP
+    version): looking up an address costs one dict lookup per distinct prefix
+    length, whatever the number of networks.
+
+    Args:
+        networks: the networks to index
+    """
+
+    def __init__(self, networks: Iterable[Network] = ()):
+        # version -> [(prefix length, netmask, network address -> networks)]
+        # (the most specific first)
+        self._tables: Dict[int, List[Tuple[int, int, Dict[int, List[Network]]]]] = {
+            4: [],
+            6: [],
+        }
+        self._networks: List[Network] = []
+        for network in networks:
+            self.add(network)
+
+    def add(self, network: Network):
+        """Index a network."""
+        net = network.network
+        tables = self._tables[net.version]
+        for prefixlen, _, table in tables:
+            if prefixlen == net.prefixlen:
+                break
+        else:
+            table = {}
+            tables.append((net.prefixlen, int(net.netmask), table))
+            tables.sort(key=lambda t: t[0], reverse=True)
+        table.setdefault(int(net.network_address), []).append(network)
+        self._networks.append(network)
+
+    def _matches(
+        self, ip: Union[AddressInterfaceType, IPv4Interface, IPv6Interface, str]
+    ) -> Iterator[List[Network]]:
+        if isinstance(ip, str):
+            ip = ip_interface(ip)
+        value = int(ip)
+        for _, netmask, table in self._tables[ip.version]:
+            networks = table.get(value & netmask)
+            if networks:
+                yield networks
+
+    def lookup(
+        self, ip: Union[AddressInterfaceType, IPv4Interface, IPv6Interface, str]
+    ) -> Optional[Network]:
+        """Get the most specific network an address belongs to.
+
+        Args:
+            ip: the address (the prefix of an interface is ignored)
+
+        Returns:
+            The network with the longest prefix containing the address (the
+            last one indexed if several networks have this prefix) or None.
+        """
+        for networks in self._matches(ip):
+            return networks[-1]
+        return None
+
+    def containing(
+        self, ip: Union[AddressInterfaceType, IPv4Interface, IPv6Interface, str]
+    ) -> List[Network]:
+        """Get all the networks an address belongs to (the most specific first).
+
+        Args:
+            ip: the address (the prefix of an interface is ignored)
+        """
+        return [network for networks in self._matches(ip) for network in networks]
+
+    def __iter__(self) -> Iterator[Network]:
+        return iter(self._networks)
+
+    def __len__(self) -> int:
+        return len(self._networks)
+
+
 class NetworksView(ResourcesSet):
     """A specialization of :py:class:`~enoslib.collections.ResourceSet`
 
     for :py:class:`~enoslib.objects.Networks`.
+
+    The :py:class:`~enoslib.objects.NetworkIndex` of the networks is built on
+    first use and invalidated on mutation.
     """
 
     inner = Network
 
+    def __init__(self, iterable: Optional[Iterable] = None):
+        super().__init__(iterable)
+        self._network_index: Optional[NetworkIndex] = None
+        # bumped on each mutation (see Networks.index)
+        self._generation = 0
+
+    def _invalidate(self):
+        super()._invalidate()
+        self._network_index = None
+        self._generation += 1
+
+    def index(self) -> NetworkIndex:
+        """Get the index of these networks."""
+        if self._network_index is None:
+            self._network_index = NetworkIndex(self._sorted_view())
+        return self._network_index
+
 
 class Networks(RolesDict):
     """A specialization of :py:class:`~enoslib.collections.RolesDict`
 
     for :py:class:`~enoslib.objects.NetworksView`.
+
+    The :py:class:`~enoslib.objects.NetworkIndex` of all the networks is built
+    on first use and rebuilt only if a role or a view changed.
     """
 
     inner = NetworksView
 
+    def __init__(self, *args, **kwargs):
+        self._network_index: Optional[NetworkIndex] = None
+        self._network_index_key: Optional[Tuple] = None
+        super().__init__(*args, **kwargs)
+
+    def index(self) -> NetworkIndex:
+        """Get the index of all the networks (of all the roles)."""
+        key = tuple(
+            (role, id(networks), getattr(networks, "_generation", None))
+            for role, networks in self.data.items()
+        )
+        if self._network_index is None or key != self._network_index_key:
+            # same order as iterating over the roles: the last network wins
+            # for identical prefixes
+            self._network_index = NetworkIndex(
+                network for networks in self.data.values() for network in networks
+            )
+            self._network_index_key = key
+        return self._network_index
+
     # TODO(msimonin): This is still duplicated code between Roles and Networks
     # but should be de-deduplicated using a common ancestor for networks and roles
     @repr_html_check
@@ -310,6 +658,22 @@ class Networks(RolesDict):
         return html_from_sections(repr_title, role_contents, content_only=content_only)
 
 
+NetworksLike = Union[Networks, NetworkIndex, Mapping[str, Iterable[Network]]]
+
+
+def _network_index(
+    networks: Union[NetworksLike, Iterable[Network]]
+) -> NetworkIndex:
+    """Get the index of some networks (cached for Networks and NetworksView)."""
+    if isinstance(networks, NetworkIndex):
+        return networks
+    if isinstance(networks, (Networks, NetworksView)):
+        return networks.index()
+    if isinstance(networks, Mapping):
+        return NetworkIndex(n for nets in networks.values() for n in nets)
+    return NetworkIndex(networks)
+
+
 @dataclass(unsafe_hash=True)
 class IPAddress:
     """Representation of an address on a node.
@@ -370,7 +734,7 @@ class NetDevice:
 
     @classmethod
     def sync_from_ansible(
-        cls, device: Mapping, networks: Networks
+        cls, device: Mapping, networks: NetworksLike
     ) -> Union["NetDevice", "BridgeDevice"]:
         """
 
@@ -393,6 +757,7 @@ class NetDevice:
             ]
         }
         """
+        index = _network_index(networks)
         # build all ips
         addresses = set()
         keys = ["ipv4", "ipv4_secondaries", "ipv6"]
@@ -405,13 +770,10 @@ class NetDevice:
             if len(ips) < 1:
                 continue
             for ip in ips:
-                _net = None
-                for _, provider_nets in networks.items():
-                    for provider_net in provider_nets:
-                        # build an IPAddress /a priori/
-                        addr = IPAddress.from_ansible(ip, provider_net)
-                        if addr.ip in provider_net.network:
-                            _net = provider_net
+                # build an IPAddress /a priori/
+                addr = IPAddress.from_ansible(ip, None)
+                assert addr.ip is not None
+                _net = index.lookup(addr.ip)
                 addresses.add(IPAddress.from_ansible(ip, _net))
         # addresses contains all the addresses for this devices
         # even those that doesn't correspond to an enoslib network
@@ -449,12 +811,12 @@ class NetDevice:
             A list of addresses
         """
         if networks:
-            # return only known addresses
+            index = _network_index(networks)
+            # return only known addresses (once per network they belong to)
             return [
                 addr
                 for addr in self.addresses
-                for network in networks
-                if addr.ip in network.network
+                for _ in index.containing(addr.ip)  # type: ignore[arg-type]
             ]
         # return all the addresses known to enoslib (those that belong to one network)
         addresses = [addr for addr in self.addresses if addr.network is not None]
@@ -514,10 +876,23 @@ class Processor:
         return dict_to_html_foldable_sections(d)
 
 
+# values that can be shared between the copies of an extra dict
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _copy_extra(extra: Dict) -> Dict:
+    """Copy an extra dict (shallow copy if all the values are immutable)."""
+    if all(isinstance(v, _IMMUTABLE_TYPES) for v in extra.values()):
+        return dict(extra)
+    return copy.deepcopy(extra)
+
+
 class BaseHost:
     pass
 
 
+# No __slots__: dataclass(slots=True) requires Python 3.10, hand written slots
+# conflict with the fields defaults and the facts are set as a plain attribute
 @dataclass(unsafe_hash=True, order=True)
 class Host(BaseHost):
     """Abstract unit of computation.
@@ -545,7 +920,7 @@ class Host(BaseHost):
         extra: dictionary of options. Will be passed to Ansible as host_vars.
             Mutation of this attribute is possible and must be performed using the
             :py:meth:`~enoslib.objects.Host.set_extra` or
-            :py:meth:`~enoslib.objects.Host.reset_extra`
+            :py:meth:`~enoslib.objects.Host.reset_extra`.
         net_devices: list of network devices configured on this host.
             can be synced with :py:func:`~enoslib.api.sync_info`.
 
@@ -568,7 +943,9 @@ class Host(BaseHost):
     # - also there's a plan to make the provider fill that for you when
     #   possible (e.g. in G5K we can use the REST API)
     net_devices: Set[NetDevice] = field(default_factory=set, hash=False)
-    __original_extra: Dict = field(default_factory=dict, init=False, hash=False)
+    __original_extra: Dict = field(
+        default_factory=dict, init=False, hash=False, compare=False, repr=False
+    )
 
     def __post_init__(self):
         if not self.alias:
@@ -577,7 +954,10 @@ class Host(BaseHost):
         # we make a copy to avoid to share the reference to extra outside
         # see for example https://gitlab.inria.fr/discovery/enoslib/-/issues/74
         if self.extra is not None:
-            self.extra = copy.deepcopy(self.extra)
+            self.extra = _copy_extra(self.extra)
+            # keep track of the original extra vars (it's never mutated: it
+            # can be shared with the copies of this host)
+            self.__original_extra = _copy_extra(self.extra)
 
         if self.net_devices is None:
             self.net_devices = set()  # unreachable normally
@@ -587,8 +967,21 @@ class Host(BaseHost):
         # read by specific host accessor (e.g processor, memory)
         self.__facts = None
 
-        # keep track of the original extra vars
-        self.__original_extra = copy.deepcopy(self.extra)
+    def __copy__(self) -> "Host":
+        """Copy on write.
+
+        The copy shares the immutable parts of the host but gets its own
+        ``extra`` and ``net_devices`` containers: mutating them (e.g. using
+        :py:meth:`~enoslib.objects.Host.set_extra` or
+        :py:func:`~enoslib.api.sync_info`) doesn't affect the original host.
+        """
+        cls = self.__class__
+        host = cls.__new__(cls)
+        host.__dict__.update(self.__dict__)
+        if self.extra is not None:
+            host.extra = _copy_extra(self.extra)
+        host.net_devices = set(self.net_devices)
+        return host
 
     def set_extra(self, **kwargs) -> "Host":
         """Mutate the extra vars of this host."""
@@ -597,13 +990,12 @@ class Host(BaseHost):
 
     def reset_extra(self) -> "Host":
         """Recover the extra vars of this host to the original ones."""
-        # recover the original extra vars
-        self.extra = copy.deepcopy(self.__original_extra)
+        self.extra = _copy_extra(self.__original_extra)
         return self
 
     def get_extra(self) -> Dict:
         """Get a copy of the extra vars of this host."""
-        return copy.deepcopy(self.extra)
+        return _copy_extra(self.extra)
 
     def to_dict(self) -> Dict:
         p = None
@@ -654,6 +1046,9 @@ class Host(BaseHost):
         Returns:
             A list of addresses
         """
+        if networks:
+            # index the networks once for all the devices
+            networks = _network_index(networks)
         addresses = []
         for net_device in self.net_devices:
             addresses += net_device.filter_addresses(
@@ -680,6 +1075,9 @@ class Host(BaseHost):
         Returns:
             A list of interface names.
         """
+        if networks:
+            # index the networks once for all the devices
+            networks = _network_index(networks)
         interfaces = []
         for net_device in self.net_devices:
             if net_device.filter_addresses(networks, include_unknown=include_unknown):
@@ -690,7 +1088,8 @@ class Host(BaseHost):
 
     @property
     def processor(self) -> Optional[Processor]:
-        if self.__facts is not None:
+        if self.__facts is not None and "ansible_processor_cores" in self.__facts:
+            # processor facts are only part of the hardware subset
             cores = self.__facts["ansible_processor_cores"]
             count = self.__facts["ansible_processor_count"]
             tpc = self.__facts["ansible_processor_threads_per_core"]
@@ -763,6 +1162,15 @@ class HostsView(ResourcesSet):
 
     inner = Host
 
+    def get_by_alias(self, alias: str) -> Optional[Host]:
+        """Get the host with this alias (None if there's no such host)."""
+        hosts = self._index("alias", lambda h: h.alias).get(alias)
+        return hosts[0] if hosts else None
+
+    def get_by_address(self, address: str) -> List[Host]:
+        """Get the hosts reachable at this address."""
+        return list(self._index("address", lambda h: h.address).get(address, []))
+
 
 class Roles(RolesDict):
     """A specialization of :py:class:`~enoslib.collections.RolesDict`
@@ -2,10 +2,21 @@
 import logging
 import os
 from dataclasses import dataclass, field
-from ipaddress import IPv4Interface, ip_interface
+from functools import lru_cache
+from ipaddress import ip_address, ip_interface
 from itertools import product
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    MutableSet,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from enoslib.api import Results, play_on
 from enoslib.constants import TMP_DIRNAME
@@ -16,15 +27,16 @@ from enoslib.html import (
     repr_html_check,
 )
 from enoslib.objects import Host, Network, Networks, PathLike, Roles
-from enoslib.service.emul.objects import BaseNetem
+from enoslib.service.emul.objects import BaseNetem, ConstraintSet, SourceState
 from enoslib.service.emul.schema import HTBConcreteConstraintValidator, HTBValidator
 
 from .utils import (
-    _build_commands,
     _build_options,
+    _build_update_commands,
     _combine,
     _destroy,
     _fping_stats,
+    _tc_batch,
     _validate,
 )
 
@@ -34,9 +46,65 @@ DEFAULT_RATE = "10gbit"
 
 DEFAULT_LOSS: Optional[str] = None
 
+# How the packets are classified to the slices (one per target):
+# - u32: one u32 filter per target, the kernel tries them one after the other
+# - u32_hash: the u32 filters are stored in a hash table (one bucket per value
+#   of the last byte of the target address)
+# - flower: one flower filter per target, looked up in a hash table by the
+#   kernel (requires the cls_flower module)
+FILTERS_U32 = "u32"
+FILTERS_U32_HASH = "u32_hash"
+FILTERS_FLOWER = "flower"
+HTB_FILTERS = [FILTERS_U32, FILTERS_U32_HASH, FILTERS_FLOWER]
+DEFAULT_FILTERS = FILTERS_U32
+
+# how a tc batch is piped to tc on the hosts (see netem_htb), a batch is split
+# in chunks of TC_BATCH_MAX_SIZE characters: a single command line argument
+# is limited to 128KiB on Linux
+TC_BATCH_COMMAND = "tc -batch - <<'ENOSLIB_TC_BATCH'\n{batch}\nENOSLIB_TC_BATCH"
+TC_BATCH_MAX_SIZE = 64 * 1024
+
+# per IP version: the filters priority, protocol, u32 keyword, u32 hash table
+# handle and offset of the last 4 bytes of the destination in the header
+_FILTERS_PARAMS = {
+    4: dict(prio=1, protocol="ip", match="ip", handle="100", at=16),
+    6: dict(prio=2, protocol="ipv6", match="ip6", handle="101", at=36),
+}
+
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1024)
+def _validate_values(delay: str, rate: str, loss: Optional[str]):
+    """Validate the delay, rate and loss of a constraint.
+
+    A topology is made of many constraints but few distinct values (e.g. the
+    rates): the values are validated once.
+    """
+    HTBConcreteConstraintValidator.validate(dict(delay=delay, rate=rate, loss=loss))
+
+
+def _validate_device_target(device: str, target: str):
+    """Validate the device and the target of a constraint.
+
+    Those are (almost) distinct for each constraint: they aren't cached but
+    checked directly (a plain address is the common case), the schema is only
+    used otherwise.
+    """
+    if isinstance(device, str) and isinstance(target, str):
+        try:
+            ip_address(target)
+            return
+        except ValueError:
+            pass
+    HTBConcreteConstraintValidator.validate(dict(device=device, target=target))
+
+
+def _check_filters(filters: str):
+    if filters not in HTB_FILTERS:
+        raise ValueError(f"filters must be one of {HTB_FILTERS}, got {filters}")
+
+
 @dataclass(eq=True, frozen=True)
 class HTBConstraint:
     """An HTB constraint.
@@ -72,9 +140,8 @@ class HTBConstraint:
     loss: Optional[str] = DEFAULT_LOSS
 
     def __post_init__(self):
-        HTBConcreteConstraintValidator.validate(
-            dict(device=self.device, target=self.target, rate=self.rate, loss=self.loss)
-        )
+        _validate_device_target(self.device, self.target)
+        _validate_values(self.delay, self.rate, self.loss)
 
     def add_commands(self) -> List[str]:
         """Add the class-full qdisc at the root of the device."""
@@ -84,51 +151,123 @@ class HTBConstraint:
         """Remove everything."""
         return [f"tc qdisc del dev {self.device} root || true"]
 
-    def commands(self, idx: int):
-        """Get the command for the current slice."""
-        cmds = [
-            f"tc class add dev {self.device} "
-            "parent 1: "
-            f"classid 1:{idx + 1} "
-            f"htb rate {self.rate}"
+    def filter_setup_commands(self, filters: str = DEFAULT_FILTERS) -> List[str]:
+        """Get the commands to run once per device before adding the filters.
+
+        Args:
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        """
+        if filters != FILTERS_U32_HASH:
+            return []
+        params = _FILTERS_PARAMS[ip_interface(self.target).version]
+        prio, protocol, match = params["prio"], params["protocol"], params["match"]
+        handle, at = params["handle"], params["at"]
+        any_address = "0.0.0.0/0" if match == "ip" else "::/0"
+        return [
+            # the hash table (256 buckets)
+            f"tc filter add dev {self.device} parent 1: prio {prio} "
+            f"handle {handle}: protocol {protocol} u32 divisor 256",
+            # hash the packets on the last byte of their destination
+            f"tc filter add dev {self.device} parent 1: prio {prio} "
+            f"protocol {protocol} u32 match {match} dst {any_address} "
+            f"hashkey mask 0x000000ff at {at} link {handle}:",
         ]
 
-        # could be 0 or None
-        if not self.loss:
-            cmd = (
-                f"tc qdisc add dev {self.device} "
-                f"parent 1:{idx + 1} "
-                f"handle {idx + 10}: "
-                f"netem delay {self.delay}"
-            )
-        else:
-            cmd = (
-                f"tc qdisc add dev {self.device} "
-                f"parent 1:{idx + 1} "
-                f"handle {idx + 10}: "
-                f"netem delay {self.delay} "
-                f"loss {self.loss}"
-            )
-        cmds.append(cmd)
+    def filter_command(self, idx: int, filters: str = DEFAULT_FILTERS) -> str:
+        """Get the filter sending the packets to the current slice.
+
+        Args:
+            idx: the index of the slice
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        """
         target = ip_interface(self.target)
-        if isinstance(target, IPv4Interface):
-            cmd = (
+        params = _FILTERS_PARAMS[target.version]
+        prio, protocol, match = params["prio"], params["protocol"], params["match"]
+        if filters == FILTERS_FLOWER:
+            return (
                 f"tc filter add dev {self.device} "
                 "parent 1: "
-                f"protocol ip u32 match ip dst {self.target} "
+                f"protocol {protocol} prio {prio} flower dst_ip {self.target} "
                 f"flowid 1:{idx + 1}"
             )
-        else:
-            cmd = (
+        single_address = target.network.prefixlen == target.max_prefixlen
+        if filters == FILTERS_U32_HASH and single_address:
+            bucket = int(target.ip) & 0xFF
+            return (
                 f"tc filter add dev {self.device} "
-                "parent 1: "
-                f"protocol ipv6 u32 match ip6 dst {self.target} "
+                f"parent 1: prio {prio} "
+                f"protocol {protocol} u32 ht {params['handle']}:{bucket:x}: "
+                f"match {match} dst {self.target} "
                 f"flowid 1:{idx + 1}"
             )
+        # a single filter (also used for the targets that aren't a single address)
+        return (
+            f"tc filter add dev {self.device} "
+            "parent 1: "
+            f"protocol {protocol} u32 match {match} dst {self.target} "
+            f"flowid 1:{idx + 1}"
+        )
+
+    def commands(self, idx: int, filters: str = DEFAULT_FILTERS):
+        """Get the command for the current slice.
+
+        Args:
+            idx: the index of the slice
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        """
+        cmds = [
+            f"tc class add dev {self.device} "
+            "parent 1: "
+            f"classid 1:{idx + 1} "
+            f"htb rate {self.rate}"
+        ]
+        cmds.append(
+            f"tc qdisc add dev {self.device} "
+            f"parent 1:{idx + 1} "
+            f"handle {idx + 10}: "
+            f"netem {self._netem_options()}"
+        )
+        cmds.append(self.filter_command(idx, filters))
+        return cmds
+
+    def change_commands(self, idx: int, applied: "HTBConstraint") -> List[str]:
+        """Get the commands changing a slice in place.
+
+        The class and the netem qdisc of the slice are changed only if needed
+        (the filter stays as is).
 
-        cmds.append(cmd)
+        Args:
+            idx: the index of the slice
+            applied: the constraint currently applied by the slice (same
+                device and target)
+        """
+        cmds = []
+        if self.rate != applied.rate:
+            cmds.append(
+                f"tc class change dev {self.device} "
+                "parent 1: "
+                f"classid 1:{idx + 1} "
+                f"htb rate {self.rate}"
+            )
+        if self._netem_options() != applied._netem_options():
+            cmds.append(
+                f"tc qdisc change dev {self.device} "
+                f"parent 1:{idx + 1} "
+                f"handle {idx + 10}: "
+                f"netem {self._netem_options()}"
+            )
         return cmds
 
+    def _netem_options(self) -> str:
+        # could be 0 or None
+        if not self.loss:
+            return f"delay {self.delay}"
+        return f"delay {self.delay} loss {self.loss}"
+
+
+def _source_key(constraint: HTBConstraint) -> Tuple[str, str]:
+    return constraint.device, constraint.target
+
 
 @dataclass
 class HTBSource:
@@ -145,7 +284,19 @@ class HTBSource:
     """
 
     host: Host
-    constraints: Set[HTBConstraint] = field(default_factory=set)
+    constraints: MutableSet[HTBConstraint] = field(default_factory=set)
+
+    def __setattr__(self, name, value):
+        # one constraint per device and target
+        if name == "constraints" and not isinstance(value, ConstraintSet):
+            value = ConstraintSet(_source_key, value)
+        super().__setattr__(name, value)
+
+    @property
+    def _constraints(self) -> Dict[Hashable, HTBConstraint]:
+        """The constraints indexed by device and target."""
+        assert isinstance(self.constraints, ConstraintSet)
+        return self.constraints.index
 
     def add_constraint(self, *args, **kwargs):
         """Add a constraint.
@@ -167,9 +318,6 @@ class HTBSource:
             constraints: Iterable of HTBConstraints
         """
         for constraint in constraints:
-            matched = [sc for sc in self.constraints if self.equal(constraint, sc)]
-            for c in matched:
-                self.constraints.discard(c)
             self.constraints.add(constraint)
         return self
 
@@ -194,15 +342,89 @@ class HTBSource:
             cmds = cmds.union(set(constraint.remove_commands()))
         return list(cmds)
 
-    def commands(self) -> List[str]:
+    def commands(self, filters: str = DEFAULT_FILTERS) -> List[str]:
+        """Get the commands of all the slices.
+
+        Args:
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        """
+        _check_filters(filters)
+        # once per device (e.g. the hash tables)
+        setup_cmds: Dict[str, None] = {}
         htb_cmds: List[str] = []
-        for idx, tc in enumerate(self.constraints):
+        for idx, tc in self._slices():
+            setup_cmds.update(dict.fromkeys(tc.filter_setup_commands(filters)))
             # rate limit
-            htb_cmds.extend(tc.commands(idx))
-        return htb_cmds
+            htb_cmds.extend(tc.commands(idx, filters))
+        return list(setup_cmds) + htb_cmds
 
-    def all_commands(self) -> Tuple[List[str], List[str], List[str]]:
-        r, a, c = self.remove_commands(), self.add_commands(), self.commands()
+    def _slices(self) -> List[Tuple[int, HTBConstraint]]:
+        """The constraints and the index of their slice."""
+        return list(enumerate(self._constraints.values()))
+
+    def state(self, filters: str = DEFAULT_FILTERS) -> SourceState:
+        """Get the state of the host once the commands are applied.
+
+        Args:
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        """
+        _check_filters(filters)
+        slices: Dict[Hashable, Tuple[int, HTBConstraint]] = {
+            (tc.device, tc.target): (idx, tc) for idx, tc in self._slices()
+        }
+        return SourceState(slices, dict(filters=filters))
+
+    def update_commands(
+        self, state: SourceState, filters: str = DEFAULT_FILTERS
+    ) -> Optional[Tuple[List[str], SourceState]]:
+        """Get the commands updating the applied constraints in place.
+
+        The slices whose constraint changed are changed (see
+        :py:meth:`HTBConstraint.change_commands`) and a slice is added for
+        each new target. The slices of the removed targets can't be removed
+        alone (their filters are only known by the handle the kernel chose).
+
+        Args:
+            state: the state applied on the host (see :py:meth:`state`)
+            filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+
+        Returns:
+            None if the qdiscs must be rebuilt (a target was removed, a
+            device was added, the filters changed...), the commands and the
+            state of the host once they are applied otherwise.
+        """
+        _check_filters(filters)
+        if state.options != dict(filters=filters):
+            return None
+        constraints = self._constraints
+        if not state.slices.keys() <= constraints.keys():
+            return None
+        # what has been set up once per device
+        setup_cmds: Set[str] = set()
+        for _, tc in state.slices.values():
+            setup_cmds.update(tc.add_commands() + tc.filter_setup_commands(filters))
+        slices = dict(state.slices)
+        next_idx = max((idx for idx, _ in slices.values()), default=-1) + 1
+        cmds: List[str] = []
+        for key, tc in constraints.items():
+            if key in slices:
+                idx, applied = slices[key]
+                cmds.extend(tc.change_commands(idx, applied))
+            elif setup_cmds.issuperset(
+                tc.add_commands() + tc.filter_setup_commands(filters)
+            ):
+                idx = next_idx
+                next_idx += 1
+                cmds.extend(tc.commands(idx, filters))
+            else:
+                return None
+            slices[key] = (idx, tc)
+        return cmds, SourceState(slices, state.options)
+
+    def all_commands(
+        self, filters: str = DEFAULT_FILTERS
+    ) -> Tuple[List[str], List[str], List[str]]:
+        r, a, c = self.remove_commands(), self.add_commands(), self.commands(filters)
         logger.debug("\n".join(r))
         logger.debug("\n".join(a))
         logger.debug("\n".join(c))
@@ -227,7 +449,14 @@ class HTBSource:
         )
 
 
-def netem_htb(htb_hosts: List[HTBSource], chunk_size: int = 100, **kwargs):
+def netem_htb(
+    htb_hosts: List[HTBSource],
+    chunk_size: int = 100,
+    filters: str = DEFAULT_FILTERS,
+    batch: bool = False,
+    applied: Optional[Mapping[Host, SourceState]] = None,
+    **kwargs,
+) -> Dict[Host, SourceState]:
     """Helper function to enforce heterogeneous limitations on hosts.
 
     This function do the heavy lifting of building the qdisc tree for each
@@ -248,15 +477,40 @@ def netem_htb(htb_hosts: List[HTBSource], chunk_size: int = 100, **kwargs):
     atomic constraints (= tc commands) shouldn't be a problem. Commands are
     sent by batch and ``chunk_size`` controls the size of the batch.
 
+    With many targets per host, use ``filters="u32_hash"`` (or ``"flower"``)
+    so that the time spent by the kernel to classify each packet doesn't grow
+    with the number of targets.
+
+    With ``batch=True``, the commands of each host are piped to ``tc -batch``
+    through the standard input of a single remote execution (one per
+    :py:data:`TC_BATCH_MAX_SIZE` characters of commands) instead of one ``tc``
+    process per command and one remote execution per chunk of commands.
+    ``tc`` stops at the first failing command of a chunk.
+
     Idempotency note: the existing qdiscs are removed before applying new
     ones. This must be safe in most of the cases to consider that this is a
     form of idempotency.
 
+    Incremental deployment: given the states returned by a previous call in
+    ``applied``, only the constraints that changed since then are applied (in
+    place, see :py:meth:`~enoslib.service.emul.htb.HTBSource.update_commands`)
+    and the hosts without any change are left untouched. The qdiscs of a host
+    are rebuilt as above if its constraints can't be updated in place (e.g. a
+    target was removed).
+
     Args:
         htb_hosts : list of constraints to apply.
         chunk_size: size of the chunk to use
+        filters: how the packets are classified (see :py:data:`HTB_FILTERS`)
+        batch: True iff the commands must be applied using ``tc -batch``
+            (``chunk_size`` is ignored then)
+        applied: the states returned by the previous call for an incremental
+            deployment
         kwargs: keyword arguments passed to :py:func:`enoslib.api.run_ansible`
 
+    Returns:
+        The states of the hosts once the constraints are applied.
+
     Examples:
 
         .. literalinclude:: ../tutorials/network_emulation/tuto_netem_htb.py
@@ -265,13 +519,43 @@ def netem_htb(htb_hosts: List[HTBSource], chunk_size: int = 100, **kwargs):
 
 
     """
-    # tc_commands are indexed by host alias == inventory_hostname
-    tc_commands = _combine(*_build_commands(htb_hosts), chunk_size=chunk_size)
+    remove, add, htb, states = _build_update_commands(
+        htb_hosts, applied or {}, filters=filters
+    )
     extra_vars = kwargs.pop("extra_vars", {})
+    # only the hosts with some changes
+    hosts = [h for h in states if h.alias in remove or h.alias in htb]
+    if not hosts:
+        logger.info("The network constraints are already applied")
+        return states
+    roles = Roles(all=hosts)
+    if batch:
+        # the removal may fail (|| true): it's kept as a shell command
+        tc_remove = {alias: " ; ".join(cmds) for alias, cmds in remove.items()}
+        tc_batch = _tc_batch(add, htb, max_size=TC_BATCH_MAX_SIZE)
+        options = _build_options(
+            extra_vars, {"tc_remove": tc_remove, "tc_batch": tc_batch}
+        )
+        with play_on(roles=roles, extra_vars=options, **kwargs) as p:
+            p.raw(
+                "{{ tc_remove[inventory_hostname] }}",
+                when="tc_remove[inventory_hostname] is defined",
+                task_name="Removing the network constraints",
+            )
+            # the batch is piped to tc: nothing is written on the hosts
+            p.raw(
+                TC_BATCH_COMMAND.format(batch="{{ item }}"),
+                when="tc_batch[inventory_hostname] is defined",
+                loop="{{ tc_batch[inventory_hostname] }}",
+                task_name="Applying the network constraints",
+            )
+        return states
+
+    # tc_commands are indexed by host alias == inventory_hostname
+    tc_commands = _combine(remove, add, htb, chunk_size=chunk_size)
     options = _build_options(extra_vars, {"tc_commands": tc_commands})
 
     # Run the commands on the remote hosts (only those involved)
-    roles = Roles(all=[htb_host.host for htb_host in htb_hosts])
     with play_on(roles=roles, extra_vars=options, **kwargs) as p:
         p.raw(
             "{{ item }}",
@@ -279,6 +563,7 @@ def netem_htb(htb_hosts: List[HTBSource], chunk_size: int = 100, **kwargs):
             loop="{{ tc_commands[inventory_hostname] }}",
             task_name="Applying the network constraints",
         )
+    return states
 
 
 class NetemHTB(BaseNetem):
@@ -298,6 +583,8 @@ class NetemHTB(BaseNetem):
         """
         # populated later
         self.sources: Dict[Host, HTBSource] = {}
+        # what the last deployment applied on each host
+        self.applied: Dict[Host, SourceState] = {}
 
     def add_constraints(
         self,
@@ -305,7 +592,7 @@ class NetemHTB(BaseNetem):
         dest: Iterable[Host],
         delay: str,
         rate: str,
-        loss: Optional[float] = None,
+        loss: Optional[str] = None,
         networks: Optional[Iterable[Network]] = None,
         symmetric: bool = False,
         *,
@@ -318,7 +605,7 @@ class NetemHTB(BaseNetem):
             dest: list of hosts to which traffic will be limited
             delay: the delay to apply as a string (e.g. 10ms)
             rate: the rate to apply as a string (e.g. 1gbit)
-            loss: the percentage of loss (between 0 and 1)
+            loss: the percentage of loss (e.g. 5%)
             networks: only consider these networks when applying the
                 resources (default to all networks)
             symmetric: True iff the symmetric rules should be also added.
@@ -347,27 +634,30 @@ class NetemHTB(BaseNetem):
             warnings.warn(
                 "symetric is deprecated; use symmetric", DeprecationWarning, 2
             )
+        src, dest = list(src), list(dest)
+        # the possible targets, the same for every source
+        targets = []
+        for dest_host in dest:
+            for daddr in dest_host.filter_addresses(networks, include_unknown=False):
+                assert daddr.ip is not None
+                targets.append(str(daddr.ip.ip))
         for src_host in src:
-            self.sources.setdefault(src_host, HTBSource(src_host))
+            if src_host not in self.sources:
+                self.sources[src_host] = HTBSource(src_host)
             source = self.sources[src_host]
             local_devices = src_host.filter_interfaces(networks, include_unknown=False)
             for sdevice in local_devices:
                 # one possible device
-                for dest_host in dest:
-                    # one possible destination
-                    dall_addrs = dest_host.filter_addresses(
-                        networks, include_unknown=False
+                source.add_constraints(
+                    HTBConstraint(
+                        device=str(sdevice),
+                        target=target,
+                        delay=delay,
+                        rate=rate,
+                        loss=loss,
                     )
-                    for daddr in dall_addrs:
-                        assert daddr.ip is not None
-                        kwargs = dict(
-                            device=str(sdevice),
-                            target=str(daddr.ip.ip),
-                            delay=delay,
-                            rate=rate,
-                            loss=loss,
-                        )
-                        source.add_constraint(**kwargs)
+                    for target in targets
+                )
         if symmetric:
             self.add_constraints(
                 dest, src, delay, rate, loss=loss, networks=networks, symmetric=False
@@ -446,9 +736,43 @@ class NetemHTB(BaseNetem):
             )
         return self
 
-    def deploy(self, chunk_size: int = 100, **kwargs) -> List[HTBSource]:
+    def deploy(
+        self,
+        chunk_size: int = 100,
+        filters: str = DEFAULT_FILTERS,
+        batch: bool = False,
+        incremental: bool = False,
+        **kwargs,
+    ) -> List[HTBSource]:
+        """Deploy the network emulation.
+
+        The constraints applied on each host are remembered. With
+        ``incremental=True`` only the constraints that changed since the last
+        deployment are applied: e.g. changing the delay of some links only
+        changes the corresponding classes on the corresponding hosts, the
+        other hosts and links aren't disturbed.
+
+        Args:
+            chunk_size: see :py:func:`~enoslib.service.emul.htb.netem_htb`
+            filters: see :py:func:`~enoslib.service.emul.htb.netem_htb`
+            batch: see :py:func:`~enoslib.service.emul.htb.netem_htb`
+            incremental: True iff only the changes since the last deployment
+                must be applied (the first deployment is a full one anyway)
+            kwargs: keyword arguments passed to :py:func:`enoslib.api.run_ansible`
+        """
         sources = list(self.sources.values())
-        netem_htb(sources, chunk_size=chunk_size, **kwargs)
+        # forgotten until the deployment succeeds: the hosts will be rebuilt
+        # by the next deployment if this one fails midway
+        applied, self.applied = self.applied, {}
+        states = netem_htb(
+            sources,
+            chunk_size=chunk_size,
+            filters=filters,
+            batch=batch,
+            applied=applied if incremental else None,
+            **kwargs,
+        )
+        self.applied = {**applied, **states}
         return sources
 
     def backup(self):
@@ -465,6 +789,7 @@ class NetemHTB(BaseNetem):
 
         Careful: This remove every rule, including those not managed by this service.
         """
+        self.applied = {}
         _destroy(list(self.sources.keys()), **kwargs)
 
     def validate(
@@ -548,7 +873,14 @@ class AccurateNetemHTB(NetemHTB):
     observed network condition before drawing any conclusion.
     """
 
-    def deploy(self, chunk_size: int = 100, **kwargs):
+    def deploy(
+        self,
+        chunk_size: int = 100,
+        filters: str = DEFAULT_FILTERS,
+        batch: bool = False,
+        incremental: bool = False,
+        **kwargs,
+    ):
         """Deploy the network emulation.
 
         This is where the hard work is done:
@@ -559,6 +891,10 @@ class AccurateNetemHTB(NetemHTB):
 
         Args:
             chunk_size: see :py:meth:`~enoslib.service.emul.htb.NetemHTB.deploy`
+            filters: see :py:meth:`~enoslib.service.emul.htb.NetemHTB.deploy`
+            batch: see :py:meth:`~enoslib.service.emul.htb.NetemHTB.deploy`
+            incremental: see
+                :py:meth:`~enoslib.service.emul.htb.NetemHTB.deploy`
             kwargs: see :py:meth:`~enoslib.service.emul.htb.NetemHTB.deploy`
         """
 
@@ -613,4 +949,10 @@ class AccurateNetemHTB(NetemHTB):
 
         self.sources = new_sources
 
-        return super().deploy(chunk_size=chunk_size, **kwargs)
+        return super().deploy(
+            chunk_size=chunk_size,
+            filters=filters,
+            batch=batch,
+            incremental=incremental,
+            **kwargs,
+        )
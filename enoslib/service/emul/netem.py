@@ -1,7 +1,16 @@
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional, Set, Tuple
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    MutableSet,
+    Optional,
+    Tuple,
+)
 
 from enoslib.api import Results, play_on
 from enoslib.constants import TMP_DIRNAME
@@ -12,9 +21,15 @@ from enoslib.html import (
     repr_html_check,
 )
 from enoslib.objects import Host, Network, PathLike, Roles
-from enoslib.service.emul.objects import BaseNetem
-
-from .utils import _build_commands, _build_options, _combine, _destroy, _validate
+from enoslib.service.emul.objects import BaseNetem, ConstraintSet, SourceState
+
+from .utils import (
+    _build_options,
+    _build_update_commands,
+    _combine,
+    _destroy,
+    _validate,
+)
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -47,6 +62,12 @@ class NetemOutConstraint(NetemConstraint):
         """Nothing to do."""
         return []
 
+    def change_commands(self, _: str, applied: NetemConstraint) -> List[str]:
+        """Return the commands changing the applied constraint in place."""
+        if self.options == applied.options:
+            return []
+        return [f"tc qdisc change dev {self.device} root netem {self.options}"]
+
 
 @dataclass(eq=True, frozen=True)
 class NetemInConstraint(NetemOutConstraint):
@@ -86,6 +107,16 @@ class NetemInConstraint(NetemOutConstraint):
             f"tc qdisc add dev {ifb} root netem {self.options}",
         ]
 
+    def change_commands(self, ifb: str, applied: NetemConstraint) -> List[str]:
+        """Return the commands changing the netem constraints on the ifb."""
+        if self.options == applied.options:
+            return []
+        return [f"tc qdisc change dev {ifb} root netem {self.options}"]
+
+
+def _source_key(constraint: NetemConstraint) -> Tuple[type, str]:
+    return constraint.__class__, constraint.device
+
 
 @dataclass
 class NetemInOutSource:
@@ -99,14 +130,30 @@ class NetemInOutSource:
     """
 
     host: Host
-    constraints: Set[NetemConstraint] = field(default_factory=set)
+    constraints: MutableSet[NetemConstraint] = field(default_factory=set)
+
+    def __setattr__(self, name, value):
+        # one constraint per kind (in or out) and device
+        if name == "constraints" and not isinstance(value, ConstraintSet):
+            value = ConstraintSet(_source_key, value)
+        super().__setattr__(name, value)
+
+    @property
+    def _constraints(self) -> Dict[Hashable, NetemConstraint]:
+        """The constraints indexed by kind (in or out) and device."""
+        assert isinstance(self.constraints, ConstraintSet)
+        return self.constraints.index
 
     def _commands(self, _c: str) -> List[str]:
         cmds = []
-        for idx, constraint in enumerate(self.constraints):
+        for idx, constraint in self._slices():
             cmds.extend(getattr(constraint, _c)(f"ifb{idx}"))
         return cmds
 
+    def _slices(self) -> List[Tuple[int, NetemConstraint]]:
+        """The constraints and the index of their ifb."""
+        return list(enumerate(self._constraints.values()))
+
     @property
     def inbounds(self) -> List[NetemInConstraint]:
         return [c for c in self.constraints if isinstance(c, NetemInConstraint)]
@@ -132,9 +179,6 @@ class NetemInOutSource:
             constraints: Iterable of NetemIn[Out]Constraint
         """
         for constraint in constraints:
-            matched = [sc for sc in self.constraints if self.equal(constraint, sc)]
-            for c in matched:
-                self.constraints.discard(c)
             self.constraints.add(constraint)
 
     def equal(self, c1: NetemConstraint, c2: NetemConstraint) -> bool:
@@ -153,6 +197,40 @@ class NetemInOutSource:
     def all_commands(self) -> Tuple[List[str], List[str], List[str]]:
         return self.remove_commands(), self.add_commands(), self.commands()
 
+    def state(self) -> SourceState:
+        """Get the state of the host once the commands are applied."""
+        slices: Dict[Hashable, Tuple[int, NetemConstraint]] = {
+            (c.__class__, c.device): (idx, c) for idx, c in self._slices()
+        }
+        return SourceState(slices)
+
+    def update_commands(
+        self, state: SourceState
+    ) -> Optional[Tuple[List[str], SourceState]]:
+        """Get the commands updating the applied constraints in place.
+
+        Only the options of the constraints can be changed in place.
+
+        Args:
+            state: the state applied on the host (see :py:meth:`state`)
+
+        Returns:
+            None if the qdiscs must be rebuilt (a constraint was added or
+            removed), the commands and the state of the host once they are
+            applied otherwise.
+        """
+        constraints = self._constraints
+        if constraints.keys() != state.slices.keys():
+            return None
+        slices = dict(state.slices)
+        cmds: List[str] = []
+        for key, constraint in constraints.items():
+            idx, applied = slices[key]
+            change_commands = getattr(constraint, "change_commands")
+            cmds.extend(change_commands(f"ifb{idx}", applied))
+            slices[key] = (idx, constraint)
+        return cmds, SourceState(slices)
+
     @repr_html_check
     def _repr_html_(self, content_only=False) -> str:
         inbounds = [
@@ -170,7 +248,12 @@ class NetemInOutSource:
         )
 
 
-def netem(sources: List[NetemInOutSource], chunk_size: int = 100, **kwargs):
+def netem(
+    sources: List[NetemInOutSource],
+    chunk_size: int = 100,
+    applied: Optional[Mapping[Host, SourceState]] = None,
+    **kwargs,
+) -> Dict[Host, SourceState]:
     """Helper function to enforce in/out limitations on host devices.
 
     Nodes can be seen as the vertices of a star topology where the center is the
@@ -185,11 +268,21 @@ def netem(sources: List[NetemInOutSource], chunk_size: int = 100, **kwargs):
     ones. This must be safe in most of the cases to consider that this is a
     form of idempotency.
 
+    Incremental deployment: given the states returned by a previous call in
+    ``applied``, only the options that changed since then are applied (in
+    place) and the hosts without any change are left untouched. The qdiscs of
+    a host are rebuilt as above if a constraint was added or removed.
+
     Args:
         sources: list of constraints to apply as a list of Source
         chunk_size: size of the chunk to use
+        applied: the states returned by the previous call for an incremental
+            deployment
         kwargs: keyword argument to pass to  :py:func:`enoslib.api.run_ansible`.
 
+    Returns:
+        The states of the hosts once the constraints are applied.
+
 
     Example:
 
@@ -198,9 +291,15 @@ def netem(sources: List[NetemInOutSource], chunk_size: int = 100, **kwargs):
             :linenos:
     """
 
+    remove, add, commands, states = _build_update_commands(sources, applied or {})
+    # only the hosts with some changes
+    hosts = [h for h in states if h.alias in remove or h.alias in commands]
+    if not hosts:
+        logger.info("The network constraints are already applied")
+        return states
     # provision a sufficient number of ifbs
-    roles = Roles(all=[htb_host.host for htb_host in sources])
-    tc_commands = _combine(*_build_commands(sources), chunk_size=chunk_size)
+    roles = Roles(all=hosts)
+    tc_commands = _combine(remove, add, commands, chunk_size=chunk_size)
     extra_vars = kwargs.pop("extra_vars", {})
     options = _build_options(extra_vars, {"tc_commands": tc_commands})
 
@@ -213,6 +312,7 @@ def netem(sources: List[NetemInOutSource], chunk_size: int = 100, **kwargs):
             loop="{{ tc_commands[inventory_hostname] }}",
             task_name="Applying the network constraints",
         )
+    return states
 
 
 class Netem(BaseNetem):
@@ -242,6 +342,8 @@ class Netem(BaseNetem):
               :linenos:
         """
         self.sources = {}
+        # what the last deployment applied on each host
+        self.applied: Dict[Host, SourceState] = {}
 
     def add_constraints(
         self,
@@ -272,9 +374,22 @@ class Netem(BaseNetem):
                 source.add_constraints(constraints)
         return self
 
-    def deploy(self, chunk_size=100, **kwargs):
-        """Apply the constraints on all the hosts."""
-        netem(list(self.sources.values()), chunk_size, **kwargs)
+    def deploy(self, chunk_size=100, incremental: bool = False, **kwargs):
+        """Apply the constraints on all the hosts.
+
+        The constraints applied on each host are remembered. With
+        ``incremental=True`` only the options that changed since the last
+        deployment are applied (see :py:func:`~enoslib.service.emul.netem.netem`).
+        """
+        # forgotten until the deployment succeeds
+        applied, self.applied = self.applied, {}
+        states = netem(
+            list(self.sources.values()),
+            chunk_size,
+            applied=applied if incremental else None,
+            **kwargs,
+        )
+        self.applied = {**applied, **states}
 
     def backup(self):
         pass
@@ -295,6 +410,7 @@ class Netem(BaseNetem):
         )
 
     def destroy(self, **kwargs):
+        self.applied = {}
         _destroy(list(self.sources.keys()), **kwargs)
 
     @repr_html_check
@@ -1,11 +1,85 @@
 from abc import ABC
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    MutableSet,
+    Tuple,
+    TypeVar,
+)
 
 from enoslib.objects import PathLike
 from enoslib.service.emul.utils import FPING_FILE_SUFFIX, _fping_stats
 from enoslib.service.service import Service
 
+C = TypeVar("C")
+
+
+@dataclass
+class SourceState:
+    """The constraints applied on a host by a source.
+
+    This is what is remembered between two deployments so that an incremental
+    deployment only applies the differences (see the ``update_commands``
+    method of the sources).
+
+    Args:
+        slices: the constraints applied, indexed by their key in the source
+            (e.g. device and target), with the index they were given (e.g.
+            the index of the HTB class or of the ifb)
+        options: the options the commands were generated with (e.g. the
+            filters)
+    """
+
+    slices: Dict[Hashable, Tuple[int, Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+class ConstraintSet(MutableSet[C]):
+    """The constraints of a source, at most one per key.
+
+    The constraints are indexed by their key (e.g. device and target): adding
+    a constraint replaces the one with the same key, in constant time. The
+    constraints are kept in insertion order, a replaced constraint keeps the
+    position of the previous one (e.g. its HTB class).
+
+    Args:
+        key: returns the key of a constraint
+        constraints: the initial constraints
+    """
+
+    def __init__(self, key: Callable[[C], Hashable], constraints: Iterable[C] = ()):
+        self.key = key
+        self.index: Dict[Hashable, C] = {}
+        for constraint in constraints:
+            self.add(constraint)
+
+    def __contains__(self, constraint: object) -> bool:
+        key = self.key(constraint)  # type: ignore
+        return key in self.index and self.index[key] == constraint
+
+    def __iter__(self) -> Iterator[C]:
+        return iter(self.index.values())
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add(self, constraint: C):
+        self.index[self.key(constraint)] = constraint
+
+    def discard(self, constraint: C):
+        if constraint in self:
+            del self.index[self.key(constraint)]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
 
 class BaseNetem(Service, ABC):
     @staticmethod
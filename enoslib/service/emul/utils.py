@@ -36,6 +36,31 @@ def _combine(*args, separator: str = ";", chunk_size: int = 100) -> Dict:
     return commands
 
 
+def _tc_batch(*args, max_size: int) -> Dict[str, List[str]]:
+    """Build the tc batch of each host.
+
+    The batch of a host is split in chunks of at most ``max_size`` characters
+    (each chunk is passed on the command line of a remote execution).
+
+    Args:
+        args: the tc commands indexed by host (applied in this order)
+        max_size: the maximum size of a chunk
+    """
+    chunks: Dict[str, List[str]] = defaultdict(list)
+    for commands in args:
+        for alias, cmds in commands.items():
+            host_chunks = chunks[alias]
+            for cmd in cmds:
+                # the batch lines are the tc arguments
+                assert cmd.startswith("tc "), f"{cmd} isn't a tc command"
+                line = cmd[len("tc ") :]
+                if host_chunks and len(host_chunks[-1]) + len(line) < max_size:
+                    host_chunks[-1] += f"\n{line}"
+                else:
+                    host_chunks.append(line)
+    return dict(chunks)
+
+
 def _build_options(extra_vars: Mapping, options: Mapping) -> Dict:
     """This only merges two dicts."""
     _options: Dict = {}
@@ -44,11 +69,11 @@ def _build_options(extra_vars: Mapping, options: Mapping) -> Dict:
     return _options
 
 
-def _build_commands(sources) -> Tuple[Dict, Dict, Dict]:
-    """Source agnostic way of recombining the list of constraints."""
-    _remove = defaultdict(list)
-    _add = defaultdict(list)
-    _htb = defaultdict(list)
+def _merge_sources(sources) -> List:
+    """Merge the sources of a same host.
+
+    The sources aren't modified (the merged ones are copies).
+    """
     # intent make sure there's only one htbhost per host( = per alias)
     # so we merge all the constraints for a given host to a single one
     _sources = sorted(sources, key=attrgetter("host"))
@@ -56,23 +81,79 @@ def _build_commands(sources) -> Tuple[Dict, Dict, Dict]:
 
     new_sources = []
     for alias, group in grouped:
-        first = copy.deepcopy(next(group))
-        for _source in group:
+        first, others = next(group), list(group)
+        if others:
+            first = copy.deepcopy(first)
+        for _source in others:
             first.add_constraints(_source.constraints)
         new_sources.append(first)
+    return new_sources
+
+
+def _build_commands(sources, **kwargs) -> Tuple[Dict, Dict, Dict]:
+    """Source agnostic way of recombining the list of constraints.
+
+    kwargs are passed to the ``all_commands`` method of the sources.
+    """
+    _remove = defaultdict(list)
+    _add = defaultdict(list)
+    _htb = defaultdict(list)
 
     # assert: there's only one Source per host
-    for source in new_sources:
+    for source in _merge_sources(sources):
         # generate devices based command (remove + add qdisc)
         alias = source.host.alias
         (
             _remove[alias],
             _add[alias],
             _htb[alias],
-        ) = source.all_commands()
+        ) = source.all_commands(**kwargs)
     return _remove, _add, _htb
 
 
+def _build_update_commands(
+    sources, applied: Mapping, **kwargs
+) -> Tuple[Dict, Dict, Dict, Dict]:
+    """Same as :py:func:`_build_commands` but from some applied states.
+
+    The commands of a host with an applied state only update its constraints
+    in place (they are left out if nothing changed). The other hosts (or those
+    whose constraints can't be updated in place) get all their commands.
+
+    kwargs are passed to the ``all_commands``, ``state`` and
+    ``update_commands`` methods of the sources.
+
+    Args:
+        sources: the sources to apply
+        applied: the states applied previously, indexed by host
+
+    Returns:
+        The remove, add and other commands indexed by alias and the states of
+        the hosts once the commands are applied, indexed by host.
+    """
+    _remove = defaultdict(list)
+    _add = defaultdict(list)
+    _htb = defaultdict(list)
+    states = {}
+    for source in _merge_sources(sources):
+        alias = source.host.alias
+        update = None
+        if source.host in applied:
+            update = source.update_commands(applied[source.host], **kwargs)
+        if update is None:
+            (
+                _remove[alias],
+                _add[alias],
+                _htb[alias],
+            ) = source.all_commands(**kwargs)
+            states[source.host] = source.state(**kwargs)
+            continue
+        cmds, states[source.host] = update
+        if cmds:
+            _htb[alias] = cmds
+    return _remove, _add, _htb, states
+
+
 def validate_delay(
     hosts: Iterable[Host],
     all_addresses: List[str],
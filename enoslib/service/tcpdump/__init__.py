@@ -62,7 +62,7 @@ class TCPDump(Service):
             ifs = []
             if self.networks:
                 ifs = host.filter_interfaces(self.networks)
-            host.extra.update(tcpdump_ifs=ifs)
+            host.set_extra(tcpdump_ifs=ifs)
 
     def deploy(self, force: bool = False):
         with play_on(roles=self.roles, gather_facts=True) as p:
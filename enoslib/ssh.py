@@ -0,0 +1,371 @@
+"""Run plain shell commands on many hosts without Ansible.
+
+Running a shell command through Ansible costs a full play: a worker is
+forked and a module is shipped and run for each host. For plain shell
+commands this machinery isn't needed. This module offers an alternative
+backend for :py:func:`~enoslib.api.run_command` that fans out the command
+over SSH using asyncio.
+
+Connections are multiplexed (``ControlMaster``/``ControlPersist``) so that
+subsequent calls reuse the already established connections. The connection
+options are the same as the one used by Ansible (user, port, keyfile and the
+``gateway``/``gateway_user``/``forward_agent`` extras).
+
+The backend can be selected per call (``run_command(..., executor="ssh")``)
+or globally (``set_config(executor="ssh")``). Calls that need Ansible
+(templating, module arguments, facts...) and hosts that need it (become,
+timeout or other Ansible connection variables) transparently fall back to
+Ansible. ``raw`` commands are plain commands for this backend.
+"""
+import asyncio
+import contextvars
+import logging
+import shlex
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Coroutine, Dict, Iterable, List, Optional
+
+from enoslib.enos_inventory import _build_ssh_common_args
+from enoslib.objects import Host
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_CONTROL_PERSIST = "60s"
+
+# ssh exits with this code on connection errors
+SSH_CONNECTION_ERROR = 255
+
+# connection supported by this backend
+SUPPORTED_CONNECTIONS = ["ssh", "local"]
+
+# Ansible variables of the hosts that don't change how the command is run
+SUPPORTED_VARS = ["ansible_connection", "ansible_python_interpreter"]
+
+
+def _is_supported(host: Host) -> bool:
+    """Check if the host can be reached by this backend.
+
+    Hosts using other Ansible variables (e.g ``ansible_become*``,
+    ``ansible_timeout``, ``ansible_port``) are left to Ansible.
+    """
+    connection = host.extra.get("ansible_connection", "ssh")
+    if connection not in SUPPORTED_CONNECTIONS:
+        return False
+    return all(
+        not key.startswith("ansible_") or key in SUPPORTED_VARS for key in host.extra
+    )
+
+
+def _build_command(command: str, run_as: Optional[str] = None) -> str:
+    if run_as is None:
+        return command
+    return f"sudo -u {shlex.quote(run_as)} -- sh -c {shlex.quote(command)}"
+
+
+def _build_payload(
+    command: str, rc: int, stdout: str, stderr: str, start: datetime, end: datetime
+) -> Dict:
+    """Mimic the payload of the shell module."""
+    # Ansible strips the trailing new lines
+    stdout = stdout.rstrip("\r\n")
+    stderr = stderr.rstrip("\r\n")
+    payload = dict(
+        changed=True,
+        cmd=command,
+        rc=rc,
+        stdout=stdout,
+        stderr=stderr,
+        stdout_lines=stdout.splitlines(),
+        stderr_lines=stderr.splitlines(),
+        start=str(start),
+        end=str(end),
+        delta=str(end - start),
+    )
+    if rc != 0:
+        payload.update(msg="non-zero return code")
+    return payload
+
+
+def _run_coroutine(coro: Coroutine) -> Any:
+    """Run a coroutine to completion, even if an event loop is running.
+
+    This is the case in a Jupyter notebook for instance. In this case the
+    coroutine runs in a dedicated thread with its own event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result: Dict = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:  # propagate everything to the caller
+            result["error"] = e
+
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target,))
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class SSHPool:
+    """A pool of persistent SSH connections.
+
+    Args:
+        concurrency: maximum number of commands run at the same time
+        connect_timeout: ssh connection timeout (in seconds)
+        control_persist: how long an idle master connection is kept open
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        connect_timeout: int = DEFAULT_CONNECT_TIMEOUT,
+        control_persist: str = DEFAULT_CONTROL_PERSIST,
+    ):
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.control_persist = control_persist
+        # sockets path length is limited (~100 chars): keep it short
+        self._control_dir = tempfile.TemporaryDirectory(prefix="enos-ssh-")
+
+    def ssh_args(self, host: Host) -> List[str]:
+        """Build the ssh command line (without the remote command)."""
+        args = [
+            "ssh",
+            "-o",
+            "BatchMode=yes",
+            "-o",
+            f"ConnectTimeout={self.connect_timeout}",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPersist={self.control_persist}",
+            "-o",
+            f"ControlPath={self._control_dir.name}/%C",
+        ]
+        args.extend(shlex.split(_build_ssh_common_args(host)))
+        if host.user is not None:
+            args.extend(["-l", host.user])
+        if host.port is not None:
+            args.extend(["-p", str(host.port)])
+        if host.keyfile is not None:
+            args.extend(["-i", host.keyfile])
+        args.append(host.address)
+        return args
+
+    async def _exec(self, host: Host, command: str) -> asyncio.subprocess.Process:
+        if host.extra.get("ansible_connection") == "local":
+            return await asyncio.create_subprocess_exec(
+                "/bin/sh",
+                "-c",
+                command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        return await asyncio.create_subprocess_exec(
+            *self.ssh_args(host),
+            "--",
+            command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def _run_one(
+        self,
+        host: Host,
+        command: str,
+        task_name: str,
+        semaphore: asyncio.Semaphore,
+    ):
+        from enoslib.api import (
+            STATUS_FAILED,
+            STATUS_OK,
+            STATUS_UNREACHABLE,
+            CommandResult,
+        )
+
+        async with semaphore:
+            start = datetime.now()
+            process = await self._exec(host, command)
+            _stdout, _stderr = await process.communicate()
+            end = datetime.now()
+        rc = process.returncode
+        assert rc is not None
+        stdout = _stdout.decode(errors="replace")
+        stderr = _stderr.decode(errors="replace")
+        is_local = host.extra.get("ansible_connection") == "local"
+        if rc == SSH_CONNECTION_ERROR and not is_local:
+            payload = dict(unreachable=True, msg=stderr.strip(), changed=False)
+            status = STATUS_UNREACHABLE
+        else:
+            payload = _build_payload(command, rc, stdout, stderr, start, end)
+            status = STATUS_OK if rc == 0 else STATUS_FAILED
+        alias = host.alias if host.alias is not None else host.address
+        return CommandResult(
+            host=alias,
+            task=task_name,
+            status=status,
+            payload=payload,
+            start=start.timestamp(),
+            end=end.timestamp(),
+        )
+
+    async def arun(self, hosts: Iterable[Host], command: str, task_name: str):
+        """Run the command concurrently on all the hosts.
+
+        Returns:
+            The :py:class:`~enoslib.api.Results` (one per host)
+        """
+        from enoslib.api import Results
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *[self._run_one(host, command, task_name, semaphore) for host in hosts]
+        )
+        return Results(results)
+
+    def run(self, hosts: Iterable[Host], command: str, task_name: str):
+        """Blocking version of :py:meth:`~enoslib.ssh.SSHPool.arun`."""
+        return _run_coroutine(self.arun(hosts, command, task_name))
+
+    def close(self):
+        """Remove the control sockets directory.
+
+        Masters connection exit by themselves after ``control_persist``.
+        """
+        self._control_dir.cleanup()
+
+
+def _is_direct(host: Host) -> bool:
+    """Check if the SSH port of the host is reached directly."""
+    connection = host.extra.get("ansible_connection", "ssh")
+    return connection == "ssh" and host.extra.get("gateway") is None
+
+
+async def _probe_one(host: Host, timeout: float, semaphore: asyncio.Semaphore) -> bool:
+    port = host.port if host.port is not None else 22
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host.address, port), timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+
+async def _aprobe_tcp(
+    hosts: List[Host], timeout: float, concurrency: int
+) -> List[bool]:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *[_probe_one(host, timeout, semaphore) for host in hosts]
+    )
+
+
+def probe_tcp(
+    hosts: Iterable[Host],
+    timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[Host]:
+    """Get the hosts whose SSH port accepts connections.
+
+    This is a plain TCP connection: much cheaper than an SSH handshake. The
+    hosts that aren't reached directly (through a gateway or using another
+    connection plugin) can't be probed and are considered as reachable.
+
+    Args:
+        hosts: the hosts to probe
+        timeout: connection timeout (in seconds)
+        concurrency: maximum number of connections attempted at the same time
+
+    Returns:
+        The hosts that may be reachable
+    """
+    hosts = list(hosts)
+    direct = [h for h in hosts if _is_direct(h)]
+    opened = _run_coroutine(_aprobe_tcp(direct, timeout, concurrency))
+    closed = {id(h) for h, ok in zip(direct, opened) if not ok}
+    return [h for h in hosts if id(h) not in closed]
+
+
+_pool: Optional[SSHPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SSHPool:
+    """Get the pool shared by all the calls (connections are kept warm)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHPool()
+        return _pool
+
+
+def run_command_ssh(
+    command: str,
+    hosts: Iterable[Host],
+    *,
+    run_as: Optional[str] = None,
+    task_name: Optional[str] = None,
+    on_error_continue: bool = False,
+    pool: Optional[SSHPool] = None,
+):
+    """Run a shell command on some hosts over SSH (no Ansible involved).
+
+    Args:
+        command: the command to run (no templating is done)
+        hosts: the hosts to run the command on
+        run_as: run the command as this user (using sudo)
+        task_name: name of the command (default to the command itself)
+        on_error_continue: Don't throw any exception in case a host is
+            unreachable or the command fails
+        pool: the pool of connections to use (default to a shared pool)
+
+    Raises:
+        :py:class:`enoslib.errors.EnosFailedHostsError`: if the command
+            fails on a host and ``on_error_continue==False``
+        :py:class:`enoslib.errors.EnosUnreachableHostsError`: if a host is
+            unreachable (through ssh) and ``on_error_continue==False``
+
+    Returns:
+        The :py:class:`~enoslib.api.Results` (one per host)
+    """
+    from enoslib.api import _check_results, _dump_results
+
+    if pool is None:
+        pool = get_pool()
+    if task_name is None:
+        task_name = command
+    hosts = list(hosts)
+    unsupported = [h for h in hosts if not _is_supported(h)]
+    if unsupported:
+        raise ValueError(
+            f"Those hosts aren't supported by the ssh executor: {unsupported}"
+        )
+    start = time.time()
+    results = pool.run(hosts, _build_command(command, run_as=run_as), task_name)
+    logger.debug(
+        "Ran %s on %s hosts in %ss", command, len(hosts), time.time() - start
+    )
+    # dump the failures too, before raising
+    _dump_results(results)
+    _check_results(results, on_error_continue)
+    return results
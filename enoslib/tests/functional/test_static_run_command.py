@@ -115,10 +115,10 @@ with TemporaryDirectory() as tmp:
     dump_file = Path(tmp) / "run_command.out"
     with config_context(dump_results=dump_file):
         results = en.run("echo tototiti", roles["control"])
-    import json
+    from enoslib.dump import read_results
 
     assert dump_file.exists()
-    assert len(json.loads(dump_file.read_text())) == 1
+    assert len(list(read_results(dump_file))) == 1
 
     # subsequent run creates a run_command.out.1 file
     dump_file = Path(tmp) / "run_command.out"
@@ -126,7 +126,5 @@ with TemporaryDirectory() as tmp:
         results = en.run("echo tototiti", roles["control"])
 
     new_dump_file = Path(f"{dump_file}.1")
-    import json
-
     assert new_dump_file.exists()
-    assert len(json.loads(new_dump_file.read_text())) == 1
+    assert len(list(read_results(new_dump_file))) == 1
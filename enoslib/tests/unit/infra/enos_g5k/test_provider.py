@@ -125,6 +125,12 @@ class TestG5kEnos(EnosTest):
         self.assertEqual(1022, len(list(enos_subnet.free_ips)))
         self.assertTrue(enos_subnet.has_free_macs)
         self.assertEqual(1022, len(list(enos_subnet.free_macs)))
+        self.assertEqual(list(enos_subnet.free_ips), list(enos_subnet.ip_pool))
+        self.assertEqual(list(enos_subnet.free_macs), list(enos_subnet.mac_pool))
+        self.assertEqual(
+            ["00:16:3E:8C:00:01", "00:16:3E:8C:00:02"],
+            enos_subnet.mac_pool.reserve(2),
+        )
 
     def test_offset_walltime(self):
         conf = Configuration()
@@ -1,7 +1,13 @@
+import ipaddress
 from unittest import mock
 
 from enoslib.infra.enos_vmong5k.configuration import Configuration, MachineConfiguration
-from enoslib.infra.enos_vmong5k.provider import _distribute, _do_build_g5k_conf
+from enoslib.infra.enos_g5k.objects import G5kEnosSubnetNetwork
+from enoslib.infra.enos_vmong5k.provider import (
+    _distribute,
+    _do_build_g5k_conf,
+    mac_range,
+)
 from enoslib.objects import Host
 from enoslib.tests.unit import EnosTest
 
@@ -111,3 +117,26 @@ class TestDistribute(EnosTest):
 
         vm = vmong5k_roles["r1"][1]
         self.assertEqual(host1, vm.pm)
+
+
+class TestMacRange(EnosTest):
+    def setUp(self):
+        self.subnets = [
+            G5kEnosSubnetNetwork(ipaddress.ip_network(n))
+            for n in ["10.140.4.0/22", "10.140.0.0/22"]
+        ]
+
+    def test_mac_range(self):
+        macs = list(mac_range(self.subnets))
+        # the first mac of each subnet is skipped
+        self.assertEqual(2 * 1021, len(macs))
+        self.assertEqual("00:16:3E:8C:00:02", macs[0])
+        self.assertEqual("00:16:3E:8C:04:02", macs[1021])
+
+    def test_mac_range_skip(self):
+        macs = list(mac_range(self.subnets, skip=5, step=2))
+        self.assertEqual("00:16:3E:8C:00:07", macs[0])
+        self.assertEqual("00:16:3E:8C:00:09", macs[1])
+        # skipping a whole subnet
+        macs = list(mac_range(self.subnets, skip=1021))
+        self.assertEqual("00:16:3E:8C:04:02", macs[0])
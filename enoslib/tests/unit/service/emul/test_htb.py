@@ -1,5 +1,24 @@
+import re
+from collections import Counter
+from unittest.mock import patch
+
+from jsonschema import ValidationError
+
 from enoslib.objects import Host
-from enoslib.service.emul.htb import HTBConstraint, HTBSource
+from enoslib.service.emul.htb import (
+    FILTERS_FLOWER,
+    FILTERS_U32,
+    FILTERS_U32_HASH,
+    HTBConstraint,
+    HTBSource,
+    NetemHTB,
+    netem_htb,
+)
+from enoslib.service.emul.utils import (
+    _build_commands,
+    _build_update_commands,
+    _tc_batch,
+)
 from enoslib.tests.unit import EnosTest
 
 
@@ -30,6 +49,45 @@ class TestAddConstraint(EnosTest):
         source.add_constraints([nc1, nc2])
         self.assertCountEqual(source.constraints, [nc2])
 
+    def test_existing_target_is_overwritten_init(self):
+        nc1 = HTBConstraint("eth0", "10ms", "1.1.1.2")
+        nc2 = HTBConstraint("eth0", "20ms", "1.1.1.2")
+        nc3 = HTBConstraint("eth1", "20ms", "1.1.1.2")
+        source = HTBSource(Host("1.1.1.1"), constraints={nc1, nc3})
+        idx = source.state().slices[("eth0", "1.1.1.2")][0]
+        source.add_constraints([nc2])
+        self.assertCountEqual(source.constraints, [nc2, nc3])
+        # the slice of the target is kept
+        self.assertEqual((idx, nc2), source.state().slices[("eth0", "1.1.1.2")])
+
+    def test_constraints_are_indexed(self):
+        nc1 = HTBConstraint("eth0", "10ms", "1.1.1.2")
+        nc2 = HTBConstraint("eth0", "20ms", "1.1.1.2")
+        nc3 = HTBConstraint("eth1", "20ms", "1.1.1.2")
+        source = HTBSource(Host("1.1.1.1"), constraints={nc1})
+        # direct changes to the constraints are seen by the commands
+        source.constraints.add(nc2)
+        source.constraints.add(nc3)
+        self.assertCountEqual([nc2, nc3], source.constraints)
+        self.assertNotIn(nc1, source.constraints)
+        self.assertEqual(
+            {("eth0", "1.1.1.2"), ("eth1", "1.1.1.2")}, source.state().slices.keys()
+        )
+        source.constraints.discard(nc3)
+        self.assertEqual([(0, nc2)], source._slices())
+        source.constraints = {nc1, nc3}
+        self.assertEqual({nc1, nc3}, source.constraints)
+        self.assertEqual(2, len(source._slices()))
+
+    def test_invalid_values(self):
+        for _ in range(2):
+            with self.assertRaises(ValidationError):
+                HTBConstraint("eth0", "10ms", "1.1.1.2", rate="10")
+            with self.assertRaises(ValidationError):
+                HTBConstraint("eth0", "10ms", "1.1.1.2", loss="0.1")
+            with self.assertRaises(ValidationError):
+                HTBConstraint("eth0", "10", "1.1.1.2")
+
 
 class TestGeneratedCommands(EnosTest):
     def test_ipv4(self):
@@ -94,3 +152,255 @@ class TestGeneratedCommands(EnosTest):
             ],
             nc.commands(1),
         )
+
+
+class TestFilters(EnosTest):
+    def _source(self, n=1000):
+        source = HTBSource(Host("1.1.1.1"))
+        source.add_constraints(
+            HTBConstraint("eth0", "10ms", f"10.0.{i // 250}.{i % 250 + 1}")
+            for i in range(n)
+        )
+        return source
+
+    def _filters(self, source, filters):
+        return [c for c in source.commands(filters) if c.startswith("tc filter")]
+
+    def test_u32(self):
+        filters = self._filters(self._source(), FILTERS_U32)
+        # one linear chain of filters
+        self.assertEqual(1000, len(filters))
+        self.assertFalse(any(" ht " in f for f in filters))
+
+    def test_u32_hash(self):
+        source = self._source()
+        filters = self._filters(source, FILTERS_U32_HASH)
+        # the hash table and the filter linking to it
+        self.assertEqual(1002, len(filters))
+        self.assertEqual(
+            [
+                "tc filter add dev eth0 parent 1: prio 1 handle 100: protocol ip u32 divisor 256",  # noqa
+                "tc filter add dev eth0 parent 1: prio 1 protocol ip u32 match ip dst 0.0.0.0/0 hashkey mask 0x000000ff at 16 link 100:",  # noqa
+            ],
+            filters[:2],
+        )
+        # a packet is matched against a few filters only
+        buckets = Counter(f.split(" ht ")[1].split()[0] for f in filters[2:])
+        self.assertEqual(250, len(buckets))
+        self.assertEqual(4, max(buckets.values()))
+        # the slices are the same as with the u32 filters
+        others = [c for c in source.commands(FILTERS_U32) if "filter" not in c]
+        self.assertEqual(
+            others, [c for c in source.commands(FILTERS_U32_HASH) if "filter" not in c]
+        )
+
+    def test_u32_hash_ipv6(self):
+        nc = HTBConstraint("eth0", "10ms", "2001:660:4406:700:1::d")
+        self.assertEqual(
+            [
+                "tc filter add dev eth0 parent 1: prio 2 handle 101: protocol ipv6 u32 divisor 256",  # noqa
+                "tc filter add dev eth0 parent 1: prio 2 protocol ipv6 u32 match ip6 dst ::/0 hashkey mask 0x000000ff at 36 link 101:",  # noqa
+            ],
+            nc.filter_setup_commands(FILTERS_U32_HASH),
+        )
+        self.assertEqual(
+            "tc filter add dev eth0 parent 1: prio 2 protocol ipv6 u32 ht 101:d: match ip6 dst 2001:660:4406:700:1::d flowid 1:2",  # noqa
+            nc.filter_command(1, FILTERS_U32_HASH),
+        )
+
+    def test_flower(self):
+        filters = self._filters(self._source(), FILTERS_FLOWER)
+        self.assertEqual(1000, len(filters))
+        # all in the same classifier
+        classifiers = {re.findall("prio [0-9]+ flower", f)[0] for f in filters}
+        self.assertEqual({"prio 1 flower"}, classifiers)
+        self.assertEqual(
+            "tc filter add dev eth0 parent 1: protocol ip prio 1 flower dst_ip 10.0.0.1 flowid 1:2",  # noqa
+            HTBConstraint("eth0", "10ms", "10.0.0.1").filter_command(1, FILTERS_FLOWER),
+        )
+
+    def test_unknown_filters(self):
+        with self.assertRaises(ValueError):
+            self._source(1).commands("foo")
+
+
+class TestBatch(EnosTest):
+    def test_tc_batch(self):
+        source = HTBSource(Host("1.1.1.1"))
+        source.add_constraints(
+            [
+                HTBConstraint("eth0", "10ms", "1.1.1.2"),
+                HTBConstraint("eth1", "10ms", "1.1.1.3"),
+            ]
+        )
+        remove, add, htb = _build_commands([source])
+        batch = _tc_batch(add, htb, max_size=1024)
+        self.assertEqual(1, len(batch["1.1.1.1"]))
+        lines = batch["1.1.1.1"][0].splitlines()
+        # one line per command (but the removal), in the same order
+        self.assertEqual(
+            add["1.1.1.1"] + htb["1.1.1.1"], [f"tc {line}" for line in lines]
+        )
+        self.assertTrue(all(line.startswith("qdisc add dev") for line in lines[:2]))
+        # the batch is split in small chunks
+        chunks = _tc_batch(add, htb, max_size=100)["1.1.1.1"]
+        self.assertLess(1, len(chunks))
+        self.assertTrue(all(len(chunk) < 100 or "\n" not in chunk for chunk in chunks))
+        self.assertEqual(lines, "\n".join(chunks).splitlines())
+
+    @patch("enoslib.service.emul.htb.play_on")
+    def test_netem_htb_batch(self, play_on):
+        source = HTBSource(Host("1.1.1.1"))
+        source.add_constraint("eth0", "10ms", "1.1.1.2")
+        netem_htb([source], batch=True)
+        p = play_on.return_value.__enter__.return_value
+        # the batch is piped to tc, nothing is copied on the hosts
+        p.copy.assert_not_called()
+        command = p.raw.call_args_list[-1][0][0]
+        self.assertTrue(command.startswith("tc -batch - <<"))
+        self.assertIn("{{ item }}", command)
+        batch = play_on.call_args[1]["extra_vars"]["tc_batch"]
+        self.assertEqual(["1.1.1.1"], list(batch))
+
+
+class TestIncremental(EnosTest):
+    def _update(self, source, state, **kwargs):
+        update = source.update_commands(state, **kwargs)
+        assert update is not None
+        return update
+
+    def setUp(self):
+        self.host = Host("1.1.1.1")
+        self.source = HTBSource(self.host)
+        self.source.add_constraints(
+            [
+                HTBConstraint("eth0", "10ms", "1.1.1.2"),
+                HTBConstraint("eth0", "10ms", "1.1.1.3"),
+            ]
+        )
+        self.state = self.source.state()
+        self.idx = {key: idx for key, (idx, _) in self.state.slices.items()}
+
+    def test_state(self):
+        # the state matches the slices of the commands
+        filters = [c for c in self.source.commands() if c.startswith("tc filter")]
+        for idx, constraint in self.state.slices.values():
+            self.assertIn(
+                f"match ip dst {constraint.target} flowid 1:{idx + 1}", filters[idx]
+            )
+
+    def test_no_change(self):
+        cmds, state = self._update(self.source, self.state)
+        self.assertEqual([], cmds)
+        self.assertEqual(self.state, state)
+
+    def test_changed_constraints(self):
+        self.source.add_constraints(
+            [
+                HTBConstraint("eth0", "20ms", "1.1.1.2", loss="1%"),
+                HTBConstraint("eth0", "10ms", "1.1.1.3", rate="1gbit"),
+            ]
+        )
+        cmds, state = self._update(self.source, self.state)
+        idx2, idx3 = self.idx[("eth0", "1.1.1.2")], self.idx[("eth0", "1.1.1.3")]
+        self.assertCountEqual(
+            [
+                f"tc qdisc change dev eth0 parent 1:{idx2 + 1} handle {idx2 + 10}: "
+                "netem delay 20ms loss 1%",
+                f"tc class change dev eth0 parent 1: classid 1:{idx3 + 1} "
+                "htb rate 1gbit",
+            ],
+            cmds,
+        )
+        self.assertEqual(self.source.state().slices.keys(), state.slices.keys())
+        # the slices are kept
+        self.assertEqual(self.idx, {k: idx for k, (idx, _) in state.slices.items()})
+        self.assertEqual([], self._update(self.source, state)[0])
+
+    def test_new_target(self):
+        self.source.add_constraint("eth0", "10ms", "1.1.1.4")
+        cmds, state = self._update(self.source, self.state)
+        self.assertEqual(HTBConstraint("eth0", "10ms", "1.1.1.4").commands(2), cmds)
+        self.assertEqual(2, state.slices[("eth0", "1.1.1.4")][0])
+
+    def test_rebuild(self):
+        # a removed target
+        source = HTBSource(self.host)
+        source.add_constraint("eth0", "10ms", "1.1.1.2")
+        self.assertIsNone(source.update_commands(self.state))
+        # a new device
+        self.source.add_constraint("eth1", "10ms", "1.1.1.2")
+        self.assertIsNone(self.source.update_commands(self.state))
+
+    def test_rebuild_filters(self):
+        self.assertIsNone(
+            self.source.update_commands(self.state, filters=FILTERS_U32_HASH)
+        )
+        # a new ip version needs a new hash table
+        source = HTBSource(self.host)
+        source.add_constraint("eth0", "10ms", "1.1.1.2")
+        state = source.state(filters=FILTERS_U32_HASH)
+        source.add_constraint("eth0", "10ms", "2001:db8::2")
+        self.assertIsNone(source.update_commands(state, filters=FILTERS_U32_HASH))
+        # but a new target can use the existing one
+        source = HTBSource(self.host)
+        source.add_constraints(
+            [
+                HTBConstraint("eth0", "10ms", "1.1.1.2"),
+                HTBConstraint("eth0", "10ms", "1.1.2.3"),
+            ]
+        )
+        cmds, _ = self._update(source, state, filters=FILTERS_U32_HASH)
+        self.assertEqual(3, len(cmds))
+        self.assertIn("u32 ht 100:3: match ip dst 1.1.2.3 flowid 1:2", cmds[2])
+
+    def test_build_update_commands(self):
+        other = HTBSource(Host("1.1.1.2"))
+        other.add_constraint("eth0", "10ms", "1.1.1.1")
+        remove, add, htb, states = _build_update_commands(
+            [self.source, other], {self.host: self.state}
+        )
+        # nothing changed on the first host, the other one is built
+        self.assertEqual(["1.1.1.2"], list(remove))
+        self.assertEqual(["1.1.1.2"], list(htb))
+        self.assertEqual(self.state, states[self.host])
+        self.assertEqual(other.state(), states[other.host])
+        self.source.add_constraint("eth0", "20ms", "1.1.1.2")
+        remove, add, htb, states = _build_update_commands(
+            [self.source, other], states
+        )
+        self.assertEqual({}, remove)
+        self.assertEqual({}, add)
+        self.assertEqual(["1.1.1.1"], list(htb))
+        self.assertEqual(1, len(htb["1.1.1.1"]))
+
+    @patch("enoslib.service.emul.htb.play_on")
+    def test_deploy(self, play_on):
+        other = Host("1.1.1.2")
+        netem = NetemHTB()
+        netem.sources = {
+            self.host: self.source,
+            other: HTBSource(other).add_constraints(
+                [HTBConstraint("eth0", "10ms", "1.1.1.1")]
+            ),
+        }
+        netem.deploy()
+        self.assertEqual(
+            self.state.slices.keys(), netem.applied[self.host].slices.keys()
+        )
+        roles = play_on.call_args[1]["roles"]
+        self.assertCountEqual([self.host, other], roles["all"])
+        # only the changed host
+        netem.sources[other].add_constraint("eth0", "20ms", "1.1.1.1")
+        netem.deploy(incremental=True)
+        self.assertCountEqual([other], play_on.call_args[1]["roles"]["all"])
+        tc_commands = play_on.call_args[1]["extra_vars"]["tc_commands"]
+        self.assertEqual(["1.1.1.2"], list(tc_commands))
+        self.assertIn("qdisc change", tc_commands["1.1.1.2"][0])
+        # nothing to do
+        play_on.reset_mock()
+        netem.deploy(incremental=True)
+        play_on.assert_not_called()
+        # rebuild everything
+        netem.deploy()
+        self.assertEqual(2, len(play_on.call_args[1]["roles"]["all"]))
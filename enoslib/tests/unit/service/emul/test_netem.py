@@ -41,3 +41,54 @@ class TestAddConstraint(EnosTest):
         source = NetemInOutSource(h)
         source.add_constraints([nc1, nc2, nc3, nc4])
         self.assertCountEqual([nc1, nc2, nc3, nc4], source.constraints)
+
+    def test_same_if_are_overwritten_init(self):
+        nc1 = NetemInConstraint("eth0", "delay 10ms")
+        nc2 = NetemInConstraint("eth0", "delay 20ms")
+        nc3 = NetemOutConstraint("eth0", "delay 20ms")
+        source = NetemInOutSource(Host("1.1.1.1"), constraints={nc1, nc3})
+        source.add_constraints([nc2])
+        self.assertCountEqual([nc2, nc3], source.constraints)
+
+    def test_constraints_are_indexed(self):
+        nc1 = NetemInConstraint("eth0", "delay 10ms")
+        nc2 = NetemInConstraint("eth0", "delay 20ms")
+        source = NetemInOutSource(Host("1.1.1.1"))
+        # direct changes to the constraints are seen by the commands
+        source.constraints.add(nc1)
+        source.constraints.add(nc2)
+        self.assertCountEqual([nc2], source.constraints)
+        self.assertIn("tc qdisc add dev ifb0 root netem delay 20ms", source.commands())
+
+
+class TestIncremental(EnosTest):
+    def _update(self, source, state):
+        update = source.update_commands(state)
+        assert update is not None
+        return update
+
+    def setUp(self):
+        self.source = NetemInOutSource(Host("1.1.1.1"))
+        self.source.add_constraints(
+            [
+                NetemInConstraint("eth0", "delay 10ms"),
+                NetemOutConstraint("eth0", "delay 10ms"),
+            ]
+        )
+        self.state = self.source.state()
+
+    def test_no_change(self):
+        self.assertEqual(([], self.state), self._update(self.source, self.state))
+
+    def test_changed_options(self):
+        self.source.add_constraints([NetemInConstraint("eth0", "delay 20ms")])
+        cmds, state = self._update(self.source, self.state)
+        idx, _ = self.state.slices[(NetemInConstraint, "eth0")]
+        self.assertEqual([f"tc qdisc change dev ifb{idx} root netem delay 20ms"], cmds)
+        self.source.add_constraints([NetemOutConstraint("eth0", "delay 20ms")])
+        cmds, _ = self._update(self.source, state)
+        self.assertEqual(["tc qdisc change dev eth0 root netem delay 20ms"], cmds)
+
+    def test_rebuild(self):
+        self.source.add_constraints([NetemOutConstraint("eth1", "delay 20ms")])
+        self.assertIsNone(self.source.update_commands(self.state))
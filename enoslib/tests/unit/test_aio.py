@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from tempfile import TemporaryDirectory
+
+from ansible import context
+from ansible.module_utils.common.collections import ImmutableDict
+from ansible.plugins.loader import PluginLoader
+
+from enoslib.aio import aactions, acall, arun, arun_command
+from enoslib.api import _CLIARGS, STATUS_OK, Session, _load_defaults
+from enoslib.local import LocalHost
+from enoslib.objects import Roles
+
+from . import EnosTest
+
+
+class TestCLIArgs(EnosTest):
+    def test_per_thread(self):
+        barrier = threading.Barrier(2)
+        seen = {}
+        cli_args = context.CLIARGS
+        load_module_source = PluginLoader._load_module_source
+
+        def target(basedir):
+            with _CLIARGS.use(ImmutableDict(basedir=basedir)):
+                # both threads run with their own arguments
+                barrier.wait()
+                seen[basedir] = context.CLIARGS["basedir"]
+                seen[f"{basedir}-lock"] = (
+                    PluginLoader._load_module_source is not load_module_source
+                )
+                barrier.wait()
+
+        threads = [
+            threading.Thread(target=target, args=(basedir,))
+            for basedir in ["/foo", "/bar"]
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(
+            {"/foo": "/foo", "/bar": "/bar", "/foo-lock": True, "/bar-lock": True},
+            seen,
+        )
+        # nothing is left behind once the runs are over
+        self.assertIs(cli_args, context.CLIARGS)
+        self.assertIs(load_module_source, PluginLoader._load_module_source)
+
+    def test_session_arguments(self):
+        roles = Roles(all=[LocalHost()])
+        with TemporaryDirectory() as foo, TemporaryDirectory() as bar:
+            with Session(roles=roles, basedir=foo) as session:
+                # another execution in this thread
+                _load_defaults(roles=roles, basedir=bar)
+                results = session.run_command("echo {{ playbook_dir }}")
+            self.assertEqual(foo, results[0].stdout)
+            self.assertEqual(bar, context.CLIARGS["basedir"])
+
+
+class TestAsync(EnosTest):
+    def test_concurrent_plays(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(2)])
+
+        async def main():
+            async with aactions(roles=roles["all"][0]) as a:
+                a.shell("echo aactions")
+            results = await asyncio.gather(
+                arun("echo arun", roles=roles["all"][1]),
+                arun_command("echo arun_command", roles=roles["all"][0]),
+                acall(lambda x: x + 1, 1),
+            )
+            return a.results, results
+
+        actions_results, (run_results, command_results, value) = asyncio.run(
+            main()
+        )
+        self.assertEqual(STATUS_OK, actions_results[0].status)
+        self.assertEqual("aactions", actions_results.filter(task="shell")[0].stdout)
+        self.assertEqual("local-1", run_results[0].host)
+        self.assertEqual("arun", run_results[0].stdout)
+        self.assertEqual("arun_command", command_results[0].stdout)
+        self.assertEqual(2, value)
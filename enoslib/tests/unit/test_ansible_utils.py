@@ -1,4 +1,10 @@
-from enoslib.enos_inventory import EnosInventory
+from unittest import mock
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.vars.manager import VariableManager
+
+from enoslib.config import config_context
+from enoslib.enos_inventory import EnosInventory, PatternResolver, _get_plan
 from enoslib.objects import (
     BridgeDevice,
     DefaultNetwork,
@@ -17,6 +23,121 @@ def _find_host_line(ini, role):
     return ini[idx + 1]
 
 
+class TestInventoryPlan(EnosTest):
+    def test_plan_is_cached(self):
+        h = Host("1.2.3.4", alias="cached", extra=dict(foo="bar"))
+        plan = _get_plan({"r1": [h], "r2": [h]})
+        self.assertIs(plan, _get_plan({"r1": [h], "r2": [h]}))
+        self.assertEqual([("r1", ["cached"]), ("r2", ["cached"])], plan.groups)
+        self.assertEqual("bar", plan.hosts["cached"][1]["foo"])
+
+    def test_plan_follows_extra(self):
+        h = Host("1.2.3.4", alias="mutated", extra=dict(foo="bar"))
+        _get_plan({"r1": [h]})
+        h.set_extra(foo="baz")
+        self.assertEqual("baz", _get_plan({"r1": [h]}).hosts["mutated"][1]["foo"])
+
+    def test_reconcile_once(self):
+        hosts = [Host(f"1.2.3.{i}") for i in range(10)]
+        with mock.patch.object(EnosInventory, "reconcile_inventory") as m:
+            EnosInventory(roles={"r1": hosts, "r2": hosts})
+            m.assert_called_once()
+
+    def test_groups(self):
+        hosts = [Host(f"1.2.3.{i}") for i in range(4)]
+        inventory = EnosInventory(roles={"r1": hosts[:2], "r2": hosts[1:]})
+        self.assertCountEqual(
+            ["1.2.3.0", "1.2.3.1"], [h.name for h in inventory.get_hosts("r1")]
+        )
+        self.assertEqual(4, len(inventory.get_hosts("all")))
+
+    def test_fast_profile(self):
+        hosts = [
+            Host("1.2.3.4"),
+            Host("1.2.3.5", extra=dict(ansible_pipelining=False)),
+        ]
+        inventory = EnosInventory(roles={"r1": hosts})
+        self.assertNotIn("ansible_pipelining", inventory.groups["all"].vars)
+        with config_context(ansible_profile="fast"):
+            inventory = EnosInventory(roles={"r1": hosts})
+        variable_manager = VariableManager(loader=DataLoader(), inventory=inventory)
+        host_vars = [
+            variable_manager.get_vars(host=inventory.get_host(h.address))
+            for h in hosts
+        ]
+        self.assertTrue(host_vars[0]["ansible_pipelining"])
+        self.assertIn("ControlPersist", host_vars[0]["ansible_ssh_args"])
+        # the hosts variables have the precedence
+        self.assertFalse(host_vars[1]["ansible_pipelining"])
+
+
+class TestPatternResolver(EnosTest):
+    def setUp(self):
+        hosts = [
+            Host(f"10.0.0.{i}", alias=f"web-{i}" if i % 2 else f"db{i}")
+            for i in range(12)
+        ]
+        self.roles = {
+            "compute": [hosts[i] for i in [3, 1, 4, 10, 5, 9]],
+            "control": [hosts[i] for i in [2, 6, 5, 3]],
+            "web": [hosts[i] for i in [5, 8, 9, 7, 11]],
+            "all": hosts[:3],
+        }
+
+    def test_same_as_ansible(self):
+        patterns = [
+            "all",
+            "*",
+            "compute",
+            "compute:control",
+            "compute:&control",
+            "compute:!control",
+            "web-*",
+            "~db[0-9]$",
+            "compute[0]",
+            "compute[1:3]",
+            "compute[2:]",
+            "control[-1]",
+            "web-1",
+            "web-1,db2",
+            "!control",
+            "&web",
+            "co*",
+            "nothing",
+            "db*:!compute[0:1]",
+            "compute,control[0]",
+            "all:!web-*:&compute",
+            "ungrouped",
+            "ungrouped:web",
+        ]
+        inventory = EnosInventory(roles=self.roles)
+        resolver = PatternResolver(self.roles)
+        for pattern in patterns:
+            self.assertEqual(
+                [h.name for h in inventory.get_hosts(pattern=pattern)],
+                resolver.aliases(pattern),
+                pattern,
+            )
+
+    def test_alias_named_as_group(self):
+        hosts = [Host("10.0.0.1", alias="web"), Host("10.0.0.2", alias="db")]
+        roles = {"web": hosts[1:], "other": hosts[:1]}
+        inventory = EnosInventory(roles=roles)
+        resolver = PatternResolver(roles)
+        for pattern in ["web", "web:other", "other:!web", "all:!web", "all:&web"]:
+            self.assertEqual(
+                [h.name for h in inventory.get_hosts(pattern=pattern)],
+                resolver.aliases(pattern),
+                pattern,
+            )
+
+    def test_get_hosts(self):
+        resolver = PatternResolver(self.roles)
+        hosts = resolver.get_hosts("compute:&control")
+        self.assertCountEqual(["10.0.0.3", "10.0.0.5"], [h.address for h in hosts])
+        self.assertEqual([], resolver.get_hosts("nothing"))
+
+
 class TestGenerateInventoryString(EnosTest):
     def test_address(self):
         h = Host("1.2.3.4")
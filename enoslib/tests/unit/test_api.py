@@ -1,9 +1,43 @@
+import importlib.util
+import json
+import os
+import unittest
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import List, Union
 from unittest import mock
 
-from enoslib.api import STATUS_OK, CommandResult, Results, actions, get_hosts, wait_for
-from enoslib.errors import EnosSSHNotReady, EnosUnreachableHostsError
-from enoslib.objects import Host, Roles
+from enoslib.api import (
+    STATUS_FAILED,
+    STATUS_OK,
+    CommandResult,
+    Results,
+    Session,
+    SpinnerCallback,
+    _AnsibleExecutionRecord,
+    _backoff,
+    _FactsSync,
+    _histogram,
+    _MyCallback,
+    _RecordStream,
+    _truncate_payload,
+    actions,
+    get_hosts,
+    run_command,
+    run_command_iter,
+    run_play,
+    sync_info,
+    wait_for,
+)
+from enoslib.config import config_context
+from enoslib.errors import (
+    EnosFailedHostsError,
+    EnosSSHNotReady,
+    EnosUnreachableHostsError,
+)
+from enoslib.local import LocalHost
+from enoslib.objects import DefaultNetwork, Host, Networks, Roles
 
 from . import EnosTest
 
@@ -44,6 +78,49 @@ class TestSSH(EnosTest):
             wait_for(self.hosts, interval=0)
 
 
+class TestWaitFor(EnosTest):
+    def test_only_pending_hosts_are_probed(self):
+        hosts = [Host(f"1.2.3.{i}") for i in range(3)]
+        probed = []
+
+        def run_play(play_source, roles=None, **kwargs):
+            probed.append(sorted(h.alias for h in roles))
+            if len(probed) < 3:
+                # the last one is slow to come up
+                raise EnosUnreachableHostsError([hosts[2]])
+            return []
+
+        with mock.patch("enoslib.api.run_play", side_effect=run_play):
+            time_to_ready = wait_for(hosts, interval=0)
+        self.assertEqual(
+            [["1.2.3.0", "1.2.3.1", "1.2.3.2"], ["1.2.3.2"], ["1.2.3.2"]], probed
+        )
+        self.assertCountEqual(["1.2.3.0", "1.2.3.1", "1.2.3.2"], time_to_ready)
+        self.assertLessEqual(time_to_ready["1.2.3.0"], time_to_ready["1.2.3.2"])
+
+    def test_tcp_probe(self):
+        hosts = [Host("1.2.3.4"), Host("1.2.3.5")]
+        with mock.patch(
+            "enoslib.ssh.probe_tcp", side_effect=[[hosts[0]], hosts[1:]]
+        ), mock.patch("enoslib.api.run_play", return_value=[]) as m:
+            wait_for(hosts, interval=0, tcp_probe=True)
+        # one ssh probe per host
+        self.assertEqual(2, m.call_count)
+
+    def test_backoff(self):
+        for attempt in range(10):
+            delay = _backoff(attempt, 30)
+            self.assertLessEqual(delay, min(30, 2**attempt))
+            self.assertGreaterEqual(delay, min(30, 2**attempt) / 2)
+        self.assertEqual(0, _backoff(3, 0))
+
+    def test_histogram(self):
+        self.assertEqual(
+            [("<1s", 2), ("2-4s", 1), ("16-32s", 1)],
+            _histogram([0.1, 0.5, 3, 20]),
+        )
+
+
 class TestPlayOn(EnosTest):
     def test_modules(self):
         p = actions(pattern_hosts="pattern")
@@ -106,3 +183,417 @@ class TestResultFiltering(EnosTest):
             ]
         )
         results.filter(host="host-3")
+
+    def _results(self):
+        return Results(
+            [
+                CommandResult(
+                    host=f"host-{i % 3}",
+                    task=f"task-{i // 3}",
+                    status=STATUS_OK if i % 2 else STATUS_FAILED,
+                    payload=dict(rc=i % 2, stdout=str(i), stderr=""),
+                )
+                for i in range(9)
+            ]
+        )
+
+    def test_result_container_indexes(self):
+        results = self._results()
+        for kwargs in [
+            dict(host="host-1"),
+            dict(host="host-1", task="task-2"),
+            dict(host="host-1", status=STATUS_OK),
+            dict(task="task-0", stdout="1"),
+            dict(stdout="4"),
+            dict(host="plop"),
+        ]:
+            self.assertEqual(
+                [r for r in results if r.match(**kwargs)], results.filter(**kwargs)
+            )
+        self.assertEqual(4, len(results.ok()))
+
+        # the indexes are invalidated on mutation
+        results.append(
+            CommandResult(host="host-1", task="task-3", status=STATUS_OK, payload={})
+        )
+        self.assertEqual(4, len(results.filter(host="host-1")))
+        results.pop()
+        self.assertEqual(3, len(results.filter(host="host-1")))
+        results += results
+        self.assertEqual(6, len(results.filter(host="host-1")))
+
+    def test_result_container_groupby(self):
+        results = self._results()
+        groups = results.groupby("task")
+        self.assertEqual(["task-0", "task-1", "task-2"], list(groups))
+        self.assertEqual(
+            ["host-0", "host-1", "host-2"], [r.host for r in groups["task-1"]]
+        )
+        self.assertIsInstance(groups["task-1"], Results)
+        self.assertEqual(["0", "1", "2"], list(results.groupby("stdout"))[:3])
+
+    def test_result_container_columns(self):
+        columns = self._results()._columns()
+        self.assertEqual(9, len(columns["host"]))
+        self.assertEqual([0, 1, 0], columns["rc"][:3])
+        self.assertEqual(["0", "1", "2"], columns["stdout"][:3])
+
+    def _timed_results(self):
+        # host-i takes i seconds on each task, task-1 starts at 10
+        return Results(
+            [
+                CommandResult(
+                    host=f"host-{i}",
+                    task=f"task-{t}",
+                    status=STATUS_OK,
+                    payload=dict(rc=0),
+                    start=10.0 * t,
+                    end=10.0 * t + i,
+                )
+                for t in range(2)
+                for i in range(1, 21)
+            ]
+            # not timed (e.g skipped)
+            + [
+                CommandResult(
+                    host="host-0", task="task-0", status=STATUS_OK, payload={}
+                )
+            ]
+        )
+
+    def test_task_timings(self):
+        timings = self._timed_results().task_timings()
+        self.assertEqual(
+            dict(count=20, p50=10.0, p95=19.0, max=20.0), timings["task-0"]
+        )
+        self.assertEqual(timings["task-0"], timings["task-1"])
+
+    def test_slowest_hosts(self):
+        self.assertEqual(
+            [("host-20", 40.0), ("host-19", 38.0)],
+            self._timed_results().slowest_hosts(top=2),
+        )
+
+    def test_chrome_trace(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "trace.json"
+            trace = self._timed_results().to_chrome_trace(path)
+            self.assertEqual(trace, json.loads(path.read_text()))
+        events = trace["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertEqual(40, len(spans))
+        names = [e for e in events if e["ph"] == "M"]
+        self.assertEqual(20, len(names))
+        span = [e for e in spans if e["name"] == "task-1"][0]
+        self.assertEqual(10e6, span["ts"])
+        self.assertEqual(1e6, span["dur"])
+
+    def test_timings_are_recorded(self):
+        before = time.time()
+        results = run_command("sleep 0.1", roles=LocalHost())
+        self.assertLessEqual(before, results[0].start)
+        self.assertGreaterEqual(results[0].duration, 0.1)
+        self.assertLessEqual(results[0].end, time.time())
+
+
+class TestSession(EnosTest):
+    def test_tqm_is_reused(self):
+        roles = Roles(all=[Host("1.2.3.4")])
+        with mock.patch("enoslib.api.TaskQueueManager") as tqm_cls:
+            with Session(roles) as s:
+                s.run("date")
+                s.run_command("date", on_error_continue=True)
+                with s.actions() as a:
+                    a.shell("date")
+            tqm_cls.assert_called_once()
+            tqm = tqm_cls.return_value
+            self.assertEqual(3, tqm.run.call_count)
+            tqm.cleanup.assert_called_once()
+
+    def test_actions_use_session(self):
+        session = mock.Mock()
+        session.run_play.return_value = Results()
+        with mock.patch("enoslib.api.run_play") as m:
+            with actions(session=session) as a:
+                a.shell("date")
+            m.assert_not_called()
+        session.run_play.assert_called_once()
+
+    def test_extra_vars_are_restored(self):
+        roles = Roles(all=[Host("1.2.3.4")])
+        with mock.patch("enoslib.api.TaskQueueManager"):
+            with Session(roles, extra_vars=dict(a=1)) as s:
+                s.run("date", extra_vars=dict(b=2))
+                assert s._variable_manager is not None
+                self.assertNotIn("b", s._variable_manager._extra_vars)
+                self.assertEqual(1, s._variable_manager._extra_vars["a"])
+
+    def test_serial(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(3)])
+        play_source = dict(
+            hosts="all",
+            gather_facts=False,
+            serial=1,
+            tasks=[dict(shell="echo a"), dict(shell="echo b")],
+        )
+        with Session(roles) as s:
+            results = s.run_play(play_source)
+        hosts = [r.host for r in results]
+        # each host runs all the tasks before the next one starts
+        self.assertEqual(6, len(hosts))
+        self.assertEqual(hosts[0::2], hosts[1::2])
+        self.assertCountEqual(["local-0", "local-1", "local-2"], hosts[0::2])
+
+    def test_vars_prompt(self):
+        roles = Roles(all=[LocalHost()])
+        play_source = dict(
+            hosts="all",
+            gather_facts=False,
+            vars_prompt=[dict(name="a"), dict(name="b")],
+            tasks=[dict(shell="echo {{ a }} {{ b }}")],
+        )
+        with mock.patch(
+            "enoslib.api._display.do_var_prompt", return_value="prompted"
+        ) as prompt:
+            results = run_play(play_source, roles=roles, extra_vars=dict(b="extra"))
+        # extra vars aren't prompted
+        prompt.assert_called_once()
+        self.assertEqual("prompted extra", results[0].stdout)
+
+
+class TestRunPlay(EnosTest):
+    def test_play_is_built_in_memory(self):
+        roles = Roles(all=[Host("1.2.3.4")])
+        cwd = os.getcwd()
+        with TemporaryDirectory() as tmp, mock.patch(
+            "enoslib.api.TaskQueueManager"
+        ) as tqm_cls:
+            os.chdir(tmp)
+            try:
+                run_command("date", roles=roles, task_name="my date")
+            finally:
+                os.chdir(cwd)
+            # nothing has been written in the current directory
+            self.assertEqual([], os.listdir(tmp))
+            tqm = tqm_cls.return_value
+            tqm.run.assert_called_once()
+            play = tqm.run.call_args[1]["play"]
+            self.assertEqual(["my date"], [t.name for t in play.get_tasks()[0]])
+            # cwd is used as the Ansible basedir
+            loader = tqm_cls.call_args[1]["loader"]
+            self.assertEqual(
+                Path(tmp).resolve(), Path(loader.get_basedir()).resolve()
+            )
+
+
+class TestStrategy(EnosTest):
+    def _strategy(self, **kwargs):
+        roles = Roles(all=[Host("1.2.3.4")])
+        with mock.patch("enoslib.api.TaskQueueManager") as tqm_cls:
+            with actions(roles=roles, **kwargs) as a:
+                a.command("date")
+            return tqm_cls.return_value.run.call_args[1]["play"].strategy
+
+    def test_strategy(self):
+        self.assertEqual("linear", self._strategy())
+        self.assertEqual("free", self._strategy(strategy="free"))
+        with config_context(ansible_strategy="free"):
+            self.assertEqual("free", self._strategy())
+            self.assertEqual("linear", self._strategy(strategy="linear"))
+
+    def test_mitogen_fallback(self):
+        with mock.patch("enoslib.api._mitogen_enabled", False):
+            self.assertEqual("linear", self._strategy(strategy="mitogen_linear"))
+            with config_context(ansible_strategy="mitogen_free"):
+                self.assertEqual("free", self._strategy())
+
+    @unittest.skipUnless(importlib.util.find_spec("ansible_mitogen"), "mitogen")
+    def test_mitogen(self):
+        roles = Roles(all=[LocalHost()])
+        with actions(roles=roles, strategy="mitogen_linear") as a:
+            a.command("echo mitogen")
+        self.assertEqual("mitogen", a.results.filter(task="command")[0].stdout)
+
+
+class TestStreaming(EnosTest):
+    def test_truncate_payload(self):
+        payload = dict(stdout="a\nb\nc", stdout_lines=["a", "b", "c"], rc=0)
+        truncated = _truncate_payload(payload, 3)
+        self.assertEqual("a\nb", truncated["stdout"])
+        self.assertEqual(["a", "b"], truncated["stdout_lines"])
+        self.assertTrue(truncated["truncated"])
+        # the original payload is left untouched
+        self.assertEqual("a\nb\nc", payload["stdout"])
+        self.assertIs(payload, _truncate_payload(payload, 5))
+
+    def test_record_stream_discard(self):
+        stream = _RecordStream(2)
+        ok = _AnsibleExecutionRecord(host="h", status=STATUS_OK, task="t", payload={})
+        ko = _AnsibleExecutionRecord(
+            host="h", status=STATUS_FAILED, task="t", payload={}
+        )
+        stream.append(ok)
+        stream.append(ko)
+        stream.discard()
+        # doesn't block anymore
+        for _ in range(10):
+            stream.append(ok)
+        stream.close()
+        self.assertEqual([ko], stream.errors)
+
+    def test_run_command_iter(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(3)])
+        results = list(
+            run_command_iter("seq 1 100", roles=roles, max_payload_size=4)
+        )
+        self.assertCountEqual(
+            ["local-0", "local-1", "local-2"], [r.host for r in results]
+        )
+        for r in results:
+            self.assertEqual(STATUS_OK, r.status)
+            self.assertEqual("1\n2\n", r.stdout)
+
+    def test_run_command_iter_raises_at_the_end(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(2)])
+        seen = []
+        with self.assertRaises(EnosFailedHostsError):
+            for r in run_command_iter("exit 1", roles=roles):
+                seen.append(r)
+        self.assertEqual(2, len(seen))
+
+    def test_actions_stream(self):
+        roles = Roles(all=[LocalHost()])
+        with actions(roles=roles, stream=True) as a:
+            a.shell("echo 1")
+            a.shell("echo 2")
+        self.assertEqual(0, len(a.results))
+        assert a.results_iter is not None
+        self.assertEqual(["1", "2"], [r.stdout for r in a.results_iter])
+
+
+class TestEarlyAbort(EnosTest):
+    def _failed(self, callback, host):
+        result = mock.Mock()
+        result._host.get_name.return_value = host
+        result._task.get_name.return_value = "task"
+        result._result = {}
+        callback.v2_runner_on_failed(result)
+
+    def _callback(self, **kwargs):
+        tqm = mock.Mock()
+        tqm._inventory.get_hosts.return_value = [f"h{i}" for i in range(10)]
+        callback = _MyCallback([])
+        callback.watch_failures(tqm, **kwargs)
+        callback.v2_playbook_on_play_start(mock.Mock())
+        return callback, tqm
+
+    def test_max_failures(self):
+        callback, tqm = self._callback(max_failures=2)
+        self._failed(callback, "h0")
+        self._failed(callback, "h1")
+        # same host failing twice counts once
+        self._failed(callback, "h1")
+        tqm.terminate.assert_not_called()
+        self._failed(callback, "h2")
+        tqm.terminate.assert_called_once()
+        self.assertTrue(callback.aborted)
+        self.assertEqual(4, len(callback.storage))
+
+    def test_max_fail_ratio(self):
+        callback, tqm = self._callback(max_fail_ratio=0.25)
+        self._failed(callback, "h0")
+        self._failed(callback, "h1")
+        tqm.terminate.assert_not_called()
+        self._failed(callback, "h2")
+        tqm.terminate.assert_called_once()
+
+    def test_run_command_aborts(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(4)])
+        cmd = "if [ {{ inventory_hostname[-1] }} = 0 ]; then exit 1; fi; sleep 60"
+        start = time.time()
+        with self.assertRaises(EnosFailedHostsError):
+            run_command(cmd, roles=roles, max_failures=0)
+        self.assertLess(time.time() - start, 60)
+
+
+class TestSpinner(EnosTest):
+    def _result(self, host):
+        result = mock.Mock()
+        result.task_name = "task"
+        result._host.name = host
+        return result
+
+    def test_counts(self):
+        callback = SpinnerCallback()
+        callback.status = mock.Mock()
+        task = mock.Mock()
+        task.get_name.return_value = "task"
+        hosts = [f"h{i}" for i in range(1000)]
+        for host in hosts:
+            h = mock.Mock()
+            h.name = host
+            callback.v2_runner_on_start(h, task)
+        for host in hosts[:-2]:
+            callback.v2_runner_on_ok(self._result(host))
+        callback.v2_runner_on_failed(self._result(hosts[-2]))
+        callback.v2_runner_on_unreachable(self._result(hosts[-1]))
+
+        # throttled redraws
+        self.assertLess(callback.status.update.call_count, 100)
+        rendered = callback._render("task")
+        self.assertIn("1000 hosts", rendered)
+        self.assertIn("998 ok", rendered)
+        self.assertIn("1 failed", rendered)
+        self.assertIn("1 unreachable", rendered)
+        self.assertNotIn("pending", rendered)
+        # only the failed hosts are named
+        self.assertIn("h998", rendered)
+        self.assertIn("h999", rendered)
+        self.assertNotIn("h0", rendered)
+        callback.status = None
+
+
+class TestSyncInfo(EnosTest):
+    def test_facts_sync(self):
+        h1, h2 = Host("1.2.3.4", alias="h1"), Host("1.2.3.5", alias="h2")
+        roles = Roles(r1=[h1], r2=[h1, h2])
+        networks = Networks(n=[DefaultNetwork("1.2.3.0/24")])
+        facts = dict(
+            ansible_interfaces=["eth0"],
+            ansible_eth0=dict(
+                device="eth0",
+                type="ether",
+                ipv4=dict(address="1.2.3.4", netmask="255.255.255.0"),
+            ),
+        )
+        facts_sync = _FactsSync(roles, networks)
+        facts_sync.append(
+            _AnsibleExecutionRecord(
+                host="h1", status=STATUS_OK, task="t", payload=dict(ansible_facts=facts)
+            )
+        )
+        ko = _AnsibleExecutionRecord(
+            host="h2", status=STATUS_FAILED, task="t", payload={}
+        )
+        facts_sync.append(ko)
+        self.assertEqual(1, len(h1.filter_addresses(networks["n"])))
+        self.assertEqual(0, len(h2.net_devices))
+        self.assertEqual([ko], facts_sync.errors)
+
+    def test_sync_info(self):
+        host = LocalHost()
+        roles = Roles(r1=[host], r2=[host])
+        networks = Networks(lo=[DefaultNetwork("127.0.0.0/8")])
+        synced = sync_info(roles, networks, gather_subset="network")
+        # copied once, the original host is left untouched
+        self.assertIsNot(host, synced["r1"][0])
+        self.assertIs(synced["r1"][0], synced["r2"][0])
+        self.assertEqual(0, len(host.net_devices))
+        self.assertEqual(1, len(synced["r1"][0].filter_addresses(networks["lo"])))
+        # only part of the hardware subset
+        self.assertIsNone(synced["r1"][0].processor)
+
+        synced_host = sync_info(host, networks, inplace=True)
+        self.assertIs(host, synced_host)
+        self.assertEqual(1, len(host.filter_addresses(networks["lo"])))
+        self.assertIsNotNone(host.processor)
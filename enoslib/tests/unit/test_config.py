@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from unittest import mock
+
+from ansible import context
+
+from enoslib.aio import acall
+from enoslib.api import _load_defaults, run_command
+from enoslib.config import config_context, get_config, set_config
+from enoslib.local import LocalHost
+from enoslib.objects import Host, Roles
+
+from . import EnosTest
+
+
+class TestConfig(EnosTest):
+    def test_config_context(self):
+        with config_context(facts_ttl=60, dump_max_payload_size=10):
+            self.assertEqual(60, get_config()["facts_ttl"])
+            # set_config applies to the context only
+            set_config(facts_ttl=120)
+            self.assertEqual(120, get_config()["facts_ttl"])
+        self.assertEqual(0, get_config()["facts_ttl"])
+        self.assertIsNone(get_config()["dump_max_payload_size"])
+
+    def test_config_context_per_thread(self):
+        barrier = threading.Barrier(2)
+        seen = {}
+
+        def target(ttl):
+            with config_context(facts_ttl=ttl):
+                # both threads are in their context
+                barrier.wait()
+                seen[ttl] = get_config()["facts_ttl"]
+                barrier.wait()
+
+        threads = [threading.Thread(target=target, args=(ttl,)) for ttl in [10, 20]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual({10: 10, 20: 20}, seen)
+        self.assertEqual(0, get_config()["facts_ttl"])
+
+    def test_config_context_async(self):
+        async def main():
+            with config_context(facts_ttl=10):
+                return await acall(lambda: get_config()["facts_ttl"])
+
+        self.assertEqual(10, asyncio.run(main()))
+
+    def test_forks(self):
+        _load_defaults(roles=Roles())
+        self.assertEqual(100, context.CLIARGS["forks"])
+        with config_context(ansible_forks=500):
+            _load_defaults(roles=Roles())
+            self.assertEqual(500, context.CLIARGS["forks"])
+
+    def test_forks_fast_profile(self):
+        roles = Roles(all=[Host(f"1.2.3.{i}") for i in range(200)])
+        with config_context(ansible_profile="fast"):
+            with mock.patch("enoslib.api.os.cpu_count", return_value=4):
+                _load_defaults(roles=roles)
+                self.assertEqual(100, context.CLIARGS["forks"])
+            with mock.patch("enoslib.api.os.cpu_count", return_value=64):
+                _load_defaults(roles=roles)
+                self.assertEqual(200, context.CLIARGS["forks"])
+            # an explicit number of forks has the precedence
+            with config_context(ansible_forks=10):
+                _load_defaults(roles=roles)
+                self.assertEqual(10, context.CLIARGS["forks"])
+
+    def test_run_fast_profile(self):
+        with config_context(ansible_profile="fast"):
+            results = run_command("echo fast", roles=LocalHost())
+        self.assertEqual("fast", results[0].stdout)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            set_config(ansible_profile="furious")
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            set_config(executor="rsh")
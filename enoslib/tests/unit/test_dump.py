@@ -0,0 +1,113 @@
+import importlib.util
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from enoslib.api import (
+    STATUS_OK,
+    CommandResult,
+    _dump_results,
+    run_command,
+    run_command_iter,
+)
+from enoslib.config import config_context, get_config
+from enoslib.dump import DumpWriter, get_writer, read_results
+from enoslib.local import LocalHost
+from enoslib.objects import Roles
+
+from . import EnosTest
+
+
+class TestDump(EnosTest):
+    def test_write_read(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            writer = DumpWriter(path)
+            writer.write(dict(a=1))
+            # readable while being written
+            self.assertEqual([dict(a=1)], list(read_results(path)))
+            writer.write(dict(b="multi\nline"))
+            writer.close()
+            # append only
+            DumpWriter(path).write(dict(c=3))
+            self.assertEqual(
+                [dict(a=1), dict(b="multi\nline"), dict(c=3)],
+                list(read_results(path)),
+            )
+
+    @unittest.skipUnless(importlib.util.find_spec("zstandard"), "zstandard")
+    def test_write_read_zstd(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl.zst"
+            writer = DumpWriter(path)
+            writer.write(dict(a=1))
+            self.assertEqual([dict(a=1)], list(read_results(path)))
+            writer.close()
+            DumpWriter(path).write(dict(b=2))
+            self.assertEqual([dict(a=1), dict(b=2)], list(read_results(path)))
+
+    def test_get_writer(self):
+        self.assertIsNone(get_writer())
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            with config_context(dump_results=path):
+                writer = get_writer()
+                assert writer is not None
+                self.assertEqual(path, writer.path)
+                self.assertIs(writer, get_writer())
+
+    def test_dump_results_truncated(self):
+        result = CommandResult(
+            host="h", task="t", status=STATUS_OK, payload=dict(stdout="abcdef", rc=0)
+        )
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            _dump_results([result], DumpWriter(path), max_payload_size=3)
+            (record,) = read_results(path)
+        self.assertEqual("abc", record["stdout"])
+        self.assertEqual("abc", record["payload"]["stdout"])
+        self.assertTrue(record["payload"]["truncated"])
+        # the result itself is left untouched
+        self.assertEqual("abcdef", result.stdout)
+
+    def test_dump_incrementally(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(2)])
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            with config_context(dump_results=path):
+                for i, result in enumerate(run_command_iter("hostname", roles=roles)):
+                    # the result has been dumped before being yielded
+                    dumped = [r["host"] for r in read_results(path)]
+                    self.assertGreaterEqual(len(dumped), i + 1)
+                    self.assertIn(result.host, dumped)
+
+    def test_closed_after_run(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            with config_context(dump_results=path):
+                run_command("hostname", roles=LocalHost())
+                writer = get_writer()
+                assert writer is not None
+                # the execution is over: the (compressed) stream is ended
+                self.assertIsNone(writer._file)
+                self.assertEqual(1, len(list(read_results(path))))
+
+    def test_counter_before_suffixes(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl.zst"
+            path.touch()
+            with config_context(dump_results=path):
+                self.assertEqual(
+                    Path(tmp_dir) / "dump.1.jsonl.zst", get_config()["dump_results"]
+                )
+            (Path(tmp_dir) / "dump.1.jsonl.zst").touch()
+            with config_context(dump_results=path):
+                self.assertEqual(
+                    Path(tmp_dir) / "dump.2.jsonl.zst", get_config()["dump_results"]
+                )
+            path = Path(tmp_dir) / "dump.jsonl"
+            path.touch()
+            with config_context(dump_results=path):
+                self.assertEqual(
+                    Path(tmp_dir) / "dump.1.jsonl", get_config()["dump_results"]
+                )
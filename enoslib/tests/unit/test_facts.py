@@ -0,0 +1,88 @@
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from enoslib.api import actions, gather_facts
+from enoslib.config import config_context
+from enoslib.facts import FactCache, _subset_key, get_fact_cache
+from enoslib.local import LocalHost
+from enoslib.objects import Host, Roles
+
+from . import EnosTest
+
+
+class TestFactCache(EnosTest):
+    def test_subset_key(self):
+        self.assertEqual("all", _subset_key("all"))
+        self.assertEqual("all", _subset_key([]))
+        self.assertEqual("!min,network", _subset_key("network, !min"))
+        self.assertEqual("!min,network", _subset_key(["!min", "network"]))
+
+    def test_get_set(self):
+        cache = FactCache(60)
+        host = Host("1.2.3.4", alias="foo")
+        self.assertIsNone(cache.get(host, "all"))
+        cache.set(host, "network", dict(a=1))
+        self.assertEqual(dict(a=1), cache.get(host, "network"))
+        # network facts aren't enough
+        self.assertIsNone(cache.get(host, "all"))
+        cache.set(host, "all", dict(a=2))
+        self.assertEqual(dict(a=2), cache.get(host, "hardware"))
+        # same alias but another host
+        self.assertIsNone(cache.get(Host("1.2.3.5", alias="foo"), "all"))
+
+    def test_ttl(self):
+        cache = FactCache(60)
+        host = Host("1.2.3.4")
+        with mock.patch("enoslib.facts.time.time", return_value=0):
+            cache.set(host, "all", dict(a=1))
+        with mock.patch("enoslib.facts.time.time", return_value=59):
+            self.assertEqual(dict(a=1), cache.get(host, "all"))
+        with mock.patch("enoslib.facts.time.time", return_value=61):
+            self.assertIsNone(cache.get(host, "all"))
+
+    def test_directory(self):
+        host = Host("1.2.3.4", alias="foo")
+        with TemporaryDirectory() as tmp_dir:
+            FactCache(60, directory=tmp_dir).set(host, "all", dict(a=1))
+            # another instance (e.g another execution)
+            cache = FactCache(60, directory=tmp_dir)
+            self.assertEqual(dict(a=1), cache.get(host, "all"))
+            cache.invalidate([host])
+            self.assertIsNone(FactCache(60, directory=tmp_dir).get(host, "all"))
+
+    def test_invalidate(self):
+        cache = FactCache(60)
+        h1, h2 = Host("1.2.3.4"), Host("1.2.3.5")
+        cache.set(h1, "all", dict(a=1))
+        cache.set(h2, "all", dict(a=2))
+        cache.invalidate([h1])
+        self.assertIsNone(cache.get(h1, "all"))
+        self.assertIsNotNone(cache.get(h2, "all"))
+        cache.invalidate()
+        self.assertIsNone(cache.get(h2, "all"))
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_fact_cache())
+        with config_context(facts_ttl=60):
+            self.assertIsNotNone(get_fact_cache())
+        self.assertIsNone(get_fact_cache())
+
+
+class TestCachedFacts(EnosTest):
+    def test_gather_facts(self):
+        roles = Roles(all=[LocalHost(alias=f"local-{i}") for i in range(2)])
+        with config_context(facts_ttl=60):
+            cache = get_fact_cache()
+            assert cache is not None
+            cache.invalidate()
+            first = gather_facts(roles=roles, gather_subset="network")
+            self.assertEqual(2, len(first["results"]))
+            second = gather_facts(roles=roles, gather_subset="network")
+            self.assertEqual(0, len(second["results"]))
+            self.assertCountEqual(["local-0", "local-1"], second["ok"].keys())
+
+            with actions(roles=roles, gather_facts=True) as a:
+                a.debug(msg="{{ ansible_interfaces | length }}")
+            # the network facts aren't enough, all the facts have been gathered
+            self.assertEqual(2, len(a.results.filter(task="debug")))
+            self.assertIsNotNone(cache.get(roles["all"][0], "all"))
@@ -1,6 +1,22 @@
+import copy
+import pickle
+from ipaddress import ip_address, ip_interface
+
+from netaddr import EUI
+
 from enoslib.docker import DockerHost
 from enoslib.local import LocalHost
-from enoslib.objects import DefaultNetwork, Host, HostsView, IPAddress, NetDevice, Roles
+from enoslib.objects import (
+    AddressPool,
+    DefaultNetwork,
+    Host,
+    HostsView,
+    IPAddress,
+    NetDevice,
+    NetworkIndex,
+    Networks,
+    Roles,
+)
 
 from . import EnosTest
 
@@ -129,6 +145,32 @@ class TestRoles(EnosTest):
         hs.remove(Host("1.2.3.4"))
         self.assertCountEqual([Host("1.2.3.5")], hs)
 
+    def test_hostview_indexing(self):
+        hs = HostsView([Host(f"1.2.3.{i}") for i in [3, 1, 2]])
+        self.assertEqual(Host("1.2.3.1"), hs[0])
+        self.assertEqual(Host("1.2.3.3"), hs[-1])
+        self.assertCountEqual([Host("1.2.3.2"), Host("1.2.3.3")], hs[1:])
+        # the sorted view follows the mutations
+        hs.add(Host("1.2.3.0"))
+        self.assertEqual(Host("1.2.3.0"), hs[0])
+        hs.discard(Host("1.2.3.0"))
+        self.assertEqual(Host("1.2.3.1"), hs[0])
+        hs -= [Host("1.2.3.1")]
+        self.assertEqual(Host("1.2.3.2"), hs[0])
+        hs += [Host("1.2.3.0")]
+        self.assertEqual(Host("1.2.3.0"), hs[0])
+
+    def test_hostview_lookup(self):
+        hs = HostsView(
+            [Host("1.2.3.4", alias="foo"), Host("1.2.3.4", alias="bar", port=2222)]
+        )
+        self.assertEqual(Host("1.2.3.4", alias="foo"), hs.get_by_alias("foo"))
+        self.assertIsNone(hs.get_by_alias("baz"))
+        self.assertEqual(2, len(hs.get_by_address("1.2.3.4")))
+        hs.discard(Host("1.2.3.4", alias="foo"))
+        self.assertIsNone(hs.get_by_alias("foo"))
+        self.assertEqual(1, len(hs.get_by_address("1.2.3.4")))
+
 
 class TestEqHosts(EnosTest):
     @staticmethod
@@ -215,6 +257,42 @@ class TestEqHosts(EnosTest):
 
         self.assertDictEqual(extra, h.reset_extra().get_extra())
 
+    def test_extra_copies(self):
+        nested = {"key": "value"}
+        h = TestEqHosts._make_host({"nested": nested, "scalar": "value"})
+        nested["key"] = "new_value"
+        self.assertEqual("value", h.extra["nested"]["key"])
+
+        h.set_extra(scalar="new_value")
+        h.extra["nested"]["key"] = "new_value"
+        h.reset_extra()
+        self.assertDictEqual({"nested": {"key": "value"}, "scalar": "value"}, h.extra)
+
+    def test_reset_after_direct_mutation(self):
+        h = TestEqHosts._make_host({"key": "value"})
+        h.extra["key"] = "new_value"
+        h.extra["other"] = "value"
+        h.reset_extra()
+        self.assertDictEqual({"key": "value"}, h.extra)
+
+    def test_copy_on_write(self):
+        h1 = TestEqHosts._make_host({"key": "value"})
+        h1.net_devices.add(NetDevice(name="eth0"))
+        h2 = copy.copy(h1)
+        self.assertEqual(h1, h2)
+        h2.set_extra(key="new_value")
+        h2.net_devices.clear()
+        self.assertDictEqual({"key": "value"}, h1.extra)
+        self.assertEqual(1, len(h1.net_devices))
+        h2.reset_extra()
+        self.assertDictEqual({"key": "value"}, h2.extra)
+
+    def test_eq_after_reset(self):
+        h1 = TestEqHosts._make_host({"key": "value"})
+        h2 = TestEqHosts._make_host({"key": "value"})
+        h1.set_extra(key="new_value").reset_extra()
+        self.assertEqual(h1, h2)
+
     def test_dont_remove_special_host(self):
         localhost = LocalHost()
         extra = dict(ansible_connection="local")
@@ -307,3 +385,103 @@ class TestFilterAddresses(EnosTest):
             "One device attached with two addresses on two known network"
             "One address to get (one filtered out)",
         )
+
+
+class TestNetworkIndex(EnosTest):
+    def test_longest_prefix_match(self):
+        n16 = DefaultNetwork(address="10.0.0.0/16")
+        n24 = DefaultNetwork(address="10.0.1.0/24")
+        n6 = DefaultNetwork(address="2001:db8::/64")
+        index = NetworkIndex([n16, n24, n6])
+        self.assertEqual(n24, index.lookup("10.0.1.1"))
+        self.assertEqual(n16, index.lookup("10.0.2.1"))
+        self.assertEqual(n16, index.lookup(ip_interface("10.0.2.1/8")))
+        self.assertEqual(n6, index.lookup("2001:db8::1"))
+        self.assertIsNone(index.lookup("10.1.0.1"))
+        # 10.0.0.0 as an integer (mustn't match the IPv4 networks)
+        self.assertIsNone(index.lookup("::a00:1"))
+        self.assertEqual([n24, n16], index.containing("10.0.1.1"))
+
+    def test_networks_index_cache(self):
+        n16 = DefaultNetwork(address="10.0.0.0/16")
+        n24 = DefaultNetwork(address="10.0.1.0/24")
+        networks = Networks(a=[n16])
+        index = networks.index()
+        self.assertIs(index, networks.index())
+        self.assertEqual(n16, index.lookup("10.0.1.1"))
+
+        networks["a"].append(n24)
+        self.assertEqual(n24, networks.index().lookup("10.0.1.1"))
+        networks["b"] = [DefaultNetwork(address="10.0.1.0/25")]
+        self.assertEqual(networks["b"][0], networks.index().lookup("10.0.1.1"))
+        del networks["b"]
+        self.assertEqual(n24, networks.index().lookup("10.0.1.1"))
+
+    def test_sync_from_ansible(self):
+        n16 = DefaultNetwork(address="10.0.0.0/16")
+        n24 = DefaultNetwork(address="10.0.1.0/24")
+        networks = Networks(a=[n16], b=[n24])
+        device = {
+            "device": "eth0",
+            "type": "ether",
+            "ipv4": {"address": "10.0.1.1", "netmask": "255.255.0.0"},
+            "ipv4_secondaries": [{"address": "10.0.2.1", "netmask": "255.255.0.0"}],
+            "ipv6": [{"address": "2001:db8::1", "prefix": "64"}],
+        }
+        net_device = NetDevice.sync_from_ansible(device, networks)
+        by_ip = {str(a.ip).split("/")[0]: a.network for a in net_device.addresses}
+        self.assertEqual(
+            {"10.0.1.1": n24, "10.0.2.1": n16, "2001:db8::1": None}, by_ip
+        )
+        self.assertEqual(2, len(net_device.filter_addresses()))
+        # once per network the address belongs to
+        self.assertEqual(3, len(net_device.filter_addresses(networks["a"] + [n24])))
+        self.assertEqual(1, len(net_device.filter_addresses(networks["b"])))
+
+
+class TestAddressPool(EnosTest):
+    def test_reserve_release(self):
+        pool = AddressPool([(10, 20), (30, 40)])
+        self.assertEqual(20, len(pool))
+        self.assertEqual(list(range(10, 15)), pool.reserve(5))
+        pool.skip(7)
+        self.assertEqual([(32, 40)], pool.ranges)
+        self.assertEqual([32, 33], pool.reserve(2))
+        pool.release([11, 12, 33, 32])
+        self.assertEqual([(11, 13), (32, 40)], pool.ranges)
+        self.assertEqual(10, len(pool))
+        # already free
+        pool.release([12])
+        self.assertEqual(10, len(pool))
+        with self.assertRaises(ValueError):
+            pool.reserve(11)
+        self.assertEqual(10, len(pool))
+
+    def test_serialize(self):
+        pool = AddressPool([(0, 10)])
+        pool.reserve(3)
+        restored = AddressPool.from_dict(pool.to_dict())
+        self.assertEqual(pool.ranges, restored.ranges)
+        self.assertEqual(7, len(restored))
+
+    def test_network_pools(self):
+        network = DefaultNetwork(
+            "10.0.0.0/16",
+            ip_start="10.0.0.10",
+            ip_end="10.0.255.0",
+            mac_start="00:16:3E:00:00:01",
+            mac_end="00:16:3E:01:00:00",
+        )
+        ips = network.ip_pool.reserve(10000)
+        self.assertEqual(ip_address("10.0.0.10"), ips[0])
+        self.assertEqual(ip_address("10.0.39.25"), ips[-1])
+        # not given again
+        self.assertEqual(ip_address("10.0.39.26"), network.ip_pool.reserve(1)[0])
+        network.ip_pool.release(ips[:1])
+        self.assertEqual(ip_address("10.0.0.10"), network.ip_pool.reserve(1)[0])
+        macs = network.mac_pool.reserve(2)
+        self.assertEqual([EUI("00:16:3E:00:00:01"), EUI("00:16:3E:00:00:02")], macs)
+        self.assertEqual(list(network.free_macs)[2:], list(network.mac_pool))
+        # the state is kept with the network
+        restored = pickle.loads(pickle.dumps(network))
+        self.assertEqual(network.ip_pool.ranges, restored.ip_pool.ranges)
@@ -0,0 +1,152 @@
+import socket
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List
+from unittest import mock
+
+from enoslib.api import STATUS_FAILED, STATUS_OK, run_command
+from enoslib.config import config_context
+from enoslib.dump import read_results
+from enoslib.errors import EnosFailedHostsError
+from enoslib.local import LocalHost
+from enoslib.objects import Host, Roles
+from enoslib.ssh import (
+    SSHPool,
+    _build_command,
+    _is_supported,
+    probe_tcp,
+    run_command_ssh,
+)
+
+from . import EnosTest
+
+
+class TestSSHArgs(EnosTest):
+    def test_ssh_args(self):
+        pool = SSHPool()
+        args = pool.ssh_args(Host("1.2.3.4", user="foo", port=2222, keyfile="key"))
+        self.assertEqual("ssh", args[0])
+        self.assertEqual("1.2.3.4", args[-1])
+        self.assertIn("ControlMaster=auto", args)
+        self.assertIn("StrictHostKeyChecking=no", args)
+        self.assertEqual(["-l", "foo", "-p", "2222", "-i", "key"], args[-7:-1])
+
+    def test_ssh_args_gateway(self):
+        pool = SSHPool()
+        args = pool.ssh_args(
+            Host("1.2.3.4", extra=dict(gateway="gw", gateway_user="bar"))
+        )
+        self.assertIn(
+            "ProxyCommand=ssh -W %h:%p -o StrictHostKeyChecking=no "
+            "-o UserKnownHostsFile=/dev/null -l bar gw",
+            args,
+        )
+
+    def test_is_supported(self):
+        self.assertTrue(_is_supported(Host("1.2.3.4")))
+        self.assertTrue(_is_supported(LocalHost()))
+        self.assertTrue(_is_supported(Host("1.2.3.4", extra=dict(gateway="gw"))))
+        extras: List[Dict] = [
+            dict(ansible_connection="docker"),
+            dict(ansible_become=True),
+            dict(ansible_become_user="foo"),
+            dict(ansible_timeout=60),
+        ]
+        for extra in extras:
+            self.assertFalse(_is_supported(Host("1.2.3.4", extra=extra)), extra)
+
+    def test_run_as(self):
+        self.assertEqual("date", _build_command("date"))
+        self.assertEqual(
+            "sudo -u foo -- sh -c 'echo $HOME'", _build_command("echo $HOME", "foo")
+        )
+
+
+class TestRunCommandSSH(EnosTest):
+    def test_local_hosts(self):
+        hosts = [LocalHost(alias=f"local-{i}") for i in range(10)]
+        results = run_command_ssh("echo tototiti", hosts)
+        self.assertEqual(10, len(results))
+        for r in results:
+            self.assertEqual(STATUS_OK, r.status)
+            self.assertEqual("tototiti", r.stdout)
+            self.assertEqual(0, r.rc)
+            self.assertEqual("echo tototiti", r.task)
+
+    def test_failure(self):
+        hosts = [LocalHost()]
+        with self.assertRaises(EnosFailedHostsError):
+            run_command_ssh("exit 3", hosts)
+        results = run_command_ssh("exit 3", hosts, on_error_continue=True)
+        self.assertEqual(STATUS_FAILED, results[0].status)
+        self.assertEqual(3, results[0].rc)
+
+    def test_run_command_dispatch(self):
+        roles = Roles(all=[LocalHost()])
+        with mock.patch("enoslib.api.run_play") as m:
+            results = run_command("echo tototiti", roles=roles, executor="ssh")
+            m.assert_not_called()
+        self.assertEqual("tototiti", results[0].stdout)
+
+    def test_run_command_raw(self):
+        roles = Roles(all=[LocalHost()])
+        with mock.patch("enoslib.api.run_play") as m, mock.patch(
+            "enoslib.ssh.run_command_ssh", wraps=run_command_ssh
+        ) as ssh:
+            results = run_command("echo raw", roles=roles, raw=True, executor="ssh")
+            m.assert_not_called()
+            ssh.assert_called_once()
+        self.assertEqual("raw", results[0].stdout)
+
+    def test_failure_dumped(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "dump.jsonl"
+            with config_context(dump_results=path):
+                with self.assertRaises(EnosFailedHostsError):
+                    run_command_ssh("exit 3", [LocalHost()])
+            (record,) = read_results(path)
+        self.assertEqual(STATUS_FAILED, record["status"])
+        self.assertEqual(3, record["payload"]["rc"])
+
+    def test_run_command_fallback(self):
+        roles = Roles(all=[LocalHost()])
+        with mock.patch("enoslib.api.run_play") as m:
+            # templating requires Ansible
+            run_command("echo {{ foo }}", roles=roles, executor="ssh")
+            m.assert_called_once()
+        with mock.patch("enoslib.api.run_play") as m:
+            # a docker host can't be reached with ssh
+            run_command(
+                "date",
+                roles=Roles(all=[Host("c", extra=dict(ansible_connection="docker"))]),
+                executor="ssh",
+            )
+            m.assert_called_once()
+        with mock.patch("enoslib.api.run_play") as m:
+            # become is handled by Ansible
+            local = LocalHost().set_extra(ansible_become=True)
+            run_command("date", roles=Roles(all=[local]), executor="ssh")
+            m.assert_called_once()
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            run_command("date", roles=Roles(all=[LocalHost()]), executor="rsh")
+
+
+class TestProbeTCP(EnosTest):
+    def test_probe_tcp(self):
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+            opened = Host("127.0.0.1", alias="opened", port=port)
+            with socket.socket() as s:
+                # get a port that is very likely to be closed
+                s.bind(("127.0.0.1", 0))
+                closed = Host("127.0.0.1", alias="closed", port=s.getsockname()[1])
+            gateway = Host("1.2.3.4", extra=dict(gateway="gw"))
+            local = LocalHost()
+            self.assertEqual(
+                [opened, gateway, local],
+                probe_tcp([opened, closed, gateway, local], timeout=1),
+            )